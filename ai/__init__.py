@@ -11,11 +11,22 @@ from .ai_processor import AIProcessor
 from .gemini_api import GeminiAPI
 from .summarizer import Summarizer
 from .classifier import Classifier
+from .local_classifier import LocalClassifier
+from .dispatcher import PriorityDispatcher, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .metrics import AIMetrics
 
 __all__ = [
     "AIProcessor",
     "GeminiAPI",
     "Summarizer",
-    "Classifier"
+    "Classifier",
+    "LocalClassifier",
+    "PriorityDispatcher",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_BACKGROUND",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "AIMetrics",
 ]
 
@@ -7,17 +7,31 @@ AIプロセッサー
 記事のAI処理（翻訳、要約、分類）を行う
 """
 
+import re
+import json
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List
-from utils.helpers import select_gemini_api_key
+from typing import Dict, Any, Optional, List, AsyncIterator
+from utils.helpers import select_gemini_api_key, generate_article_id
 
 from .gemini_api import GeminiAPI
+from .dispatcher import PriorityDispatcher, PRIORITY_INTERACTIVE
+from .circuit_breaker import CircuitBreaker, STATE_OPEN
+from .metrics import AIMetrics
+from .language import is_japanese
 from .summarizer import Summarizer
 from .classifier import Classifier
+from .local_classifier import LocalClassifier
+from .keyword_extractor import KeywordExtractor, is_english_term
+from .qa_cache import QACache
+from .context_packer import ContextPacker
+from .extractive_summarizer import textrank_summarize
 
 logger = logging.getLogger(__name__)
 
+# 回答を生成できなかった場合の応答（キャッシュ対象外）
+QA_ERROR_ANSWER = "回答を生成できませんでした。"
+
 class AIProcessor:
     """AI処理クラス"""
     
@@ -34,24 +48,119 @@ class AIProcessor:
         self.ai_provider = "gemini"
         self.ai_model = config.get("ai_model", "gemini-2.0-flash")
 
+        # すべてのGeminiAPIインスタンスで同時実行枠を共有し、Q&A用の枠を予約する
+        self.dispatcher = PriorityDispatcher(
+            config.get("gemini_max_concurrency", 4),
+            config.get("gemini_interactive_reserved", 1),
+            config.get("gemini_fanout_extra", 4),
+        )
+
+        # Gemini API呼び出しの段階ごとのレイテンシ・トークン数などの計測
+        self.metrics = AIMetrics()
+
+        # 障害が続いた場合にすべてのGeminiAPIインスタンスで即座に失敗させるためのブレーカー
+        self.circuit_breaker = CircuitBreaker(
+            config.get("gemini_breaker_failure_threshold", 5),
+            config.get("gemini_breaker_recovery_seconds", 60),
+        )
+
         self.api = self._create_api(self.ai_model)
+        self._qa_api: Optional[GeminiAPI] = None
 
         # 各処理クラスの初期化
-        self.summarizer = Summarizer(self.api)
-        self.classifier = Classifier(self.api)
+        self.summarizer = Summarizer(
+            self.api,
+            chunk_threshold=config.get("summary_chunk_threshold", 8000),
+            chunk_size=config.get("summary_chunk_size", 4000),
+            degraded=config.get("degraded_mode", False),
+        )
+        local_model = None
+        if config.get("local_classifier", True):
+            local_model = LocalClassifier(config.get("local_classifier_path", "data/local_classifier.json"))
+        self.classifier = Classifier(
+            self.api,
+            local_model=local_model,
+            confidence_threshold=config.get("local_classifier_threshold", 0.8),
+            min_samples=config.get("local_classifier_min_samples", 50),
+            min_class_samples=config.get("local_classifier_min_class_samples", 10),
+        )
+
+        # ローカルキーワード抽出（文書頻度はArticleStoreから取得する）
+        self.keyword_extractor = KeywordExtractor()
+        self.article_store: Optional[Any] = None
+
+        # 質問応答のプロンプトに含める記事パッセージの選択
+        self.context_packer = ContextPacker(
+            token_budget=config.get("qa_context_token_budget", 3000),
+            passage_chars=config.get("qa_passage_chars", 400),
+        )
+
+        # 質問応答の検索コンテキスト・回答キャッシュ
+        self.qa_cache = QACache(
+            max_answers=config.get("qa_cache_size", 1024),
+            max_contexts=config.get("qa_context_cache_size", 256),
+            ttl=config.get("qa_cache_ttl", 3600),
+        )
 
         logger.info("AIプロセッサーを初期化しました")
 
+    def attach_article_store(self, article_store: Any) -> None:
+        """キーワード抽出の文書頻度に使用する記事ストアを設定する"""
+        self.article_store = article_store
+
     def _create_api(self, model: Optional[str] = None):
         """Google Gemini APIインスタンスを生成する"""
         api_key = self.config.get("gemini_api_key", "")
         keys = self.config.get("gemini_api_keys")
         selected_model = model or "gemini-2.0-flash"
         logger.info(f"Google Gemini APIを使用します: {selected_model}")
-        return GeminiAPI(api_key, model=selected_model, api_keys=keys)
+        return GeminiAPI(
+            api_key,
+            model=selected_model,
+            api_keys=keys,
+            dispatcher=self.dispatcher,
+            hedging=self.config.get("gemini_hedging", False),
+            hedge_percentile=self.config.get("gemini_hedge_percentile", 0.95),
+            hedge_budget=self.config.get("gemini_hedge_budget", 0.05),
+            circuit_breaker=self.circuit_breaker,
+            api_endpoint=self.config.get("gemini_api_endpoint") or None,
+            metrics=self.metrics,
+        )
+
+    @property
+    def available(self) -> bool:
+        """Gemini APIによる処理を試みられる状態かどうか（縮退モードやサーキット遮断中はFalse）"""
+        return not self.summarizer.degraded and self.circuit_breaker.state != STATE_OPEN
+
+    async def extract_keywords_for_storage(
+        self, article: Dict[str, Any], document_id: Optional[str] = None
+    ) -> str:
+        """
+        記事から検索用キーワードを抽出する
 
-    async def extract_keywords_for_storage(self, article: Dict[str, Any]) -> str:
-        """記事から検索用キーワードを抽出する"""
+        既定ではローカルのTF-IDFで抽出し、設定で "llm" が指定された場合のみGeminiを使用する。
+        キーワードは英語で照合するため英単語だけを返す。文書頻度はdocument_idごとに一度だけ加算する
+        （再処理で同じ記事を二重に数えない）。
+        """
+        if self.config.get("keyword_extraction", "local") == "llm":
+            return await self._extract_keywords_with_llm(article)
+
+        tf = self.keyword_extractor.term_frequencies(
+            article.get("title", ""), article.get("content", "")
+        )
+        if not tf:
+            return ""
+
+        total, frequencies = 0, {}
+        if self.article_store:
+            total, frequencies = await self.article_store.get_document_frequencies(tf.keys())
+            await self.article_store.add_document_terms(tf.keys(), document_id=document_id)
+
+        english = {term: count for term, count in tf.items() if is_english_term(term)}
+        return ", ".join(self.keyword_extractor.rank(english, frequencies, total, top_k=7))
+
+    async def _extract_keywords_with_llm(self, article: Dict[str, Any]) -> str:
+        """Geminiを使用して記事から検索用キーワードを抽出する"""
         title = article.get("title", "")
         content = article.get("content", "")
         prompt = (
@@ -60,7 +169,7 @@ class AIProcessor:
             f"Title: {title}\n\nContent:\n{content}"
         )
         try:
-            text = await self.api.generate_text(prompt, max_tokens=50, temperature=0.3)
+            text = await self.api.generate_text(prompt, max_tokens=50, temperature=0.3, stage="keywords")
             return text.strip()
         except Exception as e:
             logger.error(f"キーワード抽出中にエラーが発生しました: {e}", exc_info=True)
@@ -78,6 +187,8 @@ class AIProcessor:
             処理済み記事データ
         """
         processed = article.copy()
+        # 要約でタイトルが翻訳される前に、文書頻度の重複加算を防ぐための記事IDを決めておく
+        document_id = generate_article_id(article)
 
         try:
             # 要約（翻訳を兼ねる）
@@ -93,12 +204,16 @@ class AIProcessor:
                 processed = await self._classify_article(processed)
 
             # 検索用キーワード抽出
-            keywords_en = await self.extract_keywords_for_storage(processed)
+            keywords_en = await self.extract_keywords_for_storage(processed, document_id=document_id)
             processed["keywords_en"] = keywords_en
 
             # 処理フラグを追加
             processed["ai_processed"] = True
 
+            # APIを使わない代替処理になった記事は、復旧後に再処理できるよう縮退フラグを付ける
+            if processed.get("degraded") or self.circuit_breaker.is_open:
+                processed["degraded"] = True
+
             return processed
             
         except Exception as e:
@@ -132,16 +247,27 @@ class AIProcessor:
 
         summarizer = self.summarizer
 
+        # 日本語の記事はタイトルの翻訳を省き、要約のみを依頼する
+        title = article.get("title", "")
+        japanese = is_japanese(f"{title}\n{content}", article.get("feed_language"))
+        article["language"] = "ja" if japanese else "other"
+
         # 要約の生成
-        summary = await summarizer.summarize(content, max_length, summary_type or "normal")
+        summary, degraded = await summarizer.summarize_with_status(
+            content, max_length, summary_type or "normal", japanese
+        )
 
         # タイトルの翻訳
-        title = article.get("title", "")
-        if title:
-            translated = await summarizer.summarize(title, max_length, "title")
+        if title and not japanese:
+            translated, title_degraded = await summarizer.summarize_with_status(title, max_length, "title")
+            degraded = degraded or title_degraded
             if translated:
                 article["title"] = translated
 
+        # 縮退モードを明示的に設定している場合は再処理の対象にしない
+        if degraded and not summarizer.degraded:
+            article["degraded"] = True
+
         # 要約結果を記事に追加
         article["summary"] = summary
         article["summarized"] = True
@@ -150,6 +276,85 @@ class AIProcessor:
 
         return article
     
+    async def create_digest(
+        self, articles: List[Dict[str, Any]], feed_info: Dict[str, Any], digest_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        複数の記事を1回のAPI呼び出しでダイジェストにまとめる
+
+        Args:
+            articles: AI処理前の記事データのリスト（古い順）
+            feed_info: フィード情報
+            digest_id: ダイジェストのID（キーワード抽出の文書頻度を同じダイジェストで二重に数えないため）
+
+        Returns:
+            {"title", "overview", "items": [{"title", "link", "summary"}], "feed_title", "digest", "keywords_en"}
+        """
+        item_chars = self.config.get("digest_item_chars", 500)
+        feed_title = feed_info.get("title") or (articles[0].get("feed_title") if articles else "") or "RSS Feed"
+
+        one_liners: List[str] = []
+        overview = ""
+        if not self.summarizer.degraded:
+            listing = "\n\n".join(
+                f"[{i}] {a.get('title', '')}\n{(a.get('content') or '')[:item_chars]}"
+                for i, a in enumerate(articles, 1)
+            )
+            prompt = (
+                "次の記事一覧を日本語のダイジェストにまとめてください。"
+                "全体の傾向を2〜3文で述べた overview と、各記事を日本語の1文（60文字以内）で紹介した items を、"
+                '{"overview": "...", "items": ["[1]の紹介", "[2]の紹介", ...]} の形式のJSONのみで出力してください。\n\n'
+                f"{listing}"
+            )
+            try:
+                text = await self.api.generate_text(
+                    prompt, max_tokens=200 + 80 * len(articles), temperature=0.3, stage="digest"
+                )
+                overview, one_liners = self._parse_digest(text)
+            except Exception as e:
+                logger.warning(f"ダイジェストの生成に失敗したため、抽出型の要約で代替します: {e}")
+
+        items = []
+        for i, article in enumerate(articles):
+            summary = one_liners[i] if i < len(one_liners) and one_liners[i] else (
+                textrank_summarize(article.get("content") or "", 80) or article.get("title", "")
+            )
+            items.append({"title": article.get("title", ""), "link": article.get("link", ""), "summary": summary})
+
+        digest = {
+            "title": f"{feed_title} ダイジェスト（{len(items)}件）",
+            "overview": overview,
+            "items": items,
+            "feed_title": feed_title,
+            "feed_url": feed_info.get("url"),
+            "digest": True,
+        }
+        # 質問応答でダイジェスト全体を参照できるよう、紹介文をまとめた本文とキーワードを付ける
+        combined = {
+            "title": digest["title"],
+            "content": "\n".join([overview] + [f"{it['title']}: {it['summary']}" for it in items]).strip(),
+            "feed_url": feed_info.get("url"),
+        }
+        digest["keywords_en"] = await self.extract_keywords_for_storage(combined, document_id=digest_id)
+        digest["_original_article"] = combined
+        return digest
+
+    @staticmethod
+    def _parse_digest(text: str):
+        """ダイジェストの応答（JSON）から概要と各記事の紹介文を取り出す"""
+        match = re.search(r"\{.*\}", text or "", re.DOTALL)
+        if not match:
+            return "", []
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return "", []
+        items = [
+            re.sub(r"^\[\d+\]\s*", "", str(item).strip())
+            for item in data.get("items", []) if isinstance(item, (str, int, float))
+        ]
+        return str(data.get("overview", "")).strip(), items
+
     async def _classify_article(self, article: Dict[str, Any]) -> Dict[str, Any]:
         """
         記事のジャンルを分類する
@@ -184,7 +389,7 @@ class AIProcessor:
                 # デフォルトカテゴリ情報
                 article["category_info"] = {"name": "other", "jp_name": "その他", "emoji": "📌"}
             
-            logger.info(f"記事を分類しました: {article.get('title')} -> {category}")
+            logger.info(f"記事を分類しました: {article.get('title')} -> {category_name}")
             return article
             
         except Exception as e:
@@ -194,9 +399,41 @@ class AIProcessor:
             return article
 
     async def _generate_search_keywords(
+        self, original_article: Dict[str, Any], question: str, use_llm: Optional[bool] = None
+    ) -> List[str]:
+        """
+        質問と記事から検索用キーワードを生成する
+
+        既定ではローカルで抽出し（質問中の語を優先し、記事の保存済みキーワードで補う）、
+        use_llm=Trueまたは設定で "llm" が指定された場合のみGeminiを使用する。
+        """
+        if use_llm is None:
+            use_llm = self.config.get("keyword_extraction", "local") == "llm"
+        if use_llm:
+            return await self._generate_search_keywords_with_llm(original_article, question)
+
+        # 保存済みキーワードは英語のため、質問からも英単語だけを使う
+        tf = {
+            term: count for term, count in self.keyword_extractor.term_frequencies("", question).items()
+            if is_english_term(term)
+        }
+        total, frequencies = 0, {}
+        if tf and self.article_store:
+            total, frequencies = await self.article_store.get_document_frequencies(tf.keys())
+        keywords = self.keyword_extractor.rank(tf, frequencies, total, top_k=5)
+
+        stored = original_article.get("keywords_en") or ""
+        for keyword in (k.strip() for k in stored.split(",")):
+            if len(keywords) >= 5:
+                break
+            if keyword and keyword not in keywords:
+                keywords.append(keyword)
+        return keywords
+
+    async def _generate_search_keywords_with_llm(
         self, original_article: Dict[str, Any], question: str
     ) -> List[str]:
-        """質問と記事から検索用キーワードを生成する"""
+        """Geminiを使用して質問と記事から検索用キーワードを生成する"""
         title = original_article.get("title", "")
         content = original_article.get("content", "")
         prompt = (
@@ -204,40 +441,82 @@ class AIProcessor:
             f"\n\nTitle: {title}\n\nContent:\n{content}\n\nQuestion: {question}\n\nKeywords:"
         )
         try:
-            text = await self.api.generate_text(prompt, max_tokens=30, temperature=0.3)
+            text = await self.api.generate_text(
+                prompt, max_tokens=30, temperature=0.3, priority=PRIORITY_INTERACTIVE, stage="qa_keywords"
+            )
             keywords = [k.strip() for k in text.replace("\n", "").split(",") if k.strip()]
             return keywords[:5]
         except Exception as e:
             logger.error(f"検索用キーワード生成中にエラーが発生しました: {e}", exc_info=True)
             return []
 
-    async def answer_question(
+    def _build_answer_prompt(
         self,
         original_article: Dict[str, Any],
         related_articles: List[Dict[str, Any]],
         question: str,
     ) -> str:
-        """元記事と関連記事を基に質問に回答する"""
-        main_title = original_article.get("title", "")
-        main_content = original_article.get("content", "")
+        """
+        質問応答用のプロンプトを作成する
+
+        記事全文ではなく、質問との関連度が高いパッセージをトークン予算内で選んで含める。
+        """
+        packed = self.context_packer.pack(question, original_article, related_articles)
+        main = packed[0]
+        main_content = "\n".join(main["passages"])
 
         related_parts = []
-        for i, art in enumerate(related_articles, 1):
-            title = art.get("title", "")
-            content = (art.get("content", "") or "")[:600]
-            related_parts.append(f"{i}. Title: {title}\n   Content: {content}...")
-        related_block = "\n".join(related_parts)
+        for i, art in enumerate(packed[1:], 1):
+            excerpt = "\n   ".join(art["passages"])
+            related_parts.append(f"{i}. Title: {art['title']}\n   Excerpts: {excerpt}")
+        related_block = "\n".join(related_parts) or "(none)"
 
-        prompt = (
-            "You are an expert news commentator. Based on the following articles, please answer the user's question in Japanese.\n\n"
-            f"**Main Article:**\nTitle: {main_title}\nContent: {main_content}\n\n"
+        return (
+            "You are an expert news commentator. Based on the following articles, please answer the user's question in Japanese.\n"
+            "The article texts are excerpts selected for relevance to the question.\n\n"
+            f"**Main Article:**\nTitle: {main['title']}\nContent: {main_content}\n\n"
             f"**Related Articles:**\n{related_block}\n\n"
             f"**User's Question:**\n{question}\n\n**Answer (in Japanese):**"
         )
+
+    def _get_qa_api(self) -> GeminiAPI:
+        """質問応答用のAPIインスタンスを取得する"""
+        if self._qa_api is None:
+            self._qa_api = self._create_api("gemini-2.5-flash")
+        return self._qa_api
+
+    async def answer_question(
+        self,
+        original_article: Dict[str, Any],
+        related_articles: List[Dict[str, Any]],
+        question: str,
+    ) -> str:
+        """元記事と関連記事を基に質問に回答する"""
+        prompt = self._build_answer_prompt(original_article, related_articles, question)
         try:
-            api = self._create_api("gemini-2.5-flash")
-            return await api.generate_text(prompt, max_tokens=1000, temperature=0.3)
+            return await self._get_qa_api().generate_text(
+                prompt, max_tokens=1000, temperature=0.3, priority=PRIORITY_INTERACTIVE, hedge=True, stage="qa"
+            )
         except Exception as e:
             logger.error(f"回答生成中にエラーが発生しました: {e}", exc_info=True)
-            return "回答を生成できませんでした。"
+            return QA_ERROR_ANSWER
 
+    async def answer_question_stream(
+        self,
+        original_article: Dict[str, Any],
+        related_articles: List[Dict[str, Any]],
+        question: str,
+    ) -> AsyncIterator[str]:
+        """元記事と関連記事を基に質問への回答をストリーミング生成する"""
+        prompt = self._build_answer_prompt(original_article, related_articles, question)
+        yielded = False
+        try:
+            async for text in self._get_qa_api().generate_text_stream(
+                prompt, max_tokens=1000, temperature=0.3, priority=PRIORITY_INTERACTIVE, stage="qa"
+            ):
+                yielded = True
+                yield text
+        except Exception as e:
+            logger.error(f"回答のストリーミング生成中にエラーが発生しました: {e}", exc_info=True)
+            if not yielded:
+                yield QA_ERROR_ANSWER
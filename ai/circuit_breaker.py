@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+サーキットブレーカー
+
+Gemini APIの障害やクォータ枯渇が続いた場合に呼び出しを即座に失敗させ、
+リトライ待ちで処理全体が止まるのを防ぐ。
+"""
+
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """サーキットが開いているため呼び出しを行わなかったことを示す例外"""
+
+
+class CircuitBreaker:
+    """サーキットブレーカークラス"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60.0, trial_timeout: float = 120.0):
+        """
+        初期化
+
+        Args:
+            failure_threshold: サーキットを開くまでの連続失敗回数
+            recovery_timeout: サーキットを開いてから試行を再開するまでの秒数
+            trial_timeout: 半開状態の試行リクエストの結果を待つ最大秒数（過ぎると次の試行を許可する）
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.trial_timeout = trial_timeout
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+
+    @property
+    def state(self) -> str:
+        """現在の状態（closed / open / half_open）"""
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = STATE_HALF_OPEN
+            self._trial_in_flight = False
+            logger.info("サーキットブレーカーが半開状態になりました。試行リクエストを許可します")
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """呼び出しを遮断している状態かどうか（試行を受け付ける半開状態は含まない）"""
+        return self.state == STATE_OPEN
+
+    def allow_request(self) -> bool:
+        """
+        呼び出しを許可するかどうかを判定する
+
+        半開状態では試行リクエストを1件だけ許可する。試行の結果が trial_timeout 秒以内に
+        記録されない場合は、次の試行を許可する。
+        """
+        state = self.state
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_HALF_OPEN:
+            now = time.monotonic()
+            if not self._trial_in_flight or now - self._trial_started >= self.trial_timeout:
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+        return False
+
+    def release_trial(self) -> None:
+        """
+        結果を記録しないまま終わった試行リクエスト（キャンセルなど）の枠を返す
+
+        状態は変えず、半開状態であれば次の試行を許可する。
+        """
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        """呼び出しの成功を記録する"""
+        if self._state != STATE_CLOSED:
+            logger.info("サーキットブレーカーを閉じました。通常処理を再開します")
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """呼び出しの失敗を記録する"""
+        self._consecutive_failures += 1
+        if self._state == STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self._state != STATE_OPEN:
+                logger.warning(
+                    f"Gemini APIの失敗が続いたためサーキットブレーカーを開きます "
+                    f"({self.recovery_timeout:.0f}秒間は即座に失敗させます)"
+                )
+            self._state = STATE_OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
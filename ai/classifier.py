@@ -10,19 +10,38 @@
 import logging
 from typing import Dict, Any, List, Optional
 
+from .local_classifier import LocalClassifier
+from .circuit_breaker import CircuitOpenError
+
 logger = logging.getLogger(__name__)
 
 class Classifier:
     """ジャンル分類クラス"""
     
-    def __init__(self, api):
+    def __init__(
+        self,
+        api,
+        local_model: Optional[LocalClassifier] = None,
+        confidence_threshold: float = 0.8,
+        min_samples: int = 50,
+        min_class_samples: int = 10,
+    ):
         """
         初期化
         
         Args:
             api: APIインスタンス（GeminiAPI）
+            local_model: ローカル分類器（指定した場合はLLMより先に使用する）
+            confidence_threshold: ローカル分類器の結果を採用する確信度の閾値
+            min_samples: ローカル分類器を使用し始める学習済みサンプル数
+            min_class_samples: ローカル分類器が予測に使うラベルごとの学習済みサンプル数
+                （この件数を満たすラベルが2つ以上ない間はLLMで分類し、学習を続ける）
         """
         self.api = api
+        self.local_model = local_model
+        self.confidence_threshold = confidence_threshold
+        self.min_samples = min_samples
+        self.min_class_samples = min_class_samples
         logger.info("ジャンル分類機能を初期化しました")
     
     async def classify(self, title: str, content: str, categories: List[str] = None) -> str:
@@ -47,10 +66,20 @@ class Classifier:
                 "sports", "science", "health", "other"
             ]
         
+        # 分類用のテキスト（タイトルと内容の先頭部分）
+        classification_text = f"{title}\n\n{content[:500]}..."
+
+        # ローカル分類器の確信度が十分高ければLLMを呼び出さない
+        if self.local_model and self.local_model.sample_count >= self.min_samples:
+            trained = self.local_model.trained_labels(categories, self.min_class_samples)
+            label, confidence = (
+                self.local_model.predict(classification_text, categories) if len(trained) >= 2 else (None, 0.0)
+            )
+            if label in trained and confidence >= self.confidence_threshold:
+                logger.debug(f"ローカル分類器で分類しました: {label} ({confidence:.2f})")
+                return label
+
         try:
-            # 分類用のテキスト（タイトルと内容の先頭部分）
-            classification_text = f"{title}\n\n{content[:500]}..."
-            
             # 分類プロンプトの作成
             categories_str = ", ".join(categories)
             prompt = f"""
@@ -64,7 +93,7 @@ class Classifier:
 """
             
             # APIを使用して分類
-            result = await self.api.generate_text(prompt, max_tokens=50, temperature=0.1)
+            result = await self.api.generate_text(prompt, max_tokens=50, temperature=0.1, stage="classify")
             
             # 結果の正規化
             result = result.strip().lower()
@@ -72,14 +101,24 @@ class Classifier:
             # カテゴリリストに含まれるか確認
             for category in categories:
                 if category.lower() in result:
+                    # LLMの分類結果をローカル分類器に学習させる
+                    if self.local_model:
+                        self.local_model.learn(classification_text, category)
                     return category
             
             # 該当するカテゴリがない場合はその他
             return "other"
             
         except Exception as e:
-            logger.error(f"ジャンル分類中にエラーが発生しました: {e}", exc_info=True)
-            # エラーの場合はその他を返す
+            if isinstance(e, CircuitOpenError):
+                logger.info("Gemini APIのサーキットが開いているため、ローカル分類器で代替します")
+            else:
+                logger.error(f"ジャンル分類中にエラーが発生しました: {e}", exc_info=True)
+            # ローカル分類器があれば確信度に関わらずその結果を使い、なければその他を返す
+            if self.local_model:
+                label, _ = self.local_model.predict(classification_text, categories)
+                if label:
+                    return label
             return "other"
 
 # テスト用コード
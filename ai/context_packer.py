@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+質問応答用のコンテキスト詰め込み
+
+記事をパッセージ（数文のまとまり）に分割し、質問との関連度をBM25でローカルに採点して、
+トークン予算に収まるよう関連度の高い順に詰め込む。
+"""
+
+import math
+import logging
+from typing import Any, Dict, List
+
+from .keyword_extractor import KeywordExtractor
+from .extractive_summarizer import split_sentences
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算する
+
+    ASCII文字は約4文字で1トークン、日本語などの非ASCII文字は約1文字で1トークンとみなす。
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _terms(text: str) -> List[str]:
+    """採点用の索引語（日本語の長い語は文字bigramも加える）"""
+    terms = KeywordExtractor.tokenize(text)
+    bigrams = [
+        term[i:i + 2]
+        for term in terms if not term.isascii() and len(term) > 2
+        for i in range(len(term) - 1)
+    ]
+    return terms + bigrams
+
+
+def split_passages(text: str, max_chars: int = 400) -> List[str]:
+    """
+    テキストを文の境界でパッセージに分割する
+
+    Args:
+        text: 対象テキスト
+        max_chars: パッセージの最大文字数（1文がこれを超える場合は文字数で分割）
+
+    Returns:
+        パッセージのリスト
+    """
+    passages: List[str] = []
+    current = ""
+    for sentence in split_sentences(text or ""):
+        while len(sentence) > max_chars:
+            if current:
+                passages.append(current)
+                current = ""
+            passages.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            passages.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        passages.append(current)
+    return passages
+
+
+class ContextPacker:
+    """関連パッセージをトークン予算内に詰め込むクラス"""
+
+    def __init__(self, token_budget: int = 3000, passage_chars: int = 400, k1: float = 1.2, b: float = 0.75):
+        """
+        初期化
+
+        Args:
+            token_budget: 記事コンテキストに割り当てるトークン数の上限
+            passage_chars: パッセージの最大文字数
+            k1: BM25のパラメータ
+            b: BM25のパラメータ
+        """
+        self.token_budget = token_budget
+        self.passage_chars = passage_chars
+        self.k1 = k1
+        self.b = b
+
+    def pack(
+        self,
+        question: str,
+        original_article: Dict[str, Any],
+        related_articles: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        質問に関連するパッセージを選ぶ
+
+        元記事の先頭パッセージは質問に関わらず常に含める。
+
+        Args:
+            question: ユーザーの質問
+            original_article: 元記事
+            related_articles: 関連記事のリスト
+
+        Returns:
+            記事ごとに {"title", "is_main", "passages"} をまとめたリスト
+            （元記事が先頭、パッセージは記事内の元の順序）
+        """
+        articles = [original_article] + list(related_articles)
+        candidates = []  # (記事index, パッセージindex, テキスト)
+        for a_index, article in enumerate(articles):
+            for p_index, passage in enumerate(split_passages(article.get("content") or "", self.passage_chars)):
+                candidates.append((a_index, p_index, passage))
+
+        selected = set()
+        titled = {0}
+        remaining = self.token_budget - estimate_tokens(original_article.get("title") or "")
+
+        # 元記事のリード文は文脈として常に含める
+        if candidates and candidates[0][0] == 0:
+            selected.add(0)
+            remaining -= estimate_tokens(candidates[0][2])
+
+        scores = self._score(question, [c[2] for c in candidates])
+        # 元記事のパッセージをわずかに優遇する
+        order = sorted(
+            range(len(candidates)),
+            key=lambda i: (-(scores[i] * (1.2 if candidates[i][0] == 0 else 1.0)), i),
+        )
+        for i in order:
+            if i in selected or scores[i] <= 0:
+                continue
+            a_index = candidates[i][0]
+            cost = estimate_tokens(candidates[i][2])
+            if a_index not in titled:
+                # 関連記事は最初のパッセージを採用するときにタイトル分も計上する
+                cost += estimate_tokens(articles[a_index].get("title") or "")
+            if cost <= remaining:
+                selected.add(i)
+                titled.add(a_index)
+                remaining -= cost
+
+        packed: List[Dict[str, Any]] = []
+        for a_index, article in enumerate(articles):
+            passages = [c[2] for i, c in enumerate(candidates) if c[0] == a_index and i in selected]
+            if a_index == 0 or passages:
+                packed.append({
+                    "title": article.get("title", ""),
+                    "is_main": a_index == 0,
+                    "passages": passages,
+                })
+        return packed
+
+    def _score(self, question: str, passages: List[str]) -> List[float]:
+        """BM25で各パッセージと質問の関連度を計算する"""
+        query_terms = set(_terms(question))
+        if not passages or not query_terms:
+            return [0.0] * len(passages)
+
+        tokenized = [_terms(p) for p in passages]
+        n = len(passages)
+        average_length = sum(len(t) for t in tokenized) / n or 1.0
+        df = {term: sum(1 for tokens in tokenized if term in tokens) for term in query_terms}
+
+        scores = []
+        for tokens in tokenized:
+            score = 0.0
+            length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / average_length)
+            for term in query_terms:
+                tf = tokens.count(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + length_norm)
+            scores.append(score)
+        return scores
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+優先度付きディスパッチャー
+
+Gemini APIへのリクエストを優先度順に実行する。
+対話的なリクエスト（Q&Aなど）用に同時実行枠を予約し、
+バックグラウンド処理（フィードの要約など）はリクエスト単位で後回しにする。
+長文のチャンク要約のように1件の処理で並列に送るリクエストには、
+通常のバックグラウンド枠に加えて専用の追加枠を使わせる。
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 優先度（値が小さいほど優先）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_FANOUT = 5
+PRIORITY_BACKGROUND = 10
+
+
+class PriorityDispatcher:
+    """優先度付きの同時実行制御クラス"""
+
+    def __init__(self, max_concurrency: int = 4, reserved_interactive: int = 1, fanout_extra: int = 0):
+        """
+        初期化
+
+        Args:
+            max_concurrency: 同時に実行するリクエストの上限（追加枠を除く）
+            reserved_interactive: 対話的リクエスト専用に予約する枠の数
+            fanout_extra: 並列に送るリクエスト（PRIORITY_FANOUT）だけが使える追加枠の数
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        # バックグラウンド処理にも最低1枠は残す
+        self.reserved_interactive = min(max(0, reserved_interactive), self.max_concurrency - 1)
+        self.fanout_extra = max(0, fanout_extra)
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @property
+    def active(self) -> int:
+        """実行中のリクエスト数"""
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        """待機中のリクエスト数"""
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def _limit(self, priority: int) -> int:
+        """優先度ごとの同時実行上限を返す（追加枠を使っていても対話的リクエストの予約枠は残す）"""
+        if priority <= PRIORITY_INTERACTIVE:
+            return self.max_concurrency + self.fanout_extra
+        if priority <= PRIORITY_FANOUT:
+            return self.max_concurrency + self.fanout_extra - self.reserved_interactive
+        return self.max_concurrency - self.reserved_interactive
+
+    def _wake(self) -> None:
+        """実行可能な待機者を優先度順に起こす"""
+        while self._waiters:
+            priority, _, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            # 先頭が最優先なので、先頭が実行できなければ後続も実行できない
+            if self._active >= self._limit(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._active += 1
+            fut.set_result(None)
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND) -> None:
+        """実行枠を獲得する"""
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), fut))
+        self._wake()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 枠の獲得直後にキャンセルされた場合は返却する
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """実行枠を返却する"""
+        self._active = max(0, self._active - 1)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_BACKGROUND) -> AsyncIterator[None]:
+        """実行枠を獲得して処理を行うコンテキストマネージャー"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
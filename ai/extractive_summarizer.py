@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽出型要約モジュール
+
+TextRank（文の類似度グラフ上のPageRank）で重要な文を選び出す。
+外部APIが利用できない場合（縮退モード）のフォールバック要約に用いる。
+"""
+
+import re
+from typing import List
+
+import numpy as np
+
+from .keyword_extractor import KeywordExtractor
+
+# 日本語の句点・感嘆符は直後で、欧文の終止符は後続の空白で文を区切る
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？])\s*|(?<=[.!?])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """テキストを文に分割する"""
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text.strip()) if s and s.strip()]
+
+
+def _sentence_terms(sentence: str) -> List[str]:
+    """文の索引語を返す（語が取れない場合は文字bigramを用いる）"""
+    terms = KeywordExtractor.tokenize(sentence)
+    if terms:
+        return terms
+    compact = re.sub(r"\s+", "", sentence)
+    return [compact[i:i + 2] for i in range(len(compact) - 1)]
+
+
+def rank_sentences(sentences: List[str], damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    """
+    TextRankで各文のスコアを計算する
+
+    Args:
+        sentences: 文のリスト
+        damping: PageRankの減衰係数
+        iterations: べき乗法の最大反復回数
+
+    Returns:
+        文ごとのスコア
+    """
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0)
+
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for term in _sentence_terms(sentence):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+    if not vocabulary:
+        return np.full(n, 1.0 / n)
+
+    # 文×語のTF-IDF行列（L2正規化）からコサイン類似度を一括計算する
+    matrix = np.zeros((n, len(vocabulary)))
+    np.add.at(matrix, (rows, cols), 1.0)
+    df = np.count_nonzero(matrix, axis=0)
+    matrix = np.log1p(matrix) * (np.log((n + 1) / (df + 1)) + 1.0)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    out_weights = similarity.sum(axis=1, keepdims=True)
+    # 孤立した文は全文へ均等に遷移させる
+    transition = np.divide(similarity, out_weights, out=np.full_like(similarity, 1.0 / n), where=out_weights > 0)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def textrank_summarize(text: str, max_length: int = 200) -> str:
+    """テキストをTextRankで抽出要約する
+
+    スコアの高い文から指定文字数に収まるものを選び、元の順序で連結する。
+    1文も収まらない場合は最重要文を省略記号付きで切り詰める。
+    """
+    if not text:
+        return ""
+
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+    if len(sentences) == 1:
+        sentence = sentences[0]
+        return sentence if len(sentence) <= max_length else sentence[: max_length - 3] + "..."
+
+    scores = rank_sentences(sentences)
+    selected = []
+    length = 0
+    for index in np.argsort(-scores, kind="stable"):
+        sentence = sentences[index]
+        # 欧文の文は空白で連結するため1文字分を見込む
+        extra = len(sentence) + (1 if selected else 0)
+        if length + extra <= max_length:
+            selected.append(int(index))
+            length += extra
+
+    if not selected:
+        best = sentences[int(np.argmax(scores))]
+        return best[: max_length - 3] + "..."
+
+    parts = [sentences[i] for i in sorted(selected)]
+    summary = parts[0]
+    for part in parts[1:]:
+        summary += part if summary.endswith(("。", "！", "？")) else " " + part
+    return summary
@@ -8,12 +8,19 @@ Google Gemini APIを使用してAI処理を行う
 """
 
 import os
+import time
 import logging
 import asyncio
-from typing import Optional, List
+from collections import deque
+from typing import Optional, List, AsyncIterator
 
 from google.api_core import exceptions as google_exceptions
 import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+from .dispatcher import PriorityDispatcher, PRIORITY_BACKGROUND
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, STATE_HALF_OPEN
+from .metrics import AIMetrics
 # from google.generativeai import types as genai_types # Old import
 # For new SDK, types are often directly under genai.types or not explicitly needed for basic usage
 
@@ -22,14 +29,61 @@ logger = logging.getLogger(__name__)
 class GeminiAPI:
     """Google Gemini API連携クラス"""
 
-    def __init__(self, api_key: str = None, model: str = "gemini-1.5-pro", api_keys: Optional[List[str]] = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        model: str = "gemini-1.5-pro",
+        api_keys: Optional[List[str]] = None,
+        max_concurrency: int = 4,
+        dispatcher: Optional[PriorityDispatcher] = None,
+        hedging: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_budget: float = 0.05,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        api_endpoint: Optional[str] = None,
+        metrics: Optional[AIMetrics] = None,
+    ):
         """
         初期化
 
         Args:
             api_key: Google Gemini API Key（指定がない場合は環境変数から取得）
             model: 使用するモデル名
+            max_concurrency: 同時に実行するAPIリクエストの上限（dispatcher未指定時）
+            dispatcher: 複数インスタンスで共有する優先度付きディスパッチャー
+            hedging: ヘッジリクエストを有効にするか（generate_textでhedge=Trueの呼び出しのみ対象）
+            hedge_percentile: ヘッジを送るまでの待機時間とする直近レイテンシのパーセンタイル
+            hedge_budget: ヘッジ対象リクエストに対する追加リクエストの割合の上限
+            circuit_breaker: 複数インスタンスで共有するサーキットブレーカー
+            api_endpoint: 接続先を変更する場合のエンドポイント（例: http://127.0.0.1:8765、
+                benchmarks/fake_gemini_server.py などの代替サーバー。REST接続になる）
+            metrics: 呼び出しごとの記録を集計する計測インスタンス
         """
+        # 呼び出しごとのレイテンシ・トークン数などの計測
+        self.metrics = metrics
+
+        # 代替サーバーなどへの接続先（未指定の場合はGoogleのAPI）
+        self.api_endpoint = api_endpoint or None
+
+        # 同時リクエスト数の制限と優先度制御（Q&Aをバックグラウンド処理より先に実行する）
+        self.dispatcher = dispatcher or PriorityDispatcher(max_concurrency)
+
+        # 障害時に即座に失敗させるためのサーキットブレーカー
+        self.circuit_breaker = circuit_breaker
+
+        # ヘッジリクエストの設定と統計
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = 20
+        self.hedge_min_delay = 1.0
+        self.hedge_default_delay = 10.0
+        self.hedge_wins = 0
+        self._hedgeable_requests = 0
+        self._hedged_requests = 0
+        self._latencies: deque = deque(maxlen=200)
+        self._key_clients = {}
+
         self.api_keys = [k for k in (api_keys or []) if k]
 
         if api_key:
@@ -85,7 +139,7 @@ class GeminiAPI:
         """APIキーに基づきクライアントを構成する"""
         if self.api_key:
             try:
-                genai.configure(api_key=self.api_key)
+                genai.configure(api_key=self.api_key, **self._transport_options())
                 # Safety settings can be configured here if needed, e.g.,
                 # safety_settings = [
                 #     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
@@ -122,6 +176,224 @@ class GeminiAPI:
         msg = str(error).lower()
         return "rate" in msg and "limit" in msg or "quota" in msg or "429" in msg
 
+    def _check_circuit(self) -> bool:
+        """
+        サーキットが開いている場合は即座に失敗させる
+
+        Returns:
+            この呼び出しが半開状態の試行リクエストの場合はTrue
+        """
+        if not self.circuit_breaker:
+            return False
+        trial = self.circuit_breaker.state == STATE_HALF_OPEN
+        if not self.circuit_breaker.allow_request():
+            raise CircuitOpenError("Gemini APIのサーキットブレーカーが開いているため呼び出しを行いません")
+        return trial
+
+    def _release_trial(self, trial: bool) -> None:
+        """キャンセルなどで結果を記録しないまま終わった試行リクエストの枠を返す"""
+        if trial and self.circuit_breaker:
+            self.circuit_breaker.release_trial()
+
+    def _record_success(self) -> None:
+        if self.circuit_breaker:
+            self.circuit_breaker.record_success()
+
+    def _record_failure(self, error: Exception, exhausted: bool) -> None:
+        """
+        呼び出しの失敗を記録する
+
+        別のAPIキーに切り替えて再試行するレート制限はキー単位の制限のため、失敗に数えない。
+        """
+        if self.circuit_breaker and (exhausted or not self._is_rate_limit_error(error)):
+            self.circuit_breaker.record_failure()
+
+    def _record_call(
+        self,
+        stage: str,
+        started: float,
+        retries: int,
+        response=None,
+        key_index: Optional[int] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """呼び出し1回分（リトライを含む）を計測に記録する"""
+        if not self.metrics:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        self.metrics.record(
+            stage,
+            model=self.model_name.replace("models/", "", 1),
+            key_index=key_index,
+            input_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            latency=time.monotonic() - started,
+            retries=retries,
+            error=type(error).__name__ if error else None,
+        )
+
+    def _build_generation_config(
+        self,
+        max_tokens: int,
+        temperature: float,
+        top_p: Optional[float],
+        top_k: Optional[int],
+    ):
+        """生成設定を作成する"""
+        generation_config_params = {
+            "max_output_tokens": max_tokens,
+            "temperature": temperature,
+        }
+        if top_p is not None:
+            generation_config_params["top_p"] = top_p
+        if top_k is not None:
+            generation_config_params["top_k"] = top_k
+        return genai.types.GenerationConfig(**generation_config_params)
+
+    def _transport_options(self) -> dict:
+        """クライアント構成時の接続オプション（接続先を変更する場合はREST接続にする）"""
+        if not self.api_endpoint:
+            return {}
+        return {"transport": "rest", "client_options": {"api_endpoint": self.api_endpoint}}
+
+    # 以下の2つはSDKの内部（_ClientManager、GenerativeModelのクライアント属性）に依存するため、
+    # requirements.txtでSDKのバージョンを固定し、tests/test_gemini_api.pyで動作を確認している
+    def _async_client_for_key(self, key_index: int):
+        """指定したAPIキー専用のクライアントを取得する（ヘッジ用、REST接続では同期クライアント）"""
+        client_obj = self._key_clients.get(key_index)
+        if client_obj is None:
+            manager = genai_client._ClientManager()
+            manager.configure(api_key=self.api_keys[key_index], **self._transport_options())
+            client_obj = manager.get_default_client("generative" if self.api_endpoint else "generative_async")
+            self._key_clients[key_index] = client_obj
+        return client_obj
+
+    def _model_for_key(self, key_index: int, system_instruction: Optional[str], generation_config):
+        """指定したAPIキーで呼び出すモデルを作成する（ヘッジ用）"""
+        model = genai.GenerativeModel(
+            self.model_name,
+            system_instruction=system_instruction,
+            generation_config=generation_config,
+        )
+        # グローバル設定のキーではなく、指定したキーのクライアントを使用する
+        if self.api_endpoint:
+            model._client = self._async_client_for_key(key_index)
+        else:
+            model._async_client = self._async_client_for_key(key_index)
+        return model
+
+    async def _call_model(self, model, prompt: str, generation_config, priority: int):
+        """実行枠を獲得してモデルを1回呼び出し、成功時のレイテンシを記録する"""
+        async with self.dispatcher.slot(priority):
+            started = time.monotonic()
+            request = {"contents": prompt}
+            if generation_config is not None:
+                request["generation_config"] = generation_config
+            if self.api_endpoint:
+                # REST接続の非同期呼び出しはイベントループを止めるため、同期呼び出しを別スレッドで実行する
+                response = await asyncio.to_thread(model.generate_content, **request)
+            else:
+                response = await model.generate_content_async(**request)
+            self._latencies.append(time.monotonic() - started)
+            return response
+
+    def _hedge_delay(self) -> float:
+        """ヘッジリクエストを送るまでの待機時間（直近レイテンシのパーセンタイル）"""
+        if len(self._latencies) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile))
+        return max(self.hedge_min_delay, ordered[index])
+
+    def _hedge_allowed(self) -> bool:
+        """追加リクエストの割合が予算内かどうか"""
+        return self._hedged_requests + 1 <= self.hedge_budget * self._hedgeable_requests
+
+    async def _generate_hedged(self, prompt: str, generation_config, system_instruction: Optional[str], priority: int):
+        """
+        ヘッジ付きでモデルを呼び出す
+
+        一定時間内に応答がなければ別のAPIキーで同じリクエストを送り、先に成功した応答を採用する。
+
+        Returns:
+            (応答, 応答したAPIキーのindex)のタプル
+        """
+        self._hedgeable_requests += 1
+        if system_instruction:
+            primary_model = genai.GenerativeModel(
+                self.model_name,
+                system_instruction=system_instruction,
+                generation_config=generation_config,
+            )
+            primary_config = None
+        else:
+            primary_model = self.generative_model
+            primary_config = generation_config
+
+        tasks = [asyncio.ensure_future(self._call_model(primary_model, prompt, primary_config, priority))]
+        key_indexes = [self.current_key_index]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay())
+            if not done:
+                if self._hedge_allowed():
+                    self._hedged_requests += 1
+                    alt_index = (self.current_key_index + 1) % len(self.api_keys)
+                    logger.info(f"応答が遅いため別のAPIキーでヘッジリクエストを送信します: index={alt_index}")
+                    alt_model = self._model_for_key(alt_index, system_instruction, generation_config)
+                    tasks.append(asyncio.ensure_future(self._call_model(alt_model, prompt, None, priority)))
+                    key_indexes.append(alt_index)
+                else:
+                    logger.debug("ヘッジ予算を超えているため、追加リクエストを送信しません")
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                        return task.result(), key_indexes[tasks.index(task)]
+                    error = error or task.exception()
+            raise error
+        finally:
+            # 負けた（または不要になった）リクエストはキャンセルする
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _extract_text(self, response) -> str:
+        """レスポンスからテキストを取り出す"""
+        # Accessing response text and handling potential errors/empty responses
+        try:
+            # The new SDK typically provides response.text directly.
+            # It might also have response.candidates for more detailed inspection if needed.
+            if hasattr(response, 'text') and response.text:
+                return response.text.strip()
+            # Fallback to candidates if .text is not fruitful, though less common for simple success
+            elif response.candidates and response.candidates[0].content.parts:
+                 all_parts = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
+                 if all_parts:
+                     return all_parts.strip()
+
+            # If no text, log and return empty or raise error
+            finish_reason = "N/A"
+            if response.candidates and hasattr(response.candidates[0], 'finish_reason'):
+                finish_reason = response.candidates[0].finish_reason.name
+            elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
+                 finish_reason = f"Blocked: {response.prompt_feedback.block_reason.name}"
+
+            logger.warning(f"APIレスポンスに有効なテキストがありません。Finish reason: {finish_reason}. Response: {response}")
+            return "" # Or raise an error depending on desired strictness
+
+        except ValueError as ve: # Handles cases where .text might raise ValueError (e.g. blocked content)
+            logger.warning(f"テキスト取得中にValueError: {ve}. Full response: {response}", exc_info=True)
+            return ""
+        except AttributeError as ae:
+             logger.warning(f"レスポンス属性エラー: {ae}. Full response: {response}", exc_info=True)
+             return ""
+
     async def generate_text(
         self,
         prompt: str,
@@ -130,105 +402,199 @@ class GeminiAPI:
         top_p: Optional[float] = 0.95, # Made Optional as per some SDK versions
         top_k: Optional[int] = 40,   # Made Optional
         system_instruction: Optional[str] = None,
+        priority: int = PRIORITY_BACKGROUND,
+        hedge: bool = False,
+        stage: str = "other",
     ) -> str:
         """
         テキストを生成する
+
+        priorityが小さいリクエストほど先に実行枠を獲得する。
+        実行枠はAPI呼び出し1回ごとに獲得・返却されるため、
+        バックグラウンド処理はリトライの合間に対話的リクエストへ枠を譲る。
+        hedge=Trueかつヘッジが有効な場合、応答が遅ければ別のAPIキーへ重複リクエストを送る。
+        サーキットブレーカーが開いている間はリトライや待機をせずCircuitOpenErrorを送出する。
+        stageは計測の集計単位（summary, title, classify, keywords, qa など）。
         """
         if not self.generative_model:
             raise ValueError("Gemini APIが正しく初期化されていません (モデル未設定)。APIキーを確認してください。")
+        started = time.monotonic()
+        try:
+            trial = self._check_circuit()
+        except CircuitOpenError as e:
+            self._record_call(stage, started, 0, error=e)
+            raise
 
         consecutive_limits = 0
         max_retries_per_key_cycle = len(self.api_keys) * 2 if self.api_keys else 1
 
-        while True:
-            try:
-                generation_config_params = {
-                    "max_output_tokens": max_tokens,
-                    "temperature": temperature,
-                }
-                if top_p is not None:
-                    generation_config_params["top_p"] = top_p
-                if top_k is not None:
-                    generation_config_params["top_k"] = top_k
-
-                current_generation_config = genai.types.GenerationConfig(**generation_config_params)
-
-                # Use the model instance's system_instruction if provided during its init,
-                # or create a new model instance if system_instruction is provided now.
-                model_to_use = self.generative_model
-                if system_instruction:
-                    # This creates a new model instance for this call if system_instruction is different or not set.
-                    # Consider if this is desired behavior due to potential overhead.
-                    # For persistent system instructions, set it when initializing GeminiAPI or its model.
-                    # logger.info(f"Using dynamic system instruction for this call.")
-                    model_to_use = genai.GenerativeModel(
-                        self.model_name,
-                        system_instruction=system_instruction,
-                        generation_config=current_generation_config # Pass config here
-                    )
-                    # When model is created with system_instruction, pass only prompt to generate_content_async
-                    response = await model_to_use.generate_content_async(contents=prompt)
-                else:
-                    # If no system_instruction for this call, use the existing model with new config for this call
-                    response = await model_to_use.generate_content_async(
-                        contents=prompt,
-                        generation_config=current_generation_config
-                    )
-
-                # Accessing response text and handling potential errors/empty responses
+        try:
+            while True:
                 try:
-                    # The new SDK typically provides response.text directly.
-                    # It might also have response.candidates for more detailed inspection if needed.
-                    if hasattr(response, 'text') and response.text:
-                        return response.text.strip()
-                    # Fallback to candidates if .text is not fruitful, though less common for simple success
-                    elif response.candidates and response.candidates[0].content.parts:
-                         all_parts = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
-                         if all_parts:
-                             return all_parts.strip()
-
-                    # If no text, log and return empty or raise error
-                    finish_reason = "N/A"
-                    if response.candidates and hasattr(response.candidates[0], 'finish_reason'):
-                        finish_reason = response.candidates[0].finish_reason.name
-                    elif hasattr(response, 'prompt_feedback') and response.prompt_feedback.block_reason:
-                         finish_reason = f"Blocked: {response.prompt_feedback.block_reason.name}"
-
-                    logger.warning(f"APIレスポンスに有効なテキストがありません。Finish reason: {finish_reason}. Response: {response}")
-                    return "" # Or raise an error depending on desired strictness
-
-                except ValueError as ve: # Handles cases where .text might raise ValueError (e.g. blocked content)
-                    logger.warning(f"テキスト取得中にValueError: {ve}. Full response: {response}", exc_info=True)
-                    return ""
-                except AttributeError as ae:
-                     logger.warning(f"レスポンス属性エラー: {ae}. Full response: {response}", exc_info=True)
-                     return ""
+                    current_generation_config = self._build_generation_config(max_tokens, temperature, top_p, top_k)
+
+                    key_index = self.current_key_index
+                    if hedge and self.hedging and len(self.api_keys) > 1:
+                        response, key_index = await self._generate_hedged(
+                            prompt, current_generation_config, system_instruction, priority
+                        )
+                    elif system_instruction:
+                        # Use the model instance's system_instruction if provided during its init,
+                        # or create a new model instance if system_instruction is provided now.
+                        # This creates a new model instance for this call if system_instruction is different or not set.
+                        # For persistent system instructions, set it when initializing GeminiAPI or its model.
+                        model_to_use = genai.GenerativeModel(
+                            self.model_name,
+                            system_instruction=system_instruction,
+                            generation_config=current_generation_config # Pass config here
+                        )
+                        # When model is created with system_instruction, pass only prompt to generate_content_async
+                        response = await self._call_model(model_to_use, prompt, None, priority)
+                    else:
+                        # If no system_instruction for this call, use the existing model with new config for this call
+                        response = await self._call_model(
+                            self.generative_model, prompt, current_generation_config, priority
+                        )
+
+                    self._record_success()
+                    self._record_call(stage, started, consecutive_limits, response=response, key_index=key_index)
+                    return self._extract_text(response)
+
+                except Exception as e:
+                    self._record_failure(e, exhausted=consecutive_limits + 1 >= max_retries_per_key_cycle)
+                    if self.circuit_breaker and self.circuit_breaker.is_open:
+                        self._record_call(stage, started, consecutive_limits, error=e)
+                        raise CircuitOpenError("Gemini APIの失敗が続いたためサーキットブレーカーが開きました") from e
+
+                    if self._is_rate_limit_error(e) and self.api_keys and len(self.api_keys) > 0:
+                        consecutive_limits += 1
+                        logger.warning(f"レート制限エラー。APIキーを切り替えて再試行します (試行 {consecutive_limits}/{max_retries_per_key_cycle})")
+
+                        if consecutive_limits >= max_retries_per_key_cycle:
+                            logger.error("全てのAPIキーでレート制限に達しました。30秒待機後、エラーを送出します。")
+                            await asyncio.sleep(30)
+                            self._record_call(stage, started, consecutive_limits, error=e)
+                            raise # Re-raise the exception after exhausting retries
+
+                        self._switch_api_key() # Switch key
+                        if not self.api_key: # If switching results in no valid key
+                            logger.error("有効なAPIキーが見つかりませんでした。エラーを送出します。")
+                            self._record_call(stage, started, consecutive_limits, error=e)
+                            raise ValueError("No valid API key available after switching.")
+
+                        if consecutive_limits % len(self.api_keys) == 0 and len(self.api_keys) > 1: # If cycled through all keys once
+                             logger.info(f"APIキーを1周しました。10秒待機します。")
+                             await asyncio.sleep(10)
+                        else: # Wait a bit before retrying with new key
+                            await asyncio.sleep(1) # Short delay before retry
+                        continue # Retry the while loop
+
+                    logger.error(f"テキスト生成中に予期せぬエラーが発生しました: {e}", exc_info=True)
+                    self._record_call(stage, started, consecutive_limits, error=e)
+                    raise # Re-raise other exceptions
+        finally:
+            self._release_trial(trial)
+
+    async def generate_text_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        top_p: Optional[float] = 0.95,
+        top_k: Optional[int] = 40,
+        system_instruction: Optional[str] = None,
+        priority: int = PRIORITY_BACKGROUND,
+        stage: str = "other",
+    ) -> AsyncIterator[str]:
+        """
+        テキストをストリーミング生成する
 
+        生成されたテキストを断片ごとにyieldする。
+        レート制限によるAPIキーの切り替えは、最初の断片を返す前のみ行う。
+        """
+        if not self.generative_model:
+            raise ValueError("Gemini APIが正しく初期化されていません (モデル未設定)。APIキーを確認してください。")
 
-            except Exception as e:
-                if self._is_rate_limit_error(e) and self.api_keys and len(self.api_keys) > 0:
-                    consecutive_limits += 1
-                    logger.warning(f"レート制限エラー。APIキーを切り替えて再試行します (試行 {consecutive_limits}/{max_retries_per_key_cycle})")
-
-                    if consecutive_limits >= max_retries_per_key_cycle:
-                        logger.error("全てのAPIキーでレート制限に達しました。30秒待機後、エラーを送出します。")
-                        await asyncio.sleep(30)
-                        raise # Re-raise the exception after exhausting retries
-
-                    self._switch_api_key() # Switch key
-                    if not self.api_key: # If switching results in no valid key
-                        logger.error("有効なAPIキーが見つかりませんでした。エラーを送出します。")
-                        raise ValueError("No valid API key available after switching.")
-
-                    if consecutive_limits % len(self.api_keys) == 0 and len(self.api_keys) > 1: # If cycled through all keys once
-                         logger.info(f"APIキーを1周しました。10秒待機します。")
-                         await asyncio.sleep(10)
-                    else: # Wait a bit before retrying with new key
-                        await asyncio.sleep(1) # Short delay before retry
-                    continue # Retry the while loop
-
-                logger.error(f"テキスト生成中に予期せぬエラーが発生しました: {e}", exc_info=True)
-                raise # Re-raise other exceptions
+        if self.api_endpoint:
+            # REST接続ではストリーミングせず、応答全体を1つの断片として返す
+            text = await self.generate_text(
+                prompt, max_tokens, temperature, top_p, top_k, system_instruction, priority=priority, stage=stage
+            )
+            if text:
+                yield text
+            return
+
+        started = time.monotonic()
+        try:
+            trial = self._check_circuit()
+        except CircuitOpenError as e:
+            self._record_call(stage, started, 0, error=e)
+            raise
+
+        generation_config = self._build_generation_config(max_tokens, temperature, top_p, top_k)
+
+        attempts = 0
+        max_attempts = len(self.api_keys) * 2 if self.api_keys else 1
+        try:
+            while True:
+                yielded = False
+                try:
+                    if system_instruction:
+                        model_to_use = genai.GenerativeModel(
+                            self.model_name,
+                            system_instruction=system_instruction,
+                            generation_config=generation_config,
+                        )
+                        request = {"contents": prompt, "stream": True}
+                    else:
+                        model_to_use = self.generative_model
+                        request = {"contents": prompt, "generation_config": generation_config, "stream": True}
+
+                    # ストリームの読み出しが終わるまで実行枠を保持する
+                    key_index = self.current_key_index
+                    last_chunk = None
+                    async with self.dispatcher.slot(priority):
+                        response = await model_to_use.generate_content_async(**request)
+                        async for chunk in response:
+                            # トークン数は最後の断片のusage_metadataに含まれる
+                            last_chunk = chunk
+                            try:
+                                text = chunk.text
+                            except ValueError:
+                                # ブロックされた断片などはスキップする
+                                continue
+                            if text:
+                                yielded = True
+                                yield text
+                    self._record_success()
+                    self._record_call(stage, started, attempts, response=last_chunk, key_index=key_index)
+                    return
+
+                except Exception as e:
+                    self._record_failure(e, exhausted=yielded or attempts + 1 >= max_attempts)
+                    if not yielded and self.circuit_breaker and self.circuit_breaker.is_open:
+                        self._record_call(stage, started, attempts, error=e)
+                        raise CircuitOpenError("Gemini APIの失敗が続いたためサーキットブレーカーが開きました") from e
+                    if not yielded and self._is_rate_limit_error(e) and self.api_keys:
+                        attempts += 1
+                        if attempts >= max_attempts:
+                            logger.error("全てのAPIキーでレート制限に達しました。ストリーミング生成を中止します。")
+                            self._record_call(stage, started, attempts, error=e)
+                            raise
+                        logger.warning(f"レート制限エラー。APIキーを切り替えてストリーミングを再試行します (試行 {attempts}/{max_attempts})")
+                        self._switch_api_key()
+                        if not self.api_key:
+                            self._record_call(stage, started, attempts, error=e)
+                            raise ValueError("No valid API key available after switching.")
+                        await asyncio.sleep(1)
+                        continue
+
+                    logger.error(f"ストリーミング生成中に予期せぬエラーが発生しました: {e}", exc_info=True)
+                    self._record_call(stage, started, attempts, error=e)
+                    raise
+        finally:
+            # 購読者がストリームを途中で閉じた場合（GeneratorExit）も試行の枠を返す
+            self._release_trial(trial)
 
     async def close(self):
         """互換性のために存在するダミーメソッド"""
@@ -249,13 +615,18 @@ async def test_gemini_api():
     if not api_keys_list and os.environ.get("GEMINI_API_KEY"):
         api_keys_list.append(os.environ.get("GEMINI_API_KEY"))
 
+    # GEMINI_API_ENDPOINT を指定するとローカルの代替サーバー（benchmarks/fake_gemini_server.py）に接続する
+    api_endpoint = os.environ.get("GEMINI_API_ENDPOINT")
+    if not api_keys_list and api_endpoint:
+        api_keys_list.append("fake-key")
+
     if not api_keys_list:
         print("環境変数 GEMINI_API_KEY または GEMINI_API_KEYS が設定されていません")
         return
     
     # APIインスタンスの作成 (最初のキーをプライマリとして渡すか、リストのみ渡す)
     # api = GeminiAPI(api_key=api_keys_list[0], api_keys=api_keys_list)
-    api = GeminiAPI(api_keys=api_keys_list, model="gemini-1.5-flash") # Using flash for testing
+    api = GeminiAPI(api_keys=api_keys_list, model="gemini-1.5-flash", api_endpoint=api_endpoint) # Using flash for testing
     
     try:
         # テキスト生成のテスト
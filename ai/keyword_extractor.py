@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ローカルキーワード抽出
+
+TF-IDFで記事や質問から検索用キーワードを抽出する。
+文書頻度（DF）はArticleStoreが保持するコーパス全体の統計を用いる。
+検索用キーワード（keywords_en）は英語で照合するため、英語の語だけを残す。
+"""
+
+import re
+import math
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 英単語・カタカナ語・漢字語を抽出する
+_TERM_RE = re.compile(
+    r"[a-z][a-z0-9]*(?:[+\-.][a-z0-9]+)*\+*"
+    r"|[0-9]+[a-z][a-z0-9]*"
+    r"|[ァ-ヺー]{2,}"
+    r"|[一-鿿々]{2,}"
+)
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down during each
+    few for from further had has have having he her here hers him his how i if in into is
+    it its itself just me more most my no nor not now of off on once only or other our
+    ours out over own same she should so some such than that the their theirs them then
+    there these they this those through to too under until up very was we were what when
+    where which while who whom why will with would you your yours new says said one two
+    may might must get got make made like via per
+    """.split()
+)
+
+
+def is_english_term(term: str) -> bool:
+    """索引語が英単語（英数字）かどうか"""
+    return term[:1].isascii()
+
+
+class KeywordExtractor:
+    """TF-IDFによるキーワード抽出クラス"""
+
+    def __init__(self, title_weight: int = 2):
+        """
+        初期化
+
+        Args:
+            title_weight: タイトル中の語の出現回数に掛ける重み
+        """
+        self.title_weight = title_weight
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        テキストを索引語のリストに分割する
+
+        Args:
+            text: 対象テキスト
+
+        Returns:
+            出現順の索引語リスト（重複あり）
+        """
+        if not text:
+            return []
+        return [
+            term for term in _TERM_RE.findall(text.lower())
+            if len(term) > 1 and term not in STOPWORDS
+        ]
+
+    def term_frequencies(self, title: str, content: str) -> Dict[str, int]:
+        """
+        記事の語の出現回数を数える（タイトルは重み付け）
+
+        Args:
+            title: 記事タイトル
+            content: 記事本文
+
+        Returns:
+            語と出現回数の辞書（挿入順は初出順）
+        """
+        tf: Dict[str, int] = {}
+        for term in self.tokenize(title):
+            tf[term] = tf.get(term, 0) + self.title_weight
+        for term in self.tokenize(content):
+            tf[term] = tf.get(term, 0) + 1
+        return tf
+
+    @staticmethod
+    def rank(
+        term_frequencies: Dict[str, int],
+        document_frequencies: Optional[Dict[str, int]] = None,
+        total_documents: int = 0,
+        top_k: int = 7,
+    ) -> List[str]:
+        """
+        TF-IDFで語を順位付けする
+
+        Args:
+            term_frequencies: 語と出現回数の辞書
+            document_frequencies: 語と文書頻度の辞書
+            total_documents: コーパスの総文書数
+            top_k: 返す語の最大数
+
+        Returns:
+            スコアの高い順のキーワードリスト
+        """
+        document_frequencies = document_frequencies or {}
+        order = {term: i for i, term in enumerate(term_frequencies)}
+
+        def score(term: str) -> float:
+            idf = math.log((total_documents + 1) / (document_frequencies.get(term, 0) + 1)) + 1
+            return (1 + math.log(term_frequencies[term])) * idf
+
+        ranked = sorted(term_frequencies, key=lambda term: (-score(term), order[term]))
+        return ranked[:top_k]
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+言語判定
+
+文字種（ひらがな・カタカナ・漢字・ラテン文字）の比率から、記事が日本語かどうかを
+ローカルで判定する。翻訳が不要な記事でAPI呼び出しを省くために使用する。
+"""
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 判定に使う先頭部分の文字数
+SAMPLE_CHARS = 600
+# 文字種で判定するのに必要な最小文字数（これより少ない場合はフィードの言語を使う）
+MIN_LETTERS = 8
+# 日本語とみなす、文字全体に対するかな・漢字の比率
+JAPANESE_RATIO = 0.3
+# 漢字のみの文章（中国語）と区別するための、日本語文字に対するかなの最小比率
+KANA_RATIO = 0.1
+
+
+def script_ratios(text: str) -> Dict[str, float]:
+    """
+    文字種ごとの比率を計算する
+
+    Args:
+        text: 対象テキスト（先頭SAMPLE_CHARS文字のみ使用）
+
+    Returns:
+        {"letters": 文字数, "kana": かなの比率, "kanji": 漢字の比率, "latin": ラテン文字の比率}
+    """
+    kana = kanji = latin = 0
+    for ch in (text or "")[:SAMPLE_CHARS]:
+        code = ord(ch)
+        if 0x3040 <= code <= 0x30FF or 0xFF66 <= code <= 0xFF9F:
+            kana += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF:
+            kanji += 1
+        elif ch.isascii() and ch.isalpha():
+            latin += 1
+    letters = kana + kanji + latin
+    if not letters:
+        return {"letters": 0, "kana": 0.0, "kanji": 0.0, "latin": 0.0}
+    return {
+        "letters": letters,
+        "kana": kana / letters,
+        "kanji": kanji / letters,
+        "latin": latin / letters,
+    }
+
+
+def is_japanese(text: str, declared_language: Optional[str] = None) -> bool:
+    """
+    テキストが日本語かどうかを判定する
+
+    文字種の比率で判定し、判定に十分な文字がない場合はフィードが宣言する言語を使う。
+
+    Args:
+        text: 対象テキスト
+        declared_language: フィードの言語（例: "ja", "en-US"）
+
+    Returns:
+        日本語の場合はTrue
+    """
+    ratios = script_ratios(text)
+    if ratios["letters"] < MIN_LETTERS:
+        return (declared_language or "").lower().startswith("ja")
+
+    japanese = ratios["kana"] + ratios["kanji"]
+    return japanese >= JAPANESE_RATIO and ratios["kana"] >= japanese * KANA_RATIO
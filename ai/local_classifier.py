@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ローカル分類器
+
+LLMが分類済みの記事から逐次学習する多項ナイーブベイズ分類器。
+特徴量はハッシュ化したn-gram（英単語のunigram/bigramと、日本語などの文字bigram）を用いる。
+確信度が閾値を超えた場合はLLM呼び出しを省略できる。
+"""
+
+import os
+import re
+import json
+import math
+import zlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f\s、。，．・「」『』（）()！？!?]+")
+
+
+class LocalClassifier:
+    """ハッシュ化n-gramによる多項ナイーブベイズ分類器"""
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        n_features: int = 2 ** 18,
+        alpha: float = 0.1,
+        save_interval: int = 10,
+    ):
+        """
+        初期化
+
+        Args:
+            model_path: モデルファイルのパス（Noneの場合は保存しない）
+            n_features: ハッシュ空間の大きさ
+            alpha: ラプラス平滑化の係数
+            save_interval: 何件学習するごとにモデルを保存するか
+        """
+        self.model_path = model_path
+        self.n_features = n_features
+        self.alpha = alpha
+        self.save_interval = max(1, save_interval)
+
+        self.doc_counts: Dict[str, int] = {}
+        self.feature_counts: Dict[str, Dict[int, int]] = {}
+        self.feature_totals: Dict[str, int] = {}
+        self._unsaved = 0
+
+        if model_path:
+            self.load()
+
+    @property
+    def sample_count(self) -> int:
+        """学習済みサンプル数"""
+        return sum(self.doc_counts.values())
+
+    def _features(self, text: str) -> Dict[int, int]:
+        """テキストをハッシュ化した特徴量の出現回数に変換する"""
+        text = text.lower()
+        grams: List[str] = []
+
+        words = _WORD_RE.findall(text)
+        grams.extend(words)
+        grams.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+        for run in _NON_ASCII_RE.findall(text):
+            if len(run) == 1:
+                grams.append(run)
+            else:
+                grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+
+        features: Dict[int, int] = {}
+        for gram in grams:
+            index = zlib.crc32(gram.encode("utf-8")) % self.n_features
+            features[index] = features.get(index, 0) + 1
+        return features
+
+    def learn(self, text: str, label: str) -> None:
+        """
+        分類済みのテキストを1件学習する
+
+        Args:
+            text: 分類対象のテキスト
+            label: 正解ラベル
+        """
+        features = self._features(text)
+        if not features:
+            return
+
+        self.doc_counts[label] = self.doc_counts.get(label, 0) + 1
+        counts = self.feature_counts.setdefault(label, {})
+        total = 0
+        for index, count in features.items():
+            counts[index] = counts.get(index, 0) + count
+            total += count
+        self.feature_totals[label] = self.feature_totals.get(label, 0) + total
+
+        self._unsaved += 1
+        if self.model_path and self._unsaved >= self.save_interval:
+            self.save()
+
+    def trained_labels(self, labels: List[str], min_samples: int = 1) -> List[str]:
+        """
+        候補ラベルのうち、min_samples件以上学習したラベルを返す
+
+        Args:
+            labels: 候補ラベル
+            min_samples: ラベルごとに必要な学習件数
+        """
+        return [label for label in labels if self.doc_counts.get(label, 0) >= max(1, min_samples)]
+
+    def predict(self, text: str, labels: Optional[List[str]] = None) -> Tuple[Optional[str], float]:
+        """
+        テキストのラベルを予測する
+
+        確信度は未学習のラベルを含むすべての候補ラベルに対して求める。未学習のラベルは
+        すべての特徴量が等確率とみなすため、学習済みのラベルで説明できない記事の確信度は低くなる。
+
+        Args:
+            text: 分類対象のテキスト
+            labels: 候補ラベル（指定がない場合は学習済みの全ラベル）
+
+        Returns:
+            (学習済みラベルのうち最も確からしいもの, 確信度)のタプル。予測できない場合は(None, 0.0)
+        """
+        candidates = list(dict.fromkeys(labels or list(self.doc_counts)))
+        features = self._features(text)
+        if not features or not any(self.doc_counts.get(label) for label in candidates):
+            return None, 0.0
+
+        # 未学習のラベルの事前確率は学習済みラベルの平均とし、尤度だけで比べる
+        trained = [label for label in candidates if self.doc_counts.get(label)]
+        total_docs = sum(self.doc_counts[label] for label in trained)
+        priors = {label: math.log(self.doc_counts[label] / total_docs) for label in trained}
+        default_prior = sum(priors.values()) / len(priors)
+        smoothing = self.alpha * self.n_features
+        scores = {}
+        for label in candidates:
+            counts = self.feature_counts.get(label, {})
+            denominator = math.log(self.feature_totals.get(label, 0) + smoothing)
+            score = priors.get(label, default_prior)
+            for index, count in features.items():
+                score += count * (math.log(counts.get(index, 0) + self.alpha) - denominator)
+            scores[label] = score
+
+        # softmaxで確信度を求める
+        best = max(trained, key=scores.get)
+        top = max(scores.values())
+        norm = sum(math.exp(score - top) for score in scores.values())
+        return best, math.exp(scores[best] - top) / norm
+
+    def load(self) -> bool:
+        """
+        モデルをファイルから読み込む
+
+        Returns:
+            読み込み成功の場合はTrue
+        """
+        if not self.model_path or not os.path.exists(self.model_path):
+            return False
+        try:
+            with open(self.model_path, "r", encoding="utf-8") as f:
+                data: Dict[str, Any] = json.load(f)
+            if data.get("n_features") != self.n_features:
+                logger.warning("ローカル分類器の特徴量サイズが異なるため、モデルを破棄します")
+                return False
+            self.doc_counts = data.get("doc_counts", {})
+            self.feature_totals = data.get("feature_totals", {})
+            self.feature_counts = {
+                label: {int(index): count for index, count in counts.items()}
+                for label, counts in data.get("feature_counts", {}).items()
+            }
+            logger.info(f"ローカル分類器を読み込みました: {self.model_path} ({self.sample_count}件)")
+            return True
+        except Exception as e:
+            logger.error(f"ローカル分類器の読み込み中にエラーが発生しました: {e}", exc_info=True)
+            return False
+
+    def save(self) -> bool:
+        """
+        モデルをファイルに保存する
+
+        Returns:
+            保存成功の場合はTrue
+        """
+        if not self.model_path:
+            return False
+        try:
+            directory = os.path.dirname(self.model_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.model_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "n_features": self.n_features,
+                        "doc_counts": self.doc_counts,
+                        "feature_totals": self.feature_totals,
+                        "feature_counts": self.feature_counts,
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.model_path)
+            self._unsaved = 0
+            return True
+        except Exception as e:
+            logger.error(f"ローカル分類器の保存中にエラーが発生しました: {e}", exc_info=True)
+            return False
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AI呼び出しの計測
+
+AI処理の段階（要約、タイトル翻訳、分類、キーワード抽出、Q&Aなど）ごとに、
+Gemini APIの呼び出し1回ごとの記録を集計し、レイテンシのヒストグラムと
+トークン数・リトライ数などのカウンタとして提供する。
+"""
+
+import time
+import logging
+from bisect import bisect_left
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# レイテンシのヒストグラムの境界（秒、最後のバケットは上限なし）
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _StageStats:
+    """1つの段階の集計"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latency_total = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.models: Dict[str, int] = defaultdict(int)
+        self.keys: Dict[int, int] = defaultdict(int)
+
+    def to_dict(self) -> Dict[str, Any]:
+        measured = self.calls - self.cache_hits
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_avg": self.latency_total / measured if measured else 0.0,
+            "latency_p50": self._percentile(0.5),
+            "latency_p95": self._percentile(0.95),
+            "latency_histogram": {
+                (f"le_{bound}" if i < len(LATENCY_BUCKETS) else "inf"): count
+                for i, (bound, count) in enumerate(zip(LATENCY_BUCKETS + (None,), self.latency_buckets))
+            },
+            "models": dict(self.models),
+            "keys": {str(k): v for k, v in self.keys.items()},
+        }
+
+    def _percentile(self, p: float) -> Optional[float]:
+        """ヒストグラムからパーセンタイルを推定する（該当バケットの上限）"""
+        total = sum(self.latency_buckets)
+        if not total:
+            return None
+        threshold = total * p
+        seen = 0
+        for i, count in enumerate(self.latency_buckets):
+            seen += count
+            if seen >= threshold:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+        return None
+
+
+class AIMetrics:
+    """AI呼び出しの記録と集計を行うクラス"""
+
+    def __init__(self, max_records: int = 500):
+        """
+        初期化
+
+        Args:
+            max_records: 保持する直近の呼び出し記録の件数
+        """
+        self.started_at = time.time()
+        self._stages: Dict[str, _StageStats] = defaultdict(_StageStats)
+        self._records: deque = deque(maxlen=max_records)
+
+    def record(
+        self,
+        stage: str,
+        model: str = "",
+        key_index: Optional[int] = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        latency: float = 0.0,
+        retries: int = 0,
+        cache_hit: bool = False,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        呼び出し1回分を記録する
+
+        Args:
+            stage: 処理の段階（summary, title, classify, keywords, qa など）
+            model: モデル名
+            key_index: 使用したAPIキーのindex
+            input_tokens: 入力トークン数
+            output_tokens: 出力トークン数
+            latency: リトライを含む所要時間（秒）
+            retries: リトライ回数
+            cache_hit: キャッシュから応答した場合はTrue（APIを呼んでいない）
+            error: 失敗した場合のエラー内容
+        """
+        stats = self._stages[stage or "other"]
+        stats.calls += 1
+        stats.retries += retries
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        if error:
+            stats.errors += 1
+        if cache_hit:
+            stats.cache_hits += 1
+        else:
+            stats.latency_total += latency
+            stats.latency_buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        if model:
+            stats.models[model] += 1
+        if key_index is not None:
+            stats.keys[key_index] += 1
+
+        self._records.append({
+            "time": time.time(),
+            "stage": stage,
+            "model": model,
+            "key_index": key_index,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "latency": round(latency, 4),
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "error": error,
+        })
+
+    def snapshot(self, recent: int = 20) -> Dict[str, Any]:
+        """
+        集計結果を取得する
+
+        Args:
+            recent: 含める直近の呼び出し記録の件数
+
+        Returns:
+            段階ごとの集計と全体の合計、直近の記録
+        """
+        stages = {name: stats.to_dict() for name, stats in sorted(self._stages.items())}
+        totals = {
+            field: sum(stage[field] for stage in stages.values())
+            for field in ("calls", "errors", "retries", "cache_hits", "input_tokens", "output_tokens")
+        }
+        records: List[Dict[str, Any]] = list(self._records)[-recent:] if recent > 0 else []
+        return {
+            "since": self.started_at,
+            "totals": totals,
+            "stages": stages,
+            "recent": records,
+        }
+
+    def reset(self) -> None:
+        """集計をリセットする"""
+        self.started_at = time.time()
+        self._stages.clear()
+        self._records.clear()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+質問応答キャッシュ
+
+元記事（メッセージID）ごとの検索コンテキストと、正規化した質問ごとの回答を
+TTLとLRUで管理する。
+"""
+
+import re
+import time
+import logging
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_IGNORED_CATEGORIES = ("P", "Z", "S", "C")
+_QUESTION_SUFFIX_RE = re.compile(r"(でしょうか|でしたか|ましたか|ですか|ますか|か)$")
+
+
+def normalize_question(question: str) -> str:
+    """
+    質問文を正規化する
+
+    全角・半角や大文字・小文字の違い、記号・空白、末尾の疑問表現を無視する。
+    """
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    text = "".join(ch for ch in text if not unicodedata.category(ch).startswith(_IGNORED_CATEGORIES))
+    return _QUESTION_SUFFIX_RE.sub("", text)
+
+
+# 正規化した質問を文字種ごとのまとまりに分け、助詞だけのまとまりを除いたものを内容語とみなす
+_TOKEN_RE = re.compile(r"[\u4e00-\u9fff々〆]+|[\u3040-\u309f]+|[\u30a0-\u30ffー]+|[^\u3040-\u30ff\u4e00-\u9fff々〆ー]+")
+_PARTICLES = frozenset(("は", "が", "を", "に", "で", "と", "の", "も", "へ", "や", "から", "まで", "より", "って"))
+
+
+def content_tokens(normalized: str) -> Tuple[str, ...]:
+    """
+    正規化した質問の内容語を語順によらない形で返す
+
+    「上がる」と「下がる」、「利上げ」と「利下げ」のように1文字だけ異なる質問は
+    異なる内容語になる。
+    """
+    return tuple(sorted(t for t in _TOKEN_RE.findall(normalized) if t not in _PARTICLES))
+
+
+class TTLCache:
+    """有効期限付きのLRUキャッシュ"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        """
+        初期化
+
+        Args:
+            max_size: 保持する最大件数
+            ttl: 有効期限（秒）
+        """
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """値を取得する（期限切れの場合はNone）"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """値を保存する（上限を超えた場合は最も古く使われた値を削除）"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """値を削除して返す"""
+        item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def keys(self) -> List[Hashable]:
+        """保持しているキーのリスト（期限切れを含む）"""
+        return list(self._data.keys())
+
+
+class QACache:
+    """質問応答キャッシュクラス"""
+
+    def __init__(
+        self,
+        max_answers: int = 1024,
+        max_contexts: int = 256,
+        ttl: float = 3600,
+    ):
+        """
+        初期化
+
+        Args:
+            max_answers: 保持する回答の最大件数
+            max_contexts: 保持する検索コンテキストの最大件数
+            ttl: 有効期限（秒）
+        """
+        self.answers = TTLCache(max_answers, ttl)
+        self.contexts = TTLCache(max_contexts, ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get_context(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """
+        検索コンテキストを取得する
+
+        Returns:
+            {"keywords": [...], "related_ids": [...]}、キャッシュにない場合はNone
+        """
+        return self.contexts.get(message_id)
+
+    def set_context(self, message_id: str, keywords: List[str], related_ids: List[str]) -> None:
+        """検索コンテキストを保存する"""
+        self.contexts.set(message_id, {"keywords": list(keywords), "related_ids": list(related_ids)})
+
+    def get_answer(self, message_id: str, question: str) -> Optional[str]:
+        """
+        同一の質問（正規化後に一致、または語順・助詞だけが異なる質問）に対する回答を取得する
+
+        Returns:
+            キャッシュされた回答、ない場合はNone
+        """
+        normalized = normalize_question(question)
+        answer = self.answers.get((message_id, normalized))
+        if answer is None and normalized:
+            answer = self._find_equivalent(message_id, normalized)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def _find_equivalent(self, message_id: str, normalized: str) -> Optional[str]:
+        """同じ元記事に対する、内容語がすべて一致する質問の回答を探す"""
+        target = content_tokens(normalized)
+        if not target:
+            return None
+        for key in reversed(self.answers.keys()):
+            cached_id, cached_question = key
+            if cached_id != message_id or not cached_question:
+                continue
+            if content_tokens(cached_question) == target:
+                answer = self.answers.get(key)
+                if answer is not None:
+                    return answer
+        return None
+
+    def set_answer(self, message_id: str, question: str, answer: str) -> None:
+        """回答を保存する"""
+        self.answers.set((message_id, normalize_question(question)), answer)
@@ -9,93 +9,234 @@
 
 import logging
 import re
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, Optional, List, Tuple
 
 from .gemini_api import GeminiAPI
+from .dispatcher import PRIORITY_BACKGROUND, PRIORITY_FANOUT
+from .circuit_breaker import CircuitOpenError
 
-from .simple_summarizer import simple_summarize
+from .extractive_summarizer import textrank_summarize
 
 logger = logging.getLogger(__name__)
 
 class Summarizer:
     """要約クラス"""
-    
-    def __init__(self, api, system_instruction: Optional[str] = None):
+
+    def __init__(
+        self,
+        api,
+        system_instruction: Optional[str] = None,
+        chunk_threshold: int = 8000,
+        chunk_size: int = 4000,
+        degraded: bool = False,
+    ):
         """
         初期化
-        
+
         Args:
             api: APIインスタンス（GeminiAPI）
+            system_instruction: システムインストラクション
+            chunk_threshold: この文字数を超える本文はチャンク分割して要約する（0以下で無効）
+            chunk_size: 1チャンクあたりの最大文字数
+            degraded: 縮退モード（APIを呼ばずに抽出型要約のみを行う）
         """
         self.api = api
         self.system_instruction = system_instruction or (
             "あなたは日本語編集者です。要点を抽出し、日本語のみで短くまとめます。"
             "長文は読みやすいように適度に改行してください。"
         )
+        self.chunk_threshold = chunk_threshold
+        self.chunk_size = max(1, chunk_size)
+        self.degraded = degraded
         logger.info("要約機能を初期化しました")
-    
-    async def summarize(self, text: str, max_length: int = 4000, summary_type: str = "normal") -> str:
+
+    async def summarize(
+        self, text: str, max_length: int = 4000, summary_type: str = "normal", japanese: bool = False
+    ) -> str:
         """
         テキストを要約する
-        
+
         Args:
             text: 要約するテキスト
             max_length: 要約の最大文字数
-            
+            summary_type: 要約タイプ（short/normal/long/title）
+            japanese: 原文が日本語の場合はTrue（翻訳を指示しない短いプロンプトを使う）
+
         Returns:
             要約されたテキスト
         """
+        summary, _ = await self.summarize_with_status(text, max_length, summary_type, japanese)
+        return summary
+
+    async def summarize_with_status(
+        self, text: str, max_length: int = 4000, summary_type: str = "normal", japanese: bool = False
+    ) -> Tuple[str, bool]:
+        """
+        テキストを要約し、APIを使わないフォールバック要約になったかどうかも返す
+
+        Returns:
+            (要約されたテキスト, フォールバックした場合はTrue)のタプル
+        """
         if not text:
-            return ""
-        
+            return "", False
+
+        if self.degraded:
+            return self._fallback(text, max_length, summary_type), True
+
         try:
-            # 要約および翻訳プロンプトの作成
-            if summary_type == "title":
-                prompt = (
-                    "次のタイトルを日本語に翻訳してください。\n\n"
-                    f"{text}\n\n翻訳:"
-                )
-            else:
-                if summary_type == "short":
-                    prompt = (
-                        "次の文章を日本語で2〜3文、100文字以内で要約してください。\n\n"
-                        f"{text}\n\n要約:"
-                    )
-                elif summary_type == "long":
-                    prompt = (
-                        "次の文章を日本語で詳細に500文字以内で要約してください。読みやすいように適度に改行してください。\n\n"
-                        f"{text}\n\n要約:"
-                    )
-                else:
-                    prompt = (
-                        "次の文章を日本語で200文字以内で要約してください。読みやすいように適度に改行してください。\n\n"
-                        f"{text}\n\n要約:"
-                    )
-            
-            # APIを使用して要約
-            if isinstance(self.api, GeminiAPI):
-                summary = await self.api.generate_text(
-                    prompt,
-                    max_tokens=1000,
-                    temperature=0.3,
-                    system_instruction=self.system_instruction,
-                )
+            if (
+                summary_type != "title"
+                and self.chunk_threshold > 0
+                and len(text) > self.chunk_threshold
+            ):
+                summary = await self._summarize_chunked(text, summary_type, japanese)
             else:
-                summary = await self.api.generate_text(prompt, max_tokens=1000, temperature=0.3)
-            
+                stage = "title" if summary_type == "title" else "summary"
+                summary = await self._generate(self._build_prompt(text, summary_type, japanese), stage)
+
             # 余計なプレフィックスを削除
-            prefixes = ["要約:", "要約結果:", "翻訳:", "翻訳結果:"]
-            for prefix in prefixes:
-                if summary.startswith(prefix):
-                    summary = summary[len(prefix):].strip()
-            
+            summary = self._strip_prefixes(summary)
+
             # 最大長を超えた場合は切り詰め
             if len(summary) > max_length:
                 summary = summary[:max_length - 3] + "..."
-            
-            return summary
 
+            return summary, False
+
+        except CircuitOpenError:
+            logger.info("Gemini APIのサーキットが開いているため、抽出型要約で代替します")
+            return self._fallback(text, max_length, summary_type), True
         except Exception as e:
             logger.error(f"要約中にエラーが発生しました: {e}", exc_info=True)
-            logger.info("外部APIが利用できないため、簡易要約にフォールバックします")
-            return simple_summarize(text, max_length)
+            logger.info("外部APIが利用できないため、抽出型要約にフォールバックします")
+            return self._fallback(text, max_length, summary_type), True
+
+    @staticmethod
+    def _fallback(text: str, max_length: int, summary_type: str) -> str:
+        """APIを使用しない要約（タイトルは翻訳せずそのまま返す）"""
+        if summary_type == "title":
+            return text if len(text) <= max_length else text[:max_length - 3] + "..."
+        return textrank_summarize(text, max_length)
+
+    def _build_prompt(self, text: str, summary_type: str, japanese: bool = False) -> str:
+        """要約タイプに応じたプロンプトを作成する（日本語の原文は翻訳を指示せず要約のみ）"""
+        if japanese and summary_type != "title":
+            limit = {"short": "100文字", "long": "500文字"}.get(summary_type, "200文字")
+            return f"次の文章を{limit}以内に要約してください。\n\n{text}\n\n要約:"
+        if summary_type == "title":
+            return (
+                "次のタイトルを日本語に翻訳してください。\n\n"
+                f"{text}\n\n翻訳:"
+            )
+        if summary_type == "short":
+            return (
+                "次の文章を日本語で2〜3文、100文字以内で要約してください。\n\n"
+                f"{text}\n\n要約:"
+            )
+        if summary_type == "long":
+            return (
+                "次の文章を日本語で詳細に500文字以内で要約してください。読みやすいように適度に改行してください。\n\n"
+                f"{text}\n\n要約:"
+            )
+        return (
+            "次の文章を日本語で200文字以内で要約してください。読みやすいように適度に改行してください。\n\n"
+            f"{text}\n\n要約:"
+        )
+
+    async def _generate(self, prompt: str, stage: str = "summary", priority: int = PRIORITY_BACKGROUND) -> str:
+        """APIを使用してテキストを生成する（stageは計測の集計単位）"""
+        if isinstance(self.api, GeminiAPI):
+            return await self.api.generate_text(
+                prompt,
+                max_tokens=1000,
+                temperature=0.3,
+                system_instruction=self.system_instruction,
+                priority=priority,
+                stage=stage,
+            )
+        return await self.api.generate_text(prompt, max_tokens=1000, temperature=0.3)
+
+    @staticmethod
+    def _strip_prefixes(summary: str) -> str:
+        """余計なプレフィックスを削除する"""
+        prefixes = ["要約:", "要約結果:", "翻訳:", "翻訳結果:"]
+        for prefix in prefixes:
+            if summary.startswith(prefix):
+                summary = summary[len(prefix):].strip()
+        return summary
+
+    async def _summarize_chunked(self, text: str, summary_type: str, japanese: bool = False) -> str:
+        """
+        長文をチャンクに分割して要約する（map-reduce）
+
+        各チャンクの要点抽出を並列に実行し、得られた要点をまとめて最終的な要約を生成する。
+        チャンクの要約はディスパッチャーのバックグラウンド枠とチャンク用の追加枠
+        （gemini_fanout_extra）を使うため、チャンク数がその合計以下なら待ち時間は最も遅いチャンクで決まる。
+        """
+        chunks = self._split_into_chunks(text, self.chunk_size)
+        logger.info(f"長文をチャンク分割して要約します: {len(text)}文字, {len(chunks)}チャンク")
+
+        total = len(chunks)
+        results = await asyncio.gather(
+            *(
+                self._generate(self._build_chunk_prompt(chunk, i, total), "summary_chunk", PRIORITY_FANOUT)
+                for i, chunk in enumerate(chunks, 1)
+            ),
+            return_exceptions=True,
+        )
+
+        partials = []
+        for i, result in enumerate(results, 1):
+            if isinstance(result, BaseException):
+                logger.warning(f"チャンク{i}/{total}の要約に失敗しました: {result}")
+                continue
+            partial = self._strip_prefixes(result.strip())
+            if partial:
+                partials.append(partial)
+
+        if not partials:
+            raise RuntimeError("すべてのチャンクの要約に失敗しました")
+
+        return await self._generate(self._build_prompt("\n\n".join(partials), summary_type, japanese))
+
+    @staticmethod
+    def _build_chunk_prompt(chunk: str, index: int, total: int) -> str:
+        """チャンク要約用のプロンプトを作成する"""
+        return (
+            f"次の文章は長い記事の一部（{index}/{total}）です。"
+            "重要な事実・数値・固有名詞を落とさずに、要点を日本語で簡潔に箇条書きしてください。\n\n"
+            f"{chunk}\n\n要点:"
+        )
+
+    @staticmethod
+    def _split_into_chunks(text: str, chunk_size: int) -> List[str]:
+        """
+        テキストを段落単位でチャンクに分割する
+
+        段落（改行）で区切れない場合は文単位で区切り、
+        それでも長すぎる部分は文字数で分割する。
+        """
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n|\n", text) if p.strip()]
+        if len(paragraphs) <= 1:
+            paragraphs = [s.strip() for s in re.split(r"(?<=[。.!?！？])\s*", text) if s.strip()]
+
+        pieces: List[str] = []
+        for paragraph in paragraphs:
+            while len(paragraph) > chunk_size:
+                pieces.append(paragraph[:chunk_size])
+                paragraph = paragraph[chunk_size:]
+            if paragraph:
+                pieces.append(paragraph)
+
+        chunks: List[str] = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > chunk_size:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks
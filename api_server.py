@@ -8,20 +8,28 @@ PythonバックエンドロジックをFastAPIを介して提供する
 """
 
 import os
+import re
+import time
 import asyncio
 import logging
 from dotenv import load_dotenv
 from typing import Dict, Any, List, Optional
 
+import orjson
 import uvicorn
-from fastapi import FastAPI, HTTPException, Body
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Body, Query, Header, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 # 内部モジュールのインポート
 from config.config_manager import ConfigManager
 from rss.feed_manager import FeedManager
-from ai.ai_processor import AIProcessor
+from rss.article_filter import ArticleFilter
+from rss.delivery_stream import DeliveryStreamHub
+from rss.delivery_payload import slim_delivery_item
+from ai.ai_processor import AIProcessor, QA_ERROR_ANSWER
 from utils.logger import setup_logger
 
 # 環境変数の読み込み
@@ -37,6 +45,51 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 更新イベントの投稿先メッセージを解決できるまで待つ再配信回数と間隔（秒）
+UPDATE_RESOLVE_ATTEMPTS = 30
+UPDATE_RESOLVE_DELAY = 20
+# 投稿待ちの記事を一度に取得できる最大件数と、ロングポーリングの最大待機秒数
+MAX_DELIVERY_BATCH = 50
+MAX_DELIVERY_WAIT = 60
+# この大きさ（バイト）以上のレスポンスをgzipで圧縮する（Server-Sent Eventsは圧縮しない）
+GZIP_MINIMUM_SIZE = 1000
+# gzip圧縮の対象外にするServer-Sent Eventsのパス
+SSE_PATHS = ("/api/articles/stream", "/api/qa/stream")
+
+
+class SSEAwareGZipMiddleware:
+    """
+    Server-Sent Eventsのパスを除いてgzip圧縮するミドルウェア
+
+    古いStarletteのGZipMiddlewareはtext/event-streamも圧縮してバッファリングするため、
+    イベントが即時に届かなくなる。SSEのパスはバージョンによらず圧縮を経由させない。
+    """
+
+    def __init__(self, app, minimum_size: int = GZIP_MINIMUM_SIZE) -> None:
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] in SSE_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await self.gzip(scope, receive, send)
+
+
+app.add_middleware(SSEAwareGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+
+class FastJSONResponse(JSONResponse):
+    """orjsonでエンコードするJSONレスポンス（配信キューの項目など大きなレスポンス用）"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _delivery_payload(item: Dict[str, Any], profile: str) -> Dict[str, Any]:
+    """配信キューの項目をペイロードの形式に合わせる（slim: 投稿ボットが使うフィールドのみ）"""
+    return slim_delivery_item(item) if profile == "slim" else item
+
 # --- グローバルオブジェクト ---
 # アプリケーションの生存期間中に維持されるオブジェクト
 app_state: Dict[str, Any] = {}
@@ -61,10 +114,30 @@ async def startup_event():
         feed_manager = FeedManager(config, ai_processor)
         app_state["feed_manager"] = feed_manager
 
+        # 投稿ボットへ配信キューの項目をプッシュする配信ストリーム
+        app_state["delivery_stream"] = DeliveryStreamHub(
+            max_inflight=config.get("delivery_stream_max_inflight", 5),
+            inflight_timeout=config.get("delivery_visibility_timeout", 120),
+        )
+
         # スケジューラーのセットアップ
         scheduler = AsyncIOScheduler(timezone="UTC")
         check_interval = config.get("check_interval", 15)
         scheduler.add_job(feed_manager.check_feeds, "interval", minutes=check_interval)
+        # Gemini APIの障害中に縮退処理した記事の再処理
+        scheduler.add_job(
+            feed_manager.drain_reenrich_queue, "interval",
+            seconds=config.get("reenrich_interval", 60),
+        )
+        # 待ち時間を過ぎたダイジェストの投稿
+        scheduler.add_job(feed_manager.flush_digests, "interval", minutes=1)
+        # 保持期間を過ぎた処理済みの記録などの削除
+        scheduler.add_job(
+            feed_manager.article_store.cleanup_old_articles, "interval", days=1,
+            kwargs={"days": config.get("article_retention_days", 30)},
+        )
+        # 前回の停止時に投稿キューに入る前だった記事の処理を再開する（起動時に1回）
+        scheduler.add_job(feed_manager.resume_unfinished_articles)
         scheduler.start()
         app_state["scheduler"] = scheduler
 
@@ -96,22 +169,39 @@ class ConfigUpdate(BaseModel):
 class FeedAdd(BaseModel):
     url: str
     summary_type: str = "normal"
+    delivery_mode: str = "article"
 
 class FeedRemove(BaseModel):
     url: str
 
+class FeedFilters(BaseModel):
+    url: str
+    filters: Dict[str, Any]
+
 class FeedCheckNow(BaseModel):
     channel_id: str
 
 class QARequest(BaseModel):
     original_message_id: str
     question: str
+    use_llm_keywords: bool = False
+
+class ArticleAck(BaseModel):
+    delivery_id: int
+
+class RateLimitFeedback(BaseModel):
+    channel_id: Optional[str] = None
+    retry_after: float
+    is_global: bool = Field(False, alias="global")
 
 class ArticleAssociate(BaseModel):
     message_id: str
     channel_id: str
-    original_article: Dict[str, Any]
-    keywords_en: str
+    delivery_id: Optional[int] = None
+    # 配信IDを指定しない古い投稿ボット向け
+    original_article: Optional[Dict[str, Any]] = None
+    keywords_en: str = ""
+    article_id: Optional[str] = None
 
 # --- APIエンドポイントの実装 ---
 
@@ -152,7 +242,8 @@ async def add_feed(feed_data: FeedAdd):
     feed_manager = app_state["feed_manager"]
     success, message, feed_info = await feed_manager.add_feed(
         url=feed_data.url,
-        summary_type=feed_data.summary_type
+        summary_type=feed_data.summary_type,
+        delivery_mode=feed_data.delivery_mode,
     )
     if not success:
         raise HTTPException(status_code=400, detail=message)
@@ -175,6 +266,28 @@ async def assign_channel_to_feed(url: str, channel_id: str, channel_name: str):
     config_manager.save_config()
     return {"message": f"Feed {url} assigned to channel {channel_id}"}
 
+@app.post("/api/feeds/filters", summary="フィードのフィルターを設定")
+async def set_feed_filters(filter_data: FeedFilters):
+    """
+    フィードの包含・除外ルールを設定します
+
+    filters は {"include": {...}, "exclude": {...}} の形式で、それぞれ
+    "keywords", "regex", "authors", "categories" のリストを指定します。空の場合はフィルターを解除します。
+    """
+    feed_manager = app_state["feed_manager"]
+    feed = feed_manager.get_feed_by_url(filter_data.url)
+    if not feed:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    try:
+        # フィードの確認時と同じ手順でコンパイルして検証する
+        ArticleFilter(filter_data.filters, strict=True)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"無効な正規表現です: {e.pattern}: {e}")
+    except (AttributeError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"フィルターの形式が正しくありません: {e}")
+    feed["filters"] = filter_data.filters
+    app_state["config_manager"].save_config()
+    return {"message": f"Feed {filter_data.url} filters updated", "filters": feed["filters"]}
 
 @app.delete("/api/feeds", summary="フィードを削除")
 async def remove_feed(feed_data: FeedRemove):
@@ -188,73 +301,347 @@ async def remove_feed(feed_data: FeedRemove):
 
 @app.post("/api/feeds/check-now", summary="フィードを今すぐ確認")
 async def check_feed_now(check_data: FeedCheckNow):
-    """指定されたチャンネルのフィードをすぐに確認し、最新記事を投稿します"""
+    """
+    指定されたチャンネルのフィードをすぐに確認し、この確認で投稿キューに追加された記事を返します
+
+    返した記事は投稿後に /api/articles/ack で確認応答してください。
+    すでに配信ストリームなどで取り出された記事は含まず、通常の配信で投稿されます。
+    """
     feed_manager = app_state["feed_manager"]
     feed = next((f for f in feed_manager.get_feeds() if f.get("channel_id") == check_data.channel_id), None)
     if not feed:
         raise HTTPException(status_code=404, detail="このチャンネルにフィードが登録されていません。")
 
     try:
-        # このコマンドは手動実行用なので、即時処理して結果を返す
-        # 定期実行とは異なり、キューには入れない
-        await feed_manager.check_feed(feed)
-
-        # キューから最新のものを取得して返す（このチャンネル向けである保証はないが、高確率でそう）
-        if feed_manager.articles_to_post:
-            # Note: This is not guaranteed to be for the requested channel, but likely is.
-            # A more robust solution might be needed if this is a problem.
-            article_data = feed_manager.articles_to_post.popleft()
-            return {"message": "記事を処理しました。", "article_data": article_data}
-        else:
-            return {"message": "新しい記事は見つかりませんでした。"}
+        queue = feed_manager.delivery_queue
+        since = await queue.last_id()
+        found = await feed_manager.check_feed(feed)
+        if feed.get("delivery_mode") == "digest":
+            # 手動実行時は溜まっている記事をすぐにダイジェストとして投稿する
+            found += await feed_manager.flush_digest(feed, force=True)
+
+        # この確認で追加された、このフィードの項目だけを取り出す
+        articles = await queue.lease_for_feed(feed.get("url"), since)
+        if articles:
+            return FastJSONResponse({
+                "message": f"{len(articles)}件の記事を処理しました。",
+                "articles": [slim_delivery_item(item) for item in articles],
+            })
+        if found:
+            return {"message": "記事を処理しました。まもなく投稿されます。", "articles": []}
+        return {"message": "新しい記事は見つかりませんでした。", "articles": []}
 
     except Exception as e:
         logger.error(f"フィード確認中にAPIエラー: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Article Endpoints
+async def _lease_deliverable(limit: int) -> List[Dict[str, Any]]:
+    """
+    配信キューから最大limit件をリースし、投稿できる状態の項目だけを返す
+
+    更新イベント（type: update）は元の投稿のメッセージIDを付ける。元の投稿がまだ
+    紐付けられていない場合は少し後に再配信し、上限回数を超えたものは破棄する。
+    """
+    feed_manager = app_state["feed_manager"]
+    queue = feed_manager.delivery_queue
+    deliverable: List[Dict[str, Any]] = []
+    while len(deliverable) < limit:
+        leased = await queue.lease_many(limit - len(deliverable))
+        if not leased:
+            break
+        for article_data in leased:
+            if article_data.get("type") != "update":
+                deliverable.append(article_data)
+                continue
+
+            message_id = await feed_manager.article_store.get_message_id_for_article(article_data["article_id"])
+            if message_id:
+                article_data["message_id"] = message_id
+                deliverable.append(article_data)
+            elif article_data["deferrals"] < UPDATE_RESOLVE_ATTEMPTS:
+                await queue.release(article_data["delivery_id"], delay=UPDATE_RESOLVE_DELAY)
+            else:
+                logger.warning(f"更新対象の投稿が見つからないため更新を破棄します: {article_data['article_id']}")
+                await queue.ack(article_data["delivery_id"])
+    return deliverable
+
 @app.get("/api/articles-to-post", summary="投稿待ちの記事を取得")
-async def get_article_to_post():
-    """投稿を待っている記事のキューから記事を1つ取得します"""
+async def get_article_to_post(
+    max_items: Optional[int] = Query(None, alias="max", ge=1, le=MAX_DELIVERY_BATCH),
+    wait: float = Query(0, ge=0, le=MAX_DELIVERY_WAIT),
+    profile: str = Query("slim", pattern="^(slim|full)$"),
+):
+    """
+    投稿を待っている記事のキューから記事をリースします
+
+    max を指定すると最大その件数をリストで返し、指定しない場合は1件（またはnull）を返します。
+    wait を指定すると、記事がない場合に最大その秒数だけ待ち、記事が追加され次第すぐに返します（ロングポーリング）。
+
+    返した項目は投稿後に /api/articles/ack で確認応答してください。
+    確認応答がないまま可視性タイムアウトを過ぎると再配信されます。
+    更新イベント（type: update）は元の投稿のメッセージIDを付けて返します。
+    profile=full を指定すると、元記事の複製などを含むキューの項目をそのまま返します。
+    """
+    queue = app_state["feed_manager"].delivery_queue
+    deadline = time.monotonic() + wait
+    while True:
+        items = await _lease_deliverable(max_items or 1)
+        remaining = deadline - time.monotonic()
+        if items or remaining <= 0:
+            break
+        await queue.wait_for_items(remaining)
+
+    items = [_delivery_payload(item, profile) for item in items]
+    if max_items is None:
+        return FastJSONResponse(items[0] if items else None)
+    return FastJSONResponse(items)
+
+@app.get("/api/articles/stream", summary="投稿待ちの記事をストリームで受け取る")
+async def stream_articles(
+    request: Request,
+    subscriber: str = "default",
+    last_event_id: Optional[int] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+    profile: str = Query("slim", pattern="^(slim|full)$"),
+):
+    """
+    投稿を待っている記事を Server-Sent Events でプッシュします
+
+    各記事は event: item として、購読者ごとの連番を id に付けて送ります。投稿後は
+    /api/articles/ack で確認応答してください。確認応答待ちが上限に達している間は
+    新しい記事を送りません。再接続時に Last-Event-ID ヘッダー（または last_event_id）で
+    最後に受け取った連番を指定すると、それより後に送った未確認応答の記事を再送します。
+    profile は /api/articles-to-post と同じです。
+    """
+    if last_event_id is None and last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    queue = app_state["feed_manager"].delivery_queue
+    hub = app_state["delivery_stream"]
+
+    async def renew(item: Dict[str, Any]) -> bool:
+        return await queue.renew(item["delivery_id"], item["attempts"])
+
+    async def event_stream():
+        async for event in hub.events(subscriber, last_event_id, _lease_deliverable, queue.wait_for_items, renew):
+            if await request.is_disconnected():
+                break
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            sequence, item = event
+            yield _sse_event("item", _delivery_payload(item, profile), event_id=sequence)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/articles/stream/status", summary="配信ストリームの購読状態を取得")
+async def get_stream_status():
+    """購読者ごとの接続状態、最後に送った連番、確認応答待ちの件数を返します"""
+    return app_state["delivery_stream"].status()
+
+@app.post("/api/articles/ack", summary="投稿完了を確認応答")
+async def ack_article(ack_data: ArticleAck):
+    """リースした項目の投稿が完了したことを通知し、キューから削除します"""
     feed_manager = app_state["feed_manager"]
-    if feed_manager.articles_to_post:
-        article_data = feed_manager.articles_to_post.popleft()
-        return article_data
-    return None
+    removed = await feed_manager.delivery_queue.ack(ack_data.delivery_id)
+    app_state["delivery_stream"].ack(ack_data.delivery_id)
+    await feed_manager.article_store.advance_state_by_delivery(ack_data.delivery_id, "posted")
+    return {"message": "acknowledged" if removed else "already removed", "removed": removed}
+
+@app.get("/api/articles/states", summary="記事の処理状態ごとの件数を取得")
+async def get_article_states():
+    """discovered, enriching, enriched, queued, posted, associated, failed の各状態にある記事数を返します"""
+    return await app_state["feed_manager"].article_store.count_article_states()
+
+@app.get("/api/articles/dead-letters", summary="投稿できなかった項目を取得")
+async def get_dead_letters(limit: int = Query(100, ge=1, le=1000)):
+    """確認応答がないまま再配信の上限に達し、配信キューから外した項目を新しい順に返します"""
+    return await app_state["feed_manager"].article_store.get_dead_letters(limit)
 
 @app.post("/api/articles/associate", summary="投稿済み記事を紐付け")
 async def associate_article(association_data: ArticleAssociate):
-    """Discordへの投稿後、メッセージIDと記事データを紐付けて保存します"""
+    """
+    Discordへの投稿後、メッセージIDと記事データを紐付けて保存します
+
+    delivery_id を指定すると、キューに追加した時にサーバーが保存した記事データを紐付けます。
+    指定しない場合は original_article と keywords_en を送ってください。
+    """
     feed_manager = app_state["feed_manager"]
+    article_store = feed_manager.article_store
+    article_id = association_data.article_id
     try:
-        await feed_manager.article_store.add_full_article(
-            message_id=association_data.message_id,
-            channel_id=association_data.channel_id,
-            article=association_data.original_article,
-            keywords_en=association_data.keywords_en,
-        )
+        associated = None
+        if association_data.delivery_id is not None:
+            associated = await article_store.associate_delivery(
+                association_data.delivery_id, association_data.message_id, association_data.channel_id
+            )
+        if associated is not None:
+            article_id = associated["article_id"] or article_id
+        elif association_data.original_article is not None:
+            await article_store.add_full_article(
+                message_id=association_data.message_id,
+                channel_id=association_data.channel_id,
+                article=association_data.original_article,
+                keywords_en=association_data.keywords_en,
+                article_id=article_id,
+            )
+        else:
+            raise HTTPException(status_code=404, detail="Delivery not found")
+
+        if article_id:
+            await article_store.advance_article_state(
+                article_id, "associated", message_id=association_data.message_id
+            )
         return {"message": "Article associated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"記事の紐付け中にエラー: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to associate article")
 
+# Delivery Pacing Endpoints
+@app.post("/api/delivery/rate-limit", summary="Discordのレート制限を通知")
+async def report_rate_limit(feedback: RateLimitFeedback):
+    """
+    投稿ボットが受けたDiscordのレート制限を通知します
+
+    該当するチャンネル（global の場合は全体）の送信枠を retry_after 秒止め、
+    チャンネルの送信ペースを一時的に下げます。
+    """
+    pacer = app_state["feed_manager"].delivery_queue.pacer
+    if pacer is None:
+        return {"message": "pacing disabled"}
+    pacer.report_rate_limit(feedback.channel_id, feedback.retry_after, feedback.is_global)
+    return {"message": "rate limit recorded"}
+
+@app.get("/api/delivery/pacing", summary="配信ペースの状態を取得")
+async def get_delivery_pacing():
+    """全体とチャンネルごとの送信枠（トークン数・補充速度・停止残り時間）を返します"""
+    pacer = app_state["feed_manager"].delivery_queue.pacer
+    return pacer.status() if pacer else {}
+
+@app.get("/api/delivery/backlog", summary="配信待ちの滞留状況を取得")
+async def get_delivery_backlog():
+    """チャンネルごとの配信待ちの件数・滞留秒数と、記事の処理を一時停止中のチャンネルを返します"""
+    feed_manager = app_state["feed_manager"]
+    await feed_manager.refresh_backpressure()
+    return feed_manager.backpressure.status()
+
 # Q&A Endpoint
-@app.post("/api/qa", summary="質問応答")
-async def answer_question(request: QARequest):
-    """Botの投稿への返信に対して、AIを使用して回答を生成します"""
+async def _prepare_qa_context(request: QARequest):
+    """質問応答に必要な元記事と関連記事を取得する（検索結果は元記事ごとにキャッシュする）"""
     feed_manager = app_state["feed_manager"]
     ai_processor = app_state["ai_processor"]
+    article_store = feed_manager.article_store
+    qa_cache = ai_processor.qa_cache
 
-    original_article = await feed_manager.article_store.get_full_article(request.original_message_id)
+    original_article = await article_store.get_full_article(request.original_message_id)
     if not original_article:
         raise HTTPException(status_code=404, detail="元の記事が見つかりませんでした。")
 
-    keywords = await ai_processor._generate_search_keywords(original_article, request.question)
-    related_articles = await feed_manager.article_store.find_related_articles(keywords, request.original_message_id)
+    context = qa_cache.get_context(request.original_message_id)
+    if context is not None and not request.use_llm_keywords:
+        related_articles = await article_store.get_full_articles(context["related_ids"])
+        return original_article, related_articles
+
+    keywords = await ai_processor._generate_search_keywords(
+        original_article, request.question, use_llm=request.use_llm_keywords or None
+    )
+    related_articles = await article_store.find_related_articles(keywords, request.original_message_id)
+    qa_cache.set_context(
+        request.original_message_id, keywords, [a["message_id"] for a in related_articles]
+    )
+    return original_article, related_articles
+
+@app.post("/api/qa", summary="質問応答")
+async def answer_question(request: QARequest):
+    """Botの投稿への返信に対して、AIを使用して回答を生成します"""
+    ai_processor = app_state["ai_processor"]
+    qa_cache = ai_processor.qa_cache
+
+    cached = qa_cache.get_answer(request.original_message_id, request.question)
+    if cached is not None:
+        ai_processor.metrics.record("qa", cache_hit=True)
+        return {"answer": cached, "cached": True}
+
+    original_article, related_articles = await _prepare_qa_context(request)
     answer = await ai_processor.answer_question(original_article, related_articles, request.question)
+    if answer and answer != QA_ERROR_ANSWER:
+        qa_cache.set_answer(request.original_message_id, request.question, answer)
 
     return {"answer": answer}
 
+def _sse_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Server-Sent Events形式のメッセージを作成する"""
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {orjson.dumps(data).decode('utf-8')}\n\n"
+
+@app.post("/api/qa/stream", summary="質問応答（ストリーミング）")
+async def answer_question_stream(request: QARequest):
+    """
+    回答を生成しながら Server-Sent Events で逐次返します
+
+    `token` イベントで回答の断片を、`done` イベントで回答全文を送信します。
+    """
+    ai_processor = app_state["ai_processor"]
+    qa_cache = ai_processor.qa_cache
+    started = time.perf_counter()
+
+    cached = qa_cache.get_answer(request.original_message_id, request.question)
+    if cached is not None:
+        ai_processor.metrics.record("qa", cache_hit=True)
+
+        async def cached_stream():
+            yield _sse_event("token", {"text": cached})
+            yield _sse_event("done", {"answer": cached, "cached": True})
+        return StreamingResponse(cached_stream(), media_type="text/event-stream")
+
+    original_article, related_articles = await _prepare_qa_context(request)
+
+    async def event_stream():
+        parts: List[str] = []
+        async for text in ai_processor.answer_question_stream(
+            original_article, related_articles, request.question
+        ):
+            if not parts:
+                logger.info(f"Q&A最初のトークンまでの時間: {(time.perf_counter() - started) * 1000:.0f}ms")
+            parts.append(text)
+            yield _sse_event("token", {"text": text})
+        answer = "".join(parts)
+        if answer and answer != QA_ERROR_ANSWER:
+            qa_cache.set_answer(request.original_message_id, request.question, answer)
+        yield _sse_event("done", {"answer": answer})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Metrics Endpoints
+@app.get("/api/metrics/ai", summary="AI呼び出しの計測結果を取得")
+async def get_ai_metrics(recent: int = 20):
+    """処理の段階ごとのGemini API呼び出し数・レイテンシ・トークン数・リトライ数などを返します"""
+    ai_processor = app_state["ai_processor"]
+    metrics = ai_processor.metrics.snapshot(recent)
+    metrics["circuit_breaker"] = ai_processor.circuit_breaker.state
+    metrics["dispatcher"] = {
+        "active": ai_processor.dispatcher.active,
+        "waiting": ai_processor.dispatcher.waiting,
+    }
+    metrics["qa_cache"] = {"hits": ai_processor.qa_cache.hits, "misses": ai_processor.qa_cache.misses}
+    return metrics
+
+@app.post("/api/metrics/ai/reset", summary="AI呼び出しの計測結果をリセット")
+async def reset_ai_metrics():
+    """計測結果をリセットします"""
+    app_state["ai_processor"].metrics.reset()
+    return {"message": "AI metrics reset"}
+
 # Channel Endpoint
 @app.delete("/api/channels/{channel_id}", summary="チャンネル削除処理")
 async def handle_channel_delete(channel_id: str):
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配信ペイロードのベンチマーク
+
+/api/articles-to-post が返す項目について、キューの項目をそのまま FastAPI 標準のJSONエンコード
+（jsonable_encoder + json.dumps）で返す場合と、slimプロファイル + orjson で返す場合の
+1件あたりの転送量（gzip圧縮後を含む）とエンコード時間を比較する。
+記事本文の長さは記事ストアの分布（存在しない場合は対数正規分布で近似）に沿って生成する。
+生成する本文は少数の文の繰り返しのため、gzip圧縮後の大きさは実際の記事より小さく出る。
+
+使い方:
+    python -m benchmarks.bench_delivery_payload [--db data/processed_articles.db] [--samples 500] [--batch 10]
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import statistics
+from typing import Any, Dict, List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_extractive_summarizer import load_lengths, make_text, percentile
+from rss.delivery_payload import slim_delivery_item
+
+
+def make_item(index: int, length: int) -> Dict[str, Any]:
+    """フィードマネージャーがキューに追加する形式の項目を生成する"""
+    original = {
+        "title": f"Article {index}",
+        "link": f"https://example.com/articles/{index}",
+        "content": make_text(length),
+        "published": "2026-01-01T00:00:00+00:00",
+        "feed_title": "Example Feed",
+        "feed_url": "https://example.com/feed",
+    }
+    processed = dict(original)
+    processed.update({
+        "title": f"翻訳: Article {index}",
+        "summary": make_text(400),
+        "keywords_en": "semiconductor, market, regulation, earnings, smartphone",
+        "ai_processed": True,
+        "_original_article": original,
+    })
+    return {
+        "type": "post",
+        "article_id": f"a{index}",
+        "processed_article": processed,
+        "channel_id": "123456789012345678",
+        "feed_url": original["feed_url"],
+        "delivery_id": index,
+        "attempts": 1,
+    }
+
+
+def encode_full(item: Dict[str, Any]) -> bytes:
+    """FastAPI標準のレスポンスと同じ手順でエンコードする"""
+    return json.dumps(
+        jsonable_encoder(item), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encode_slim(item: Dict[str, Any]) -> bytes:
+    return orjson.dumps(slim_delivery_item(item), option=orjson.OPT_NON_STR_KEYS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=os.path.join("data", "processed_articles.db"))
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=10, help="1回のレスポンスに含める件数（gzipの計測用）")
+    args = parser.parse_args()
+
+    random.seed(0)
+    items = [make_item(i, n) for i, n in enumerate(load_lengths(args.db, args.samples))]
+    print(f"項目数: {len(items)}, 本文の文字数 中央値="
+          f"{statistics.median(len(i['processed_article']['content']) for i in items):.0f}")
+
+    for name, encode in (("full", encode_full), ("slim", encode_slim)):
+        timings: List[float] = []
+        sizes: List[int] = []
+        for item in items:
+            start = time.perf_counter()
+            body = encode(item)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+            sizes.append(len(body))
+
+        compressed = 0
+        for offset in range(0, len(items), args.batch):
+            batch = b"[" + b",".join(encode(item) for item in items[offset:offset + args.batch]) + b"]"
+            compressed += len(gzip.compress(batch))
+
+        print(f"{name:>5}: 1件あたり {statistics.mean(sizes) / 1024:.1f}KiB "
+              f"(gzip {compressed / len(items) / 1024:.1f}KiB) "
+              f"エンコード 平均={statistics.mean(timings):.0f}us p99={percentile(timings, 0.99):.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+抽出型要約のベンチマーク
+
+記事ストアに保存された記事本文の長さ分布（存在しない場合は対数正規分布で近似）に沿って
+TextRank要約の処理時間を計測する。
+
+使い方:
+    python -m benchmarks.bench_extractive_summarizer [--db data/processed_articles.db] [--samples 500]
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import statistics
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.extractive_summarizer import textrank_summarize
+from ai.simple_summarizer import simple_summarize
+
+SENTENCES = [
+    "政府は新たな経済対策を発表した。",
+    "半導体メーカー各社は生産能力の増強を急いでいる。",
+    "専門家は今回の決定が市場に与える影響を注視している。",
+    "The company reported record revenue for the third quarter.",
+    "Analysts expect demand for AI accelerators to keep growing.",
+    "新しいスマートフォンは来月から販売される予定だ。",
+    "Regulators said the investigation would continue next year.",
+    "研究チームは実験結果を国際学会で報告する。",
+]
+
+
+def load_lengths(db_path: str, samples: int) -> List[int]:
+    """記事本文の長さ分布を取得する"""
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT LENGTH(content) FROM articles WHERE content IS NOT NULL AND content != ''"
+            ).fetchall()
+        finally:
+            conn.close()
+        if rows:
+            lengths = [row[0] for row in rows]
+            return [random.choice(lengths) for _ in range(samples)]
+    # 実データがない場合: 中央値約1500文字、長い裾を持つ分布
+    return [min(30000, max(100, int(random.lognormvariate(7.3, 0.8)))) for _ in range(samples)]
+
+
+def make_text(length: int) -> str:
+    """指定文字数程度の記事本文を生成する"""
+    parts = []
+    total = 0
+    while total < length:
+        sentence = random.choice(SENTENCES)
+        parts.append(sentence)
+        total += len(sentence)
+    return " ".join(parts)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=os.path.join("data", "processed_articles.db"))
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--summary-length", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    texts = [make_text(n) for n in load_lengths(args.db, args.samples)]
+    lengths = [len(t) for t in texts]
+    print(f"記事数: {len(texts)}, 文字数 中央値={statistics.median(lengths):.0f} "
+          f"p90={percentile(lengths, 0.9)} 最大={max(lengths)}")
+
+    for name, func in (("textrank", textrank_summarize), ("simple", simple_summarize)):
+        timings = []
+        for text in texts:
+            start = time.perf_counter()
+            func(text, args.summary_length)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{name:>9}: 平均={statistics.mean(timings):.2f}ms p50={percentile(timings, 0.5):.2f}ms "
+              f"p99={percentile(timings, 0.99):.2f}ms 最大={max(timings):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gemini APIの代替サーバー
+
+実際のクォータを消費せずに負荷試験やベンチマークを行うため、Gemini APIの
+generateContent（REST）を模倣する。レイテンシ分布、429エラー、APIキーごとのクォータ枠、
+ブロックされた応答、トークン数の計上を設定でき、乱数シードを固定すれば結果を再現できる。
+
+起動:
+    python -m benchmarks.fake_gemini_server --port 8765 --latency lognormal:0.8:0.4 --rpm 15
+
+ボット側は設定の gemini_api_endpoint に http://127.0.0.1:8765 を指定する
+（APIキーは任意の文字列でよい）。統計は GET /stats、リセットは POST /stats/reset。
+"""
+
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class FakeSettings:
+    """代替サーバーの挙動設定"""
+
+    latency: str = "fixed:0.2"       # fixed:秒 / uniform:最小:最大 / lognormal:中央値:sigma
+    error_rate: float = 0.0          # ランダムに429を返す確率
+    block_rate: float = 0.0          # 安全性フィルタでブロックされた応答を返す確率
+    rpm: int = 0                     # APIキーごとのクォータ（quota_window秒あたりのリクエスト数、0で無制限）
+    quota_window: float = 60.0       # クォータを数える時間枠（秒）
+    output_chars: int = 200          # 応答テキストの最大文字数
+    seed: Optional[int] = None       # 乱数シード（指定すると結果を再現できる）
+
+    @classmethod
+    def from_env(cls) -> "FakeSettings":
+        """環境変数（FAKE_GEMINI_*）から設定を作成する"""
+        seed = os.environ.get("FAKE_GEMINI_SEED")
+        return cls(
+            latency=os.environ.get("FAKE_GEMINI_LATENCY", cls.latency),
+            error_rate=float(os.environ.get("FAKE_GEMINI_ERROR_RATE", cls.error_rate)),
+            block_rate=float(os.environ.get("FAKE_GEMINI_BLOCK_RATE", cls.block_rate)),
+            rpm=int(os.environ.get("FAKE_GEMINI_RPM", cls.rpm)),
+            quota_window=float(os.environ.get("FAKE_GEMINI_QUOTA_WINDOW", cls.quota_window)),
+            output_chars=int(os.environ.get("FAKE_GEMINI_OUTPUT_CHARS", cls.output_chars)),
+            seed=int(seed) if seed else None,
+        )
+
+
+@dataclass
+class FakeStats:
+    """代替サーバーの集計"""
+
+    requests: int = 0
+    succeeded: int = 0
+    rate_limited: int = 0
+    blocked: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    latencies: List[float] = field(default_factory=list)
+    per_key: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+        return {
+            "requests": self.requests,
+            "succeeded": self.succeeded,
+            "rate_limited": self.rate_limited,
+            "blocked": self.blocked,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "per_key": dict(self.per_key),
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数を概算する（ASCIIは約4文字、それ以外は約1文字で1トークン）"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+class FakeGemini:
+    """generateContentの応答を組み立てる"""
+
+    def __init__(self, settings: FakeSettings):
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.stats = FakeStats()
+        self._windows: Dict[str, deque] = defaultdict(deque)
+
+    def reset(self) -> None:
+        self.random = random.Random(self.settings.seed)
+        self.stats = FakeStats()
+        self._windows.clear()
+
+    def sample_latency(self) -> float:
+        """設定された分布からレイテンシを1つ選ぶ"""
+        kind, *params = self.settings.latency.split(":")
+        values = [float(p) for p in params]
+        if kind == "uniform":
+            return self.random.uniform(values[0], values[1])
+        if kind == "lognormal":
+            return self.random.lognormvariate(math.log(values[0]), values[1])
+        return values[0] if values else 0.0
+
+    def _over_quota(self, key: str) -> bool:
+        """APIキーごとのクォータ枠を超えているか（超えていなければ1件計上する）"""
+        if self.settings.rpm <= 0:
+            return False
+        now = time.monotonic()
+        window = self._windows[key]
+        while window and now - window[0] >= self.settings.quota_window:
+            window.popleft()
+        if len(window) >= self.settings.rpm:
+            return True
+        window.append(now)
+        return False
+
+    def _reply_text(self, prompt: str, max_output_tokens: Optional[int]) -> str:
+        """プロンプトから決定的な応答テキストを作る（最も長い段落の先頭部分）"""
+        paragraphs = [p.strip() for p in prompt.split("\n\n") if p.strip()]
+        body = max(paragraphs, key=len) if paragraphs else prompt
+        limit = self.settings.output_chars
+        if max_output_tokens:
+            limit = min(limit, max_output_tokens * 2)
+        return body[:limit]
+
+    async def generate(self, key: str, body: Dict[str, Any]) -> JSONResponse:
+        stats = self.stats
+        stats.requests += 1
+        stats.per_key[key] += 1
+
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        system = "".join(
+            part.get("text", "") for part in (body.get("systemInstruction") or {}).get("parts", [])
+        )
+        prompt_tokens = estimate_tokens(system + prompt)
+
+        if self._over_quota(key) or self.random.random() < self.settings.error_rate:
+            stats.rate_limited += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {
+                    "code": 429,
+                    "message": "Resource has been exhausted (e.g. check quota).",
+                    "status": "RESOURCE_EXHAUSTED",
+                }},
+            )
+
+        latency = self.sample_latency()
+        await asyncio.sleep(latency)
+        stats.latencies.append(latency)
+        stats.prompt_tokens += prompt_tokens
+
+        if self.random.random() < self.settings.block_rate:
+            stats.blocked += 1
+            return JSONResponse(content={
+                "promptFeedback": {"blockReason": "SAFETY"},
+                "usageMetadata": {"promptTokenCount": prompt_tokens, "totalTokenCount": prompt_tokens},
+            })
+
+        max_output_tokens = (body.get("generationConfig") or {}).get("maxOutputTokens")
+        text = self._reply_text(prompt, max_output_tokens)
+        output_tokens = estimate_tokens(text)
+        stats.succeeded += 1
+        stats.output_tokens += output_tokens
+        return JSONResponse(content={
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+        })
+
+
+def create_app(settings: Optional[FakeSettings] = None) -> FastAPI:
+    """代替サーバーのアプリケーションを作成する"""
+    fake = FakeGemini(settings or FakeSettings.from_env())
+    app = FastAPI(title="Fake Gemini API")
+    app.state.fake = fake
+
+    @app.post("/{version}/models/{target}")
+    async def generate_content(version: str, target: str, request: Request):
+        # パスは "models/{model}:generateContent" の形式
+        model, _, method = target.partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": f"unknown method: {method}"}})
+        key = request.headers.get("x-goog-api-key") or request.query_params.get("key") or "anonymous"
+        response = await fake.generate(key, await request.json())
+        if method == "streamGenerateContent" and response.status_code == 200:
+            # RESTのストリーミング（alt=json）は応答の配列を返す
+            return JSONResponse(content=[json.loads(response.body)])
+        return response
+
+    @app.get("/stats")
+    async def get_stats():
+        return fake.stats.to_dict()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        fake.reset()
+        return {"message": "reset"}
+
+    return app
+
+
+app = create_app()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gemini APIの代替サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=FakeSettings.latency,
+                        help="fixed:秒 / uniform:最小:最大 / lognormal:中央値:sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="ランダムに429を返す確率")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="ブロックされた応答を返す確率")
+    parser.add_argument("--rpm", type=int, default=0, help="APIキーごとのクォータ（0で無制限）")
+    parser.add_argument("--quota-window", type=float, default=60.0, help="クォータを数える時間枠（秒）")
+    parser.add_argument("--output-chars", type=int, default=200, help="応答テキストの最大文字数")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+    args = parser.parse_args()
+
+    settings = FakeSettings(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        block_rate=args.block_rate,
+        rpm=args.rpm,
+        quota_window=args.quota_window,
+        output_chars=args.output_chars,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
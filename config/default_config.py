@@ -26,9 +26,54 @@ DEFAULT_CONFIG = {
     "gemini_api_keys": [],  # Gemini API Keyのリスト
     "ai_model": "gemini-2.0-flash",  # 使用するAIモデル
                               # gemini-2.0-flash, gemini-2.5-flash-preview-05-20
+    "publish_mode": "enriched",  # 投稿方法（enriched: AI処理後に投稿 / immediate: すぐ投稿し後から更新）
+    "publish_preview_length": 300,  # immediateモードで最初に投稿する本文の最大文字数
+    "immediate_enrichment_concurrency": 2,  # immediateモードでバックグラウンドのAI処理を同時に実行する最大数
+    "delivery_visibility_timeout": 120,  # 投稿待ちの項目を取り出してから確認応答がない場合に再配信するまでの秒数
+    "delivery_max_attempts": 10,         # 確認応答がないまま再配信する最大回数（超えた項目は記録してキューから外す）
+    "delivery_stream_max_inflight": 5,   # 配信ストリームで購読者ごとに確認応答を待つ最大件数
+    "discord_channel_burst": 1,          # Discordのチャンネルごとに連続して送信できるメッセージ数（burst + rate × 5 が5以下）
+    "discord_channel_rate": 0.8,         # Discordのチャンネルごとの1秒あたりの送信数
+    "discord_global_burst": 10,          # Discord全体で連続して送信できるリクエスト数（burst + rate × 1 が50以下）
+    "discord_global_rate": 40.0,         # Discord全体の1秒あたりの送信数
+    "backlog_high_depth": 50,            # チャンネルの配信待ちがこの件数以上になると記事の取得とAI処理を一時停止（0で無効）
+    "backlog_low_depth": 20,             # 一時停止したチャンネルを再開する配信待ちの件数
+    "backlog_high_age_minutes": 60,      # 最も古い配信待ちがこの時間（分）以上滞留すると一時停止（0で無効）
+    "backlog_low_age_minutes": 20,       # 一時停止したチャンネルを再開する滞留時間（分）
+    "digest_max_items": 10,          # ダイジェスト配信（フィードの delivery_mode: digest）で1件にまとめる最大記事数
+    "digest_window_minutes": 60,     # ダイジェストを投稿するまで記事を溜める最大時間（分）
+    "digest_item_chars": 500,        # ダイジェスト作成時に各記事から渡す本文の文字数
     "summarize": True,     # 要約（翻訳を兼ねる）を有効にするか
     "summary_length": 4000, # 要約の最大文字数
+    "summary_chunk_threshold": 8000,  # この文字数を超える記事はチャンク分割して要約（0で無効）
+    "summary_chunk_size": 4000,       # チャンク1つあたりの最大文字数
+    "degraded_mode": False,           # 縮退モード（Geminiを使わず抽出型要約で投稿する）
+    "gemini_api_endpoint": "",        # Gemini APIの接続先（空の場合はGoogle、負荷試験では代替サーバーのURL）
+    "gemini_max_concurrency": 4,      # Gemini APIへの同時リクエスト数の上限
+    "gemini_interactive_reserved": 1, # うちQ&Aなど対話的リクエスト専用に予約する枠
+    "gemini_fanout_extra": 4,         # 長文のチャンク要約だけが追加で使える同時リクエスト数
+    "gemini_hedging": False,          # Q&Aの応答が遅い場合に別キーへ重複リクエストを送るか
+    "gemini_hedge_percentile": 0.95,  # ヘッジを送るまでの待機時間（直近レイテンシのパーセンタイル）
+    "gemini_hedge_budget": 0.05,      # ヘッジによる追加リクエストの割合の上限
+    "gemini_breaker_failure_threshold": 5,   # サーキットブレーカーを開く連続失敗回数
+    "gemini_breaker_recovery_seconds": 60,   # サーキットを開いてから試行を再開するまでの秒数
+    "reenrich_interval": 60,          # 縮退処理した記事の再処理を確認する間隔（秒）
+    "reenrich_base_delay": 60,        # 再処理の初回待ち時間（秒、失敗ごとに倍増）
+    "reenrich_max_delay": 3600,       # 再処理の待ち時間の上限（秒）
+    "reenrich_max_attempts": 8,       # 再処理の最大試行回数
+    "article_retention_days": 30,     # 処理済みの記録や配信できなかった項目などを保持する日数（毎日削除）
     "classify": False,     # ジャンル分類を有効にするか
+    "local_classifier": True,              # LLMの分類結果から学習するローカル分類器を使うか
+    "local_classifier_threshold": 0.8,     # ローカル分類器の結果を採用する確信度
+    "local_classifier_min_samples": 50,    # ローカル分類器を使い始める学習件数
+    "local_classifier_min_class_samples": 10,  # ローカル分類器の予測に使うカテゴリごとの学習件数（2カテゴリ以上必要）
+    "local_classifier_path": "data/local_classifier.json",  # ローカル分類器の保存先
+    "qa_context_token_budget": 3000,       # Q&Aプロンプトに含める記事パッセージのトークン予算
+    "qa_passage_chars": 400,               # 記事をパッセージに分割する際の最大文字数
+    "qa_cache_ttl": 3600,                  # Q&Aキャッシュの有効期限（秒）
+    "qa_cache_size": 1024,                 # キャッシュする回答の最大件数
+    "qa_context_cache_size": 256,          # キャッシュする検索コンテキスト（元記事ごと）の最大件数
+    "keyword_extraction": "local",         # 検索用キーワードの抽出方法（local: TF-IDF / llm: Gemini）
     
     # カテゴリ設定
     "categories": [
@@ -10,6 +10,8 @@ RSS/atomフィードの処理と管理を行う
 from .feed_manager import FeedManager
 from .feed_parser import FeedParser
 from .article_store import ArticleStore
+from .article_filter import ArticleFilter
+from .delivery_queue import DeliveryQueue
 
-__all__ = ["FeedManager", "FeedParser", "ArticleStore"]
+__all__ = ["FeedManager", "FeedParser", "ArticleStore", "ArticleFilter", "DeliveryQueue"]
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+記事フィルター
+
+フィードごとの包含・除外ルール（キーワード、正規表現、著者、カテゴリ）を
+1つの結合正規表現と集合にコンパイルし、AI処理の前に不要な記事を取り除く。
+"""
+
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 本文のうち照合に使う先頭部分の文字数
+MATCH_CHARS = 5000
+
+_ASCII_WORD_RE = re.compile(r"[A-Za-z0-9_]")
+
+
+def _keyword_pattern(keyword: str) -> str:
+    """
+    キーワードを照合する正規表現に変換する
+
+    英数字の端は前後に英数字が続く位置では一致させない（"AI" が "Spain" に一致しない）。
+    日本語は部分一致のままにし、"AIが" のように日本語と続く英単語も一致させる。
+    """
+    pattern = re.escape(keyword)
+    if _ASCII_WORD_RE.match(keyword[0]):
+        pattern = r"(?<![A-Za-z0-9_])" + pattern
+    if _ASCII_WORD_RE.match(keyword[-1]):
+        pattern += r"(?![A-Za-z0-9_])"
+    return pattern
+
+
+class _RuleSet:
+    """包含または除外のどちらか一方のルールをコンパイルしたもの"""
+
+    def __init__(self, rules: Optional[Dict[str, Any]], strict: bool = False):
+        rules = rules or {}
+        patterns = [_keyword_pattern(k) for k in rules.get("keywords", []) if k]
+        for pattern in rules.get("regex", []):
+            try:
+                re.compile(pattern)
+                patterns.append(pattern)
+            except re.error as e:
+                if strict:
+                    raise
+                logger.warning(f"無効な正規表現をフィルターから除外しました: {pattern}: {e}")
+
+        # すべてのキーワードと正規表現を1つの正規表現にまとめ、1回の走査で照合する。
+        # 先頭以外に置けないインラインフラグ（(?i) など）を含む場合は個別にコンパイルする
+        self.texts: List[Pattern[str]] = []
+        if patterns:
+            try:
+                self.texts = [re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)]
+            except re.error:
+                self.texts = [re.compile(p, re.IGNORECASE) for p in patterns]
+        self.authors = {a.strip().lower() for a in rules.get("authors", []) if a.strip()}
+        self.categories = {c.strip().lower() for c in rules.get("categories", []) if c.strip()}
+
+    def __bool__(self) -> bool:
+        return bool(self.texts or self.authors or self.categories)
+
+    def matches(self, text: str, author: str, categories: List[str]) -> bool:
+        if any(pattern.search(text) for pattern in self.texts):
+            return True
+        if self.authors and author in self.authors:
+            return True
+        return bool(self.categories and self.categories.intersection(categories))
+
+
+class ArticleFilter:
+    """フィードごとの記事フィルタークラス"""
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None, strict: bool = False):
+        """
+        初期化
+
+        Args:
+            rules: {"include": {...}, "exclude": {...}}。それぞれ "keywords", "regex",
+                "authors", "categories" のリストを持つ。includeが空の場合はすべて包含する。
+            strict: Trueの場合は無効な正規表現を除外せず re.error を送出する（設定の検証用）
+        """
+        rules = rules or {}
+        self.include = _RuleSet(rules.get("include"), strict)
+        self.exclude = _RuleSet(rules.get("exclude"), strict)
+
+    def __bool__(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def accepts(self, article: Dict[str, Any]) -> bool:
+        """
+        記事がフィルターを通過するかを判定する
+
+        Args:
+            article: 記事データ
+
+        Returns:
+            除外ルールに一致せず、包含ルールがあればそのいずれかに一致する場合はTrue
+        """
+        text = f"{article.get('title', '')}\n{(article.get('content') or '')[:MATCH_CHARS]}"
+        author = (article.get("author") or "").strip().lower()
+        categories = [c.strip().lower() for c in article.get("categories", []) if c]
+
+        if self.exclude and self.exclude.matches(text, author, categories):
+            return False
+        if self.include:
+            return self.include.matches(text, author, categories)
+        return True
+
+
+class FilterCache:
+    """フィードごとにコンパイル済みのフィルターを保持し、設定が変わった場合のみ再コンパイルする"""
+
+    def __init__(self):
+        self._filters: Dict[str, Tuple[str, ArticleFilter]] = {}
+
+    def get(self, feed: Dict[str, Any]) -> Optional[ArticleFilter]:
+        """
+        フィードのフィルターを取得する
+
+        Args:
+            feed: フィード情報辞書（"filters" にルールを持つ）
+
+        Returns:
+            コンパイル済みのフィルター、ルールがない場合はNone
+        """
+        rules = feed.get("filters")
+        url = feed.get("url", "")
+        if not rules:
+            self._filters.pop(url, None)
+            return None
+
+        fingerprint = json.dumps(rules, sort_keys=True, ensure_ascii=False)
+        cached = self._filters.get(url)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        article_filter = ArticleFilter(rules)
+        self._filters[url] = (fingerprint, article_filter)
+        logger.info(f"フィードのフィルターをコンパイルしました: {url}")
+        return article_filter
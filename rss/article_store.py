@@ -8,14 +8,20 @@
 """
 
 import os
+import json
 import logging
 import sqlite3
 import asyncio
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 from datetime import datetime, timezone, timedelta
 
 logger = logging.getLogger(__name__)
 
+# 記事の処理状態（この順にだけ進む）
+ARTICLE_STATES = ("discovered", "enriching", "enriched", "queued", "posted", "associated")
+# 再配信の上限に達して投稿できなかった記事の状態（queued からのみ移る終端の状態）
+FAILED_STATE = "failed"
+
 class ArticleStore:
     """処理済み記事管理クラス"""
     
@@ -65,6 +71,103 @@ class ArticleStore:
             ''')
 
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_channel ON articles (channel_id)')
+
+            # 投稿後に記事を更新（再処理結果で編集）できるよう記事IDを紐付ける
+            cursor.execute('PRAGMA table_info(articles)')
+            if 'article_id' not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute('ALTER TABLE articles ADD COLUMN article_id TEXT')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_article_id ON articles (article_id)')
+
+            # Gemini APIの障害中に縮退処理した記事の再処理キュー
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS reenrich_queue (
+                    article_id TEXT PRIMARY KEY,
+                    channel_id TEXT NOT NULL,
+                    feed_url TEXT,
+                    article_json TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_reenrich_next ON reenrich_queue (next_attempt_at)')
+
+            # ダイジェスト配信のフィードで、まとめて投稿するまで記事を溜めておくバッファ
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS digest_buffer (
+                    article_id TEXT PRIMARY KEY,
+                    feed_url TEXT NOT NULL,
+                    article_json TEXT NOT NULL,
+                    added_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_digest_feed ON digest_buffer (feed_url, added_at)')
+
+            # 記事ごとの処理状態。再起動時に途中の記事を続きから処理するため、AI処理の結果も保持する
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS article_states (
+                    article_id TEXT PRIMARY KEY,
+                    feed_url TEXT,
+                    channel_id TEXT,
+                    state TEXT NOT NULL,
+                    article_json TEXT NOT NULL,
+                    processed_json TEXT,
+                    delivery_id INTEGER,
+                    message_id TEXT,
+                    updated_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_states_state ON article_states (state)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_article_states_delivery ON article_states (delivery_id)')
+
+            # 再配信の上限に達して配信キューから外した項目（原因の調査と再投入のため保持する）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS delivery_dead_letters (
+                    delivery_id INTEGER PRIMARY KEY,
+                    article_id TEXT,
+                    channel_id TEXT,
+                    item_json TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    failed_at TEXT NOT NULL
+                )
+            ''')
+
+            # 配信IDごとの投稿記事データ。投稿後の紐付けで記事全文を受け取り直さずに済むよう、キュー追加時に保存する
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS delivery_articles (
+                    delivery_id INTEGER PRIMARY KEY,
+                    article_id TEXT,
+                    article_json TEXT NOT NULL,
+                    keywords_en TEXT,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+
+            # キーワード抽出（TF-IDF）用の文書頻度テーブル
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS term_stats (
+                    term TEXT PRIMARY KEY,
+                    doc_count INTEGER NOT NULL
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS corpus_stats (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+
+            # 文書頻度に加算済みの文書（再処理での二重加算を防ぐ。古い記事と同じ期間で削除する）
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS term_stats_documents (
+                    document_id TEXT PRIMARY KEY,
+                    added_at TEXT NOT NULL DEFAULT ''
+                )
+            ''')
+            cursor.execute('PRAGMA table_info(term_stats_documents)')
+            if 'added_at' not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE term_stats_documents ADD COLUMN added_at TEXT NOT NULL DEFAULT ''")
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_term_stats_documents_added ON term_stats_documents (added_at)')
             
             # インデックス作成
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_feed_url ON processed_articles (feed_url)')
@@ -270,12 +373,156 @@ class ArticleStore:
         try:
             cursor.execute('DELETE FROM processed_articles WHERE processed_at < ?', (cutoff_date,))
             count = cursor.rowcount
+            cursor.execute('DELETE FROM article_states WHERE updated_at < ?', (cutoff_date,))
+            cursor.execute('DELETE FROM delivery_articles WHERE created_at < ?', (cutoff_date,))
+            cursor.execute('DELETE FROM delivery_dead_letters WHERE failed_at < ?', (cutoff_date,))
+            cursor.execute('DELETE FROM term_stats_documents WHERE added_at < ?', (cutoff_date,))
             conn.commit()
             return count
             
         finally:
             conn.close()
 
+    def save_delivery_article(
+        self,
+        conn: sqlite3.Connection,
+        delivery_id: int,
+        article_id: Optional[str],
+        article: Dict[str, Any],
+        keywords_en: str,
+    ) -> None:
+        """
+        投稿キューに追加した項目の記事データを配信IDで保存する（投稿後の紐付けで使用）
+
+        配信キューへの追加と同じトランザクションで保存するため、呼び出し側の接続を使い、コミットはしない。
+
+        Args:
+            conn: 配信キューへの追加に使っている接続
+            delivery_id: 配信ID
+            article_id: 記事ID
+            article: 紐付けて保存する記事データ（タイトルと本文）
+            keywords_en: 関連記事検索用の英語キーワード
+        """
+        conn.execute(
+            'INSERT OR REPLACE INTO delivery_articles '
+            '(delivery_id, article_id, article_json, keywords_en, created_at) VALUES (?, ?, ?, ?, ?)',
+            (
+                delivery_id,
+                article_id,
+                json.dumps(article, ensure_ascii=False),
+                keywords_en,
+                datetime.now(timezone.utc).isoformat(),
+            ),
+        )
+
+    def save_dead_letter(self, conn: sqlite3.Connection, delivery_id: int, item: Dict[str, Any]) -> None:
+        """
+        再配信の上限に達した配信キューの項目を保存し、記事の処理状態を failed にする
+
+        配信キューからの削除と同じトランザクションで保存するため、呼び出し側の接続を使い、コミットはしない。
+
+        Args:
+            conn: 配信キューの取り出しに使っている接続
+            delivery_id: 配信ID
+            item: 配信キューの項目（"attempts" を含む）
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        conn.execute(
+            'INSERT OR REPLACE INTO delivery_dead_letters '
+            '(delivery_id, article_id, channel_id, item_json, attempts, failed_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                delivery_id,
+                item.get("article_id"),
+                item.get("channel_id"),
+                json.dumps(item, ensure_ascii=False),
+                item.get("attempts", 0),
+                now,
+            ),
+        )
+        conn.execute(
+            'UPDATE article_states SET state = ?, updated_at = ? WHERE delivery_id = ? AND state = ?',
+            (FAILED_STATE, now, delivery_id, "queued"),
+        )
+
+    async def get_dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        再配信の上限に達して投稿できなかった項目を新しい順に取得する
+
+        Args:
+            limit: 最大件数
+
+        Returns:
+            {"delivery_id", "article_id", "channel_id", "item", "attempts", "failed_at"} のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_dead_letters(limit))
+            except Exception as e:
+                logger.error(f"配信できなかった項目の取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_dead_letters(self, limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(
+                'SELECT * FROM delivery_dead_letters ORDER BY failed_at DESC, delivery_id DESC LIMIT ?', (limit,)
+            ).fetchall()
+            letters = []
+            for row in rows:
+                letter = dict(row)
+                letter["item"] = json.loads(letter.pop("item_json"))
+                letters.append(letter)
+            return letters
+        finally:
+            conn.close()
+
+    async def associate_delivery(
+        self, delivery_id: int, message_id: str, channel_id: str, limit: int = 1000
+    ) -> Optional[Dict[str, Any]]:
+        """
+        配信IDで保存した記事データを投稿メッセージに紐付けて記事全文として保存する
+
+        Args:
+            delivery_id: 配信ID
+            message_id: DiscordのメッセージID
+            channel_id: 投稿先チャンネルID
+            limit: チャンネルごとに保持する記事全文の件数
+
+        Returns:
+            紐付けた記事の {"article_id"}、配信IDの記事データが見つからない場合はNone
+        """
+        async with self.lock:
+            try:
+                now = datetime.now(timezone.utc).isoformat()
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(
+                    None, lambda: self._associate_delivery(delivery_id, message_id, channel_id, now, limit)
+                )
+            except Exception as e:
+                logger.error(f"配信記事の紐付け中にエラーが発生しました: {e}", exc_info=True)
+                return None
+
+    def _associate_delivery(
+        self, delivery_id: int, message_id: str, channel_id: str, created_at: str, limit: int
+    ) -> Optional[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT article_id, article_json, keywords_en FROM delivery_articles WHERE delivery_id = ?',
+                (delivery_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        article_id, article_json, keywords_en = row
+        self._add_full_article(
+            message_id, channel_id, json.loads(article_json), keywords_en or "", created_at, limit, article_id
+        )
+        return {"article_id": article_id}
+
     async def add_full_article(
         self,
         message_id: str,
@@ -283,6 +530,7 @@ class ArticleStore:
         article: Dict[str, Any],
         keywords_en: str,
         limit: int = 1000,
+        article_id: Optional[str] = None,
     ) -> bool:
         """記事全文を保存する"""
         async with self.lock:
@@ -292,7 +540,7 @@ class ArticleStore:
                 await loop.run_in_executor(
                     None,
                     lambda: self._add_full_article(
-                        message_id, channel_id, article, keywords_en, now, limit
+                        message_id, channel_id, article, keywords_en, now, limit, article_id
                     ),
                 )
                 return True
@@ -308,12 +556,13 @@ class ArticleStore:
         keywords_en: str,
         created_at: str,
         limit: int,
+        article_id: Optional[str] = None,
     ) -> None:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute(
-                'INSERT OR REPLACE INTO articles (message_id, channel_id, title, content, feed_url, created_at, keywords_en) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                'INSERT OR REPLACE INTO articles (message_id, channel_id, title, content, feed_url, created_at, keywords_en, article_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
                 (
                     message_id,
                     channel_id,
@@ -322,6 +571,7 @@ class ArticleStore:
                     article.get("feed_url"),
                     created_at,
                     keywords_en,
+                    article_id,
                 ),
             )
             conn.commit()
@@ -359,6 +609,53 @@ class ArticleStore:
         finally:
             conn.close()
 
+    async def get_message_id_for_article(self, article_id: str) -> Optional[str]:
+        """記事IDに紐付いた投稿メッセージIDを取得する（未投稿の場合はNone）"""
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_message_id_for_article(article_id))
+            except Exception as e:
+                logger.error(f"メッセージIDの取得中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return None
+
+    def _get_message_id_for_article(self, article_id: str) -> Optional[str]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'SELECT message_id FROM articles WHERE article_id = ? ORDER BY created_at DESC LIMIT 1',
+                (article_id,),
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    async def get_full_articles(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        """複数の保存された記事を指定順で取得する（存在しないものは除く）"""
+        if not message_ids:
+            return []
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_full_articles(message_ids))
+            except Exception as e:
+                logger.error(f"記事取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_full_articles(self, message_ids: List[str]) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            placeholders = ",".join("?" for _ in message_ids)
+            cursor.execute(f'SELECT * FROM articles WHERE message_id IN ({placeholders})', list(message_ids))
+            rows = {row["message_id"]: dict(row) for row in cursor.fetchall()}
+            return [rows[mid] for mid in message_ids if mid in rows]
+        finally:
+            conn.close()
+
     async def find_related_articles(
         self, keywords: List[str], original_article_id: str, limit: int = 15
     ) -> List[Dict[str, Any]]:
@@ -398,3 +695,467 @@ class ArticleStore:
         finally:
             conn.close()
 
+
+    async def get_document_frequencies(self, terms: Iterable[str]) -> Tuple[int, Dict[str, int]]:
+        """
+        語の文書頻度を取得する
+
+        Args:
+            terms: 対象の語
+
+        Returns:
+            (総文書数, 語と文書頻度の辞書)のタプル
+        """
+        terms = list(set(terms))
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_document_frequencies(terms))
+            except Exception as e:
+                logger.error(f"文書頻度の取得中にエラーが発生しました: {e}", exc_info=True)
+                return 0, {}
+
+    def _get_document_frequencies(self, terms: List[str]) -> Tuple[int, Dict[str, int]]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT value FROM corpus_stats WHERE key = 'documents'")
+            row = cursor.fetchone()
+            total = row[0] if row else 0
+
+            frequencies: Dict[str, int] = {}
+            # SQLiteのプレースホルダ上限を避けるため分割して問い合わせる
+            for i in range(0, len(terms), 500):
+                batch = terms[i:i + 500]
+                placeholders = ",".join("?" for _ in batch)
+                cursor.execute(
+                    f"SELECT term, doc_count FROM term_stats WHERE term IN ({placeholders})",
+                    batch,
+                )
+                frequencies.update(dict(cursor.fetchall()))
+            return total, frequencies
+        finally:
+            conn.close()
+
+    async def add_document_terms(self, terms: Iterable[str], document_id: Optional[str] = None) -> bool:
+        """
+        1文書分の語を文書頻度テーブルに加算する
+
+        Args:
+            terms: 文書に含まれる語（重複は1回として数える）
+            document_id: 文書のID（指定した場合、同じIDの文書は一度だけ加算する）
+
+        Returns:
+            加算した場合はTrue（加算済みの文書や失敗した場合はFalse）
+        """
+        terms = list(set(terms))
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._add_document_terms(terms, document_id))
+            except Exception as e:
+                logger.error(f"文書頻度の更新中にエラーが発生しました: {e}", exc_info=True)
+                return False
+
+    def _add_document_terms(self, terms: List[str], document_id: Optional[str]) -> bool:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            if document_id is not None:
+                cursor.execute(
+                    "INSERT OR IGNORE INTO term_stats_documents (document_id, added_at) VALUES (?, ?)",
+                    (document_id, datetime.now(timezone.utc).isoformat()),
+                )
+                if cursor.rowcount == 0:
+                    return False
+            cursor.execute(
+                "INSERT INTO corpus_stats (key, value) VALUES ('documents', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+            cursor.executemany(
+                "INSERT INTO term_stats (term, doc_count) VALUES (?, 1) "
+                "ON CONFLICT(term) DO UPDATE SET doc_count = doc_count + 1",
+                [(term,) for term in terms],
+            )
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    async def enqueue_reenrich(
+        self,
+        article_id: str,
+        channel_id: str,
+        feed_url: Optional[str],
+        article: Dict[str, Any],
+        delay: float = 0,
+    ) -> bool:
+        """
+        縮退処理した記事を再処理キューに追加する
+
+        Args:
+            article_id: 記事ID
+            channel_id: 投稿先チャンネルID
+            feed_url: フィードURL
+            article: AI処理前の記事データ
+            delay: 最初の再処理までの秒数
+
+        Returns:
+            追加成功の場合はTrue
+        """
+        async with self.lock:
+            try:
+                next_attempt_at = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
+                article_json = json.dumps(article, ensure_ascii=False)
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None,
+                    lambda: self._execute(
+                        'INSERT OR REPLACE INTO reenrich_queue (article_id, channel_id, feed_url, article_json, attempts, next_attempt_at) '
+                        'VALUES (?, ?, ?, ?, 0, ?)',
+                        (article_id, channel_id, feed_url, article_json, next_attempt_at),
+                    ),
+                )
+                return True
+            except Exception as e:
+                logger.error(f"再処理キューへの追加中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return False
+
+    async def get_due_reenrich(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        再処理の時刻になった記事を取得する
+
+        Returns:
+            {"article_id", "channel_id", "feed_url", "article", "attempts"} のリスト
+        """
+        async with self.lock:
+            try:
+                now = datetime.now(timezone.utc).isoformat()
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_due_reenrich(now, limit))
+            except Exception as e:
+                logger.error(f"再処理キューの取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_due_reenrich(self, now: str, limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'SELECT * FROM reenrich_queue WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?',
+                (now, limit),
+            )
+            items = []
+            for row in cursor.fetchall():
+                item = dict(row)
+                item["article"] = json.loads(item.pop("article_json"))
+                items.append(item)
+            return items
+        finally:
+            conn.close()
+
+    async def reschedule_reenrich(self, article_id: str, attempts: int, delay: float) -> bool:
+        """再処理に失敗した記事の試行回数と次回の再処理時刻を更新する"""
+        async with self.lock:
+            try:
+                next_attempt_at = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None,
+                    lambda: self._execute(
+                        'UPDATE reenrich_queue SET attempts = ?, next_attempt_at = ? WHERE article_id = ?',
+                        (attempts, next_attempt_at, article_id),
+                    ),
+                )
+                return True
+            except Exception as e:
+                logger.error(f"再処理時刻の更新中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return False
+
+    async def remove_reenrich(self, article_id: str) -> bool:
+        """記事を再処理キューから削除する"""
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None,
+                    lambda: self._execute('DELETE FROM reenrich_queue WHERE article_id = ?', (article_id,)),
+                )
+                return True
+            except Exception as e:
+                logger.error(f"再処理キューからの削除中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return False
+
+    async def add_digest_item(self, feed_url: str, article_id: str, article: Dict[str, Any]) -> bool:
+        """
+        ダイジェストのバッファに記事を追加する
+
+        Args:
+            feed_url: フィードURL
+            article_id: 記事ID
+            article: AI処理前の記事データ
+
+        Returns:
+            追加成功の場合はTrue
+        """
+        async with self.lock:
+            try:
+                now = datetime.now(timezone.utc).isoformat()
+                article_json = json.dumps(article, ensure_ascii=False)
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(
+                    None,
+                    lambda: self._execute(
+                        'INSERT OR IGNORE INTO digest_buffer (article_id, feed_url, article_json, added_at) VALUES (?, ?, ?, ?)',
+                        (article_id, feed_url, article_json, now),
+                    ),
+                )
+                return True
+            except Exception as e:
+                logger.error(f"ダイジェストへの記事追加中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return False
+
+    async def get_digest_items(self, feed_url: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        フィードのダイジェストのバッファを古い順に取得する
+
+        Returns:
+            {"article_id", "article", "added_at"} のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_digest_items(feed_url, limit))
+            except Exception as e:
+                logger.error(f"ダイジェストのバッファ取得中にエラーが発生しました: {feed_url}: {e}", exc_info=True)
+                return []
+
+    def _get_digest_items(self, feed_url: str, limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                'SELECT article_id, article_json, added_at FROM digest_buffer WHERE feed_url = ? ORDER BY added_at LIMIT ?',
+                (feed_url, limit),
+            )
+            return [
+                {"article_id": article_id, "article": json.loads(article_json), "added_at": added_at}
+                for article_id, article_json, added_at in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
+
+    async def remove_digest_items(self, article_ids: List[str]) -> bool:
+        """ダイジェストとして投稿した記事をバッファから削除する"""
+        if not article_ids:
+            return True
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                placeholders = ",".join("?" for _ in article_ids)
+                await loop.run_in_executor(
+                    None,
+                    lambda: self._execute(
+                        f'DELETE FROM digest_buffer WHERE article_id IN ({placeholders})', tuple(article_ids)
+                    ),
+                )
+                return True
+            except Exception as e:
+                logger.error(f"ダイジェストのバッファ削除中にエラーが発生しました: {e}", exc_info=True)
+                return False
+
+    async def discover_article(
+        self, article_id: str, feed_url: str, channel_id: str, article: Dict[str, Any]
+    ) -> bool:
+        """
+        新しい記事を処理済みとして記録し、処理状態を discovered にする
+
+        Args:
+            article_id: 記事ID
+            feed_url: フィードURL
+            channel_id: 投稿先チャンネルID
+            article: AI処理前の記事データ
+
+        Returns:
+            記録した場合はTrue（すでに処理状態がある場合はFalse）
+        """
+        async with self.lock:
+            try:
+                now = datetime.now(timezone.utc).isoformat()
+                article_json = json.dumps(article, ensure_ascii=False)
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(
+                    None, lambda: self._discover_article(article_id, feed_url, channel_id, article_json, now)
+                )
+            except Exception as e:
+                logger.error(f"記事の処理状態の記録中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return False
+
+    def _discover_article(self, article_id: str, feed_url: str, channel_id: str, article_json: str, now: str) -> bool:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # 処理済みの記録と処理状態は同じトランザクションで書き込む
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO article_states (article_id, feed_url, channel_id, state, article_json, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (article_id, feed_url, channel_id, ARTICLE_STATES[0], article_json, now),
+            )
+            created = cursor.rowcount > 0
+            conn.execute(
+                'INSERT OR REPLACE INTO processed_articles (article_id, feed_url, channel_id, processed_at) VALUES (?, ?, ?, ?)',
+                (article_id, feed_url, channel_id, now),
+            )
+            conn.commit()
+            return created
+        finally:
+            conn.close()
+
+    async def advance_article_state(
+        self,
+        article_id: str,
+        state: str,
+        processed: Optional[Dict[str, Any]] = None,
+        delivery_id: Optional[int] = None,
+        message_id: Optional[str] = None,
+    ) -> bool:
+        """
+        記事の処理状態を進める（現在より前の状態には戻さない）
+
+        Args:
+            article_id: 記事ID
+            state: 新しい状態（ARTICLE_STATESのいずれか）
+            processed: AI処理済みの記事データ（enriched の時に保存する）
+            delivery_id: 配信ID（queued の時に保存する）
+            message_id: DiscordのメッセージID（associated の時に保存する）
+
+        Returns:
+            状態を進めた場合はTrue
+        """
+        fields: Dict[str, Any] = {}
+        if processed is not None:
+            fields["processed_json"] = json.dumps(processed, ensure_ascii=False)
+        if delivery_id is not None:
+            fields["delivery_id"] = delivery_id
+        if message_id is not None:
+            fields["message_id"] = message_id
+        return await self._advance_state("article_id", article_id, state, fields)
+
+    async def advance_state_by_delivery(self, delivery_id: int, state: str) -> bool:
+        """配信IDに対応する記事の処理状態を進める（投稿の確認応答で posted にする）"""
+        return await self._advance_state("delivery_id", delivery_id, state, {})
+
+    async def _advance_state(self, key_column: str, key: Any, state: str, fields: Dict[str, Any]) -> bool:
+        async with self.lock:
+            try:
+                now = datetime.now(timezone.utc).isoformat()
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(
+                    None, lambda: self._advance_state_sync(key_column, key, state, fields, now)
+                )
+            except Exception as e:
+                logger.error(f"記事の処理状態の更新中にエラーが発生しました: {key} -> {state}: {e}", exc_info=True)
+                return False
+
+    def _advance_state_sync(self, key_column: str, key: Any, state: str, fields: Dict[str, Any], now: str) -> bool:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(f'SELECT article_id, state FROM article_states WHERE {key_column} = ?', (key,)).fetchone()
+            if row is None or ARTICLE_STATES.index(row[1]) >= ARTICLE_STATES.index(state):
+                return False
+            assignments = ", ".join(["state = ?", "updated_at = ?"] + [f"{column} = ?" for column in fields])
+            conn.execute(
+                f'UPDATE article_states SET {assignments} WHERE article_id = ?',
+                (state, now, *fields.values(), row[0]),
+            )
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    async def get_unfinished_articles(self, states: Iterable[str] = ARTICLE_STATES[:3]) -> List[Dict[str, Any]]:
+        """
+        指定した処理状態のままの記事を取得する（再起動時の再開用）
+
+        Args:
+            states: 対象の処理状態（デフォルトは投稿キューに入る前の状態）
+
+        Returns:
+            {"article_id", "feed_url", "channel_id", "state", "article", "processed"} のリスト
+        """
+        states = list(states)
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._get_unfinished_articles(states))
+            except Exception as e:
+                logger.error(f"処理途中の記事の取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _get_unfinished_articles(self, states: List[str]) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            placeholders = ",".join("?" for _ in states)
+            rows = conn.execute(
+                'SELECT article_id, feed_url, channel_id, state, article_json, processed_json FROM article_states '
+                f'WHERE state IN ({placeholders}) ORDER BY updated_at',
+                states,
+            ).fetchall()
+            articles = []
+            for row in rows:
+                item = dict(row)
+                item["article"] = json.loads(item.pop("article_json"))
+                processed_json = item.pop("processed_json")
+                item["processed"] = json.loads(processed_json) if processed_json else None
+                articles.append(item)
+            return articles
+        finally:
+            conn.close()
+
+    async def forget_article(self, article_id: str) -> bool:
+        """処理に失敗した記事の処理済みの記録と処理状態を削除する（次回のフィード確認で再び処理される）"""
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, lambda: self._forget_article(article_id))
+                return True
+            except Exception as e:
+                logger.error(f"記事の処理状態の削除中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+                return False
+
+    def _forget_article(self, article_id: str) -> None:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('DELETE FROM article_states WHERE article_id = ?', (article_id,))
+            conn.execute('DELETE FROM processed_articles WHERE article_id = ?', (article_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    async def count_article_states(self) -> Dict[str, int]:
+        """処理状態ごとの記事数を取得する"""
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, self._count_article_states)
+            except Exception as e:
+                logger.error(f"処理状態の集計中にエラーが発生しました: {e}", exc_info=True)
+                return {}
+
+    def _count_article_states(self) -> Dict[str, int]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            counts = dict(conn.execute('SELECT state, COUNT(*) FROM article_states GROUP BY state').fetchall())
+            return {state: counts.get(state, 0) for state in ARTICLE_STATES + (FAILED_STATE,)}
+        finally:
+            conn.close()
+
+    def _execute(self, query: str, params: Tuple) -> None:
+        """更新クエリを1件実行する（同期処理）"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(query, params)
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配信の滞留に応じたバックプレッシャー
+
+チャンネルごとの配信待ちの件数と最も古い項目の滞留時間を監視し、上限を超えたチャンネルの
+記事の取得とAI処理を一時停止する。下限を下回るまで再開しない（ヒステリシス）ことで、
+上限付近で停止と再開を繰り返さないようにする。
+"""
+
+import logging
+from typing import Any, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class BackpressureController:
+    """配信待ちの滞留からチャンネルごとの一時停止を判断するクラス"""
+
+    def __init__(
+        self,
+        high_depth: int = 50,
+        low_depth: int = 20,
+        high_age: float = 3600,
+        low_age: float = 1200,
+    ):
+        """
+        初期化
+
+        Args:
+            high_depth: 一時停止する配信待ちの件数（0で件数による停止を無効化）
+            low_depth: 再開する配信待ちの件数
+            high_age: 一時停止する最も古い項目の滞留秒数（0で滞留時間による停止を無効化）
+            low_age: 再開する最も古い項目の滞留秒数
+        """
+        self.high_depth = high_depth
+        self.low_depth = min(low_depth, high_depth) if high_depth else low_depth
+        self.high_age = high_age
+        self.low_age = min(low_age, high_age) if high_age else low_age
+        self.backlog: Dict[str, Dict[str, float]] = {}
+        self.paused: Set[str] = set()
+
+    def _over_high(self, depth: float, age: float) -> bool:
+        return bool(
+            (self.high_depth and depth >= self.high_depth)
+            or (self.high_age and age >= self.high_age)
+        )
+
+    def _under_low(self, depth: float, age: float) -> bool:
+        return (
+            (not self.high_depth or depth <= self.low_depth)
+            and (not self.high_age or age <= self.low_age)
+        )
+
+    def update(self, backlog: Dict[str, Dict[str, float]]) -> None:
+        """
+        配信キューの滞留状況から一時停止するチャンネルを更新する
+
+        Args:
+            backlog: チャンネルID -> {"depth": 件数, "age": 最も古い項目の滞留秒数}
+        """
+        self.backlog = backlog
+        for channel_id in set(backlog) | self.paused:
+            stats = backlog.get(channel_id, {})
+            depth = stats.get("depth", 0)
+            age = stats.get("age", 0.0)
+            if channel_id in self.paused:
+                if self._under_low(depth, age):
+                    self.paused.discard(channel_id)
+                    logger.info(f"配信待ちが減ったため記事の処理を再開します: channel={channel_id} (件数={depth}, 滞留={age:.0f}秒)")
+            elif self._over_high(depth, age):
+                self.paused.add(channel_id)
+                logger.warning(f"配信待ちが滞留しているため記事の処理を一時停止します: channel={channel_id} (件数={depth}, 滞留={age:.0f}秒)")
+
+    def is_paused(self, channel_id: str) -> bool:
+        """チャンネルの記事の処理を一時停止しているか"""
+        return channel_id in self.paused
+
+    def status(self) -> Dict[str, Any]:
+        """チャンネルごとの滞留状況と一時停止中のチャンネルを取得する"""
+        return {
+            "paused": sorted(self.paused),
+            "channels": {
+                channel_id: {"depth": stats["depth"], "age": round(stats["age"], 1)}
+                for channel_id, stats in self.backlog.items()
+            },
+        }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配信ペース制御
+
+Discordのメッセージ送信のレート制限（チャンネルごとと全体）をトークンバケットで模擬し、
+送信が成功する見込みのある項目だけを配信キューから取り出せるようにする。
+容量 burst、補充速度 rate のバケットは、任意の window 秒間に最大 burst + rate × window 件を通す。
+Discordの制限（チャンネルごとに5秒間で5件、全体で1秒間に50件）を超えないよう、既定値はこの式で決めている。
+投稿ボットからのレート制限の通知（429）でバケットを一時停止し、チャンネルの補充速度を下げる。
+成功が続くと補充速度は元の値まで徐々に戻る。
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# レート制限を受けた時に補充速度に掛ける係数と、下げられる下限（元の速度に対する比率）
+BACKOFF_FACTOR = 0.5
+MIN_RATE_RATIO = 0.1
+# 送信1回ごとに補充速度を元の速度へ戻す比率
+RECOVERY_STEP = 0.05
+
+
+class TokenBucket:
+    """トークンバケット"""
+
+    def __init__(self, capacity: float, rate: float):
+        """
+        初期化
+
+        Args:
+            capacity: バケットの容量（連続して送信できる数）
+            rate: 1秒あたりに補充するトークン数
+        """
+        self.capacity = capacity
+        self.base_rate = rate
+        self.rate = rate
+        self.tokens = capacity
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now < self.paused_until:
+            self._updated = now
+            return
+        elapsed = now - max(self._updated, self.paused_until)
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    def available(self, now: Optional[float] = None) -> bool:
+        """トークンが1つ以上あるか"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now: Optional[float] = None) -> None:
+        """トークンを1つ消費する"""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= 1
+        # 成功が続く間は下げた補充速度を元に戻していく
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * RECOVERY_STEP)
+
+    def refund(self) -> None:
+        """消費したトークンを1つ戻す"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def pause(self, seconds: float, backoff: bool = True) -> None:
+        """
+        指定秒数トークンを補充せず、空にする
+
+        Args:
+            seconds: 停止する秒数
+            backoff: Trueの場合は補充速度も下げる
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, now + seconds)
+        if backoff:
+            self.rate = max(self.base_rate * MIN_RATE_RATIO, self.rate * BACKOFF_FACTOR)
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._refill(time.monotonic())
+        return {
+            "tokens": round(self.tokens, 2),
+            "rate": round(self.rate, 3),
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 2),
+        }
+
+
+class DeliveryPacer:
+    """Discordのレート制限に合わせて配信のペースを制御するクラス"""
+
+    def __init__(
+        self,
+        channel_burst: float = 1,
+        channel_rate: float = 0.8,
+        global_burst: float = 10,
+        global_rate: float = 40.0,
+    ):
+        """
+        初期化
+
+        Args:
+            channel_burst: チャンネルごとに連続して送信できる数
+            channel_rate: チャンネルごとの1秒あたりの送信数
+            global_burst: 全体で連続して送信できる数
+            global_rate: 全体の1秒あたりの送信数
+        """
+        self.channel_burst = channel_burst
+        self.channel_rate = channel_rate
+        self.global_bucket = TokenBucket(global_burst, global_rate)
+        self._channels: Dict[str, TokenBucket] = {}
+        # 配信キューの取り出しは別スレッドで実行されるため、バケットの更新を排他制御する
+        self._lock = threading.Lock()
+        self.rate_limited = 0
+
+    def _channel(self, channel_id: str) -> TokenBucket:
+        bucket = self._channels.get(channel_id)
+        if bucket is None:
+            bucket = self._channels[channel_id] = TokenBucket(self.channel_burst, self.channel_rate)
+        return bucket
+
+    def try_acquire(self, channel_id: str) -> bool:
+        """
+        チャンネルと全体の両方に余裕があれば送信枠を1つ消費する
+
+        Args:
+            channel_id: 投稿先チャンネルID
+
+        Returns:
+            送信できる場合はTrue
+        """
+        with self._lock:
+            now = time.monotonic()
+            channel = self._channel(channel_id)
+            if not (self.global_bucket.available(now) and channel.available(now)):
+                return False
+            self.global_bucket.take(now)
+            channel.take(now)
+            return True
+
+    def release(self, channel_id: str) -> None:
+        """送信しなかった項目の送信枠を戻す"""
+        with self._lock:
+            self.global_bucket.refund()
+            self._channel(channel_id).refund()
+
+    def report_rate_limit(self, channel_id: Optional[str], retry_after: float, is_global: bool = False) -> None:
+        """
+        投稿ボットが受けたレート制限を反映する
+
+        Args:
+            channel_id: レート制限を受けたチャンネルID（全体の制限の場合はNoneでもよい）
+            retry_after: Discordが指定した再試行までの秒数
+            is_global: 全体のレート制限の場合はTrue
+        """
+        with self._lock:
+            self.rate_limited += 1
+            if is_global or not channel_id:
+                self.global_bucket.pause(retry_after, backoff=False)
+            else:
+                self._channel(channel_id).pause(retry_after)
+        logger.warning(
+            f"Discordのレート制限を受けました: channel={channel_id or '-'}, global={is_global}, retry_after={retry_after}s"
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """全体とチャンネルごとのバケットの状態を取得する"""
+        with self._lock:
+            return {
+                "rate_limited": self.rate_limited,
+                "global": self.global_bucket.to_dict(),
+                "channels": {channel_id: bucket.to_dict() for channel_id, bucket in self._channels.items()},
+            }
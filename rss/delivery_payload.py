@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配信ペイロード
+
+投稿ボットへ渡す配信キューの項目から、ボットが読まないフィールド（元記事の複製、
+英語キーワード、キュー内部の管理情報など）を取り除き、本文をDiscordの埋め込みに
+収まる長さに切り詰める。記事の紐付けに使う元記事は配信IDでサーバー側に保存済みのため、
+ボットへ送る必要はない。
+"""
+
+import re
+from typing import Any, Dict
+
+# ボットが参照する項目のフィールド
+ITEM_FIELDS = ("type", "delivery_id", "article_id", "channel_id", "message_id")
+# ボットが埋め込みの作成に使う記事のフィールド
+ARTICLE_FIELDS = (
+    "title", "link", "summary", "content", "published", "image", "feed_title",
+    "category", "classified", "category_info", "degraded", "pending_enrichment",
+)
+# ダイジェストで使うフィールド
+DIGEST_FIELDS = ("title", "overview", "items", "feed_title")
+DIGEST_ITEM_FIELDS = ("title", "link", "summary")
+# 本文を埋め込みの説明文に使う場合の最大文字数（ボット側の切り詰めと同じ）
+EMBED_CONTENT_LIMIT = 4000
+
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def _pick(data: Dict[str, Any], fields: tuple) -> Dict[str, Any]:
+    return {key: data[key] for key in fields if data.get(key) is not None}
+
+
+def _slim_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    slim = _pick(article, ARTICLE_FIELDS)
+    if slim.get("summary"):
+        # 要約がある場合、本文は埋め込みに使われない
+        slim.pop("content", None)
+    elif slim.get("content"):
+        content = _TAG_PATTERN.sub("", slim["content"])
+        if len(content) > EMBED_CONTENT_LIMIT:
+            content = content[:EMBED_CONTENT_LIMIT - 3] + "..."
+        slim["content"] = content
+    return slim
+
+
+def _slim_digest(digest: Dict[str, Any]) -> Dict[str, Any]:
+    slim = _pick(digest, DIGEST_FIELDS)
+    slim["items"] = [_pick(item, DIGEST_ITEM_FIELDS) for item in digest.get("items", [])]
+    return slim
+
+
+def slim_delivery_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    配信キューの項目を投稿ボットが使うフィールドだけに絞る
+
+    Args:
+        item: 配信キューからリースした項目
+
+    Returns:
+        投稿ボットへ送る項目
+    """
+    slim = _pick(item, ITEM_FIELDS)
+    processed = item.get("processed_article") or {}
+    if item.get("type") == "digest":
+        slim["processed_article"] = _slim_digest(processed)
+    else:
+        slim["processed_article"] = _slim_article(processed)
+    return slim
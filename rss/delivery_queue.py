@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配信キュー
+
+AI処理済みでDiscordへの投稿を待つ項目をSQLiteに永続化する。
+取り出し（リース）した項目は一定時間ほかの取り出しから見えなくなり、
+ボットが投稿後に確認応答（ack）すると削除される。確認応答がないまま
+可視性タイムアウトを過ぎた項目は再配信されるため、再起動や投稿失敗で記事が失われない。
+キューは投稿先チャンネルごとに分かれており、取り出しはチャンネルを順番に巡回するため、
+記事の多いフィードがほかのチャンネルの投稿を待たせない。ペース制御を指定すると、
+Discordのレート制限の範囲で送信できるチャンネルの項目だけを取り出す。
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .delivery_pacer import DeliveryPacer
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryQueue:
+    """投稿待ち項目の永続キュークラス"""
+
+    def __init__(
+        self,
+        db_path: str = None,
+        visibility_timeout: float = 120.0,
+        max_attempts: int = 10,
+        pacer: Optional[DeliveryPacer] = None,
+        on_dead_letter: Optional[Callable[[sqlite3.Connection, int, Dict[str, Any]], None]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            db_path: データベースファイルのパス（指定がない場合はデフォルト）
+            visibility_timeout: リースした項目が再配信されるまでの秒数
+            max_attempts: この回数リースしても確認応答がない項目はキューから外す
+            pacer: 送信枠のあるチャンネルの項目だけを取り出すためのペース制御（Noneで制限なし）
+            on_dead_letter: キューから外す項目を (接続, 配信ID, 項目) で受け取り、削除と同じトランザクションで
+                実行する処理（外した項目の記録と記事の処理状態の更新のため）
+        """
+        self.db_path = db_path or os.path.join("data", "processed_articles.db")
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.pacer = pacer
+        self.on_dead_letter = on_dead_letter
+        self.lock = asyncio.Lock()  # 同時アクセス防止用ロック
+        # 項目が追加されたことを待機中の取り出し（ロングポーリング）に知らせる
+        self._added = asyncio.Event()
+        # 最後に項目を取り出したチャンネル（次の取り出しはその次のチャンネルから始める）
+        self._last_channel: Optional[str] = None
+
+        self._init_db()
+
+    def _init_db(self) -> None:
+        """データベースを初期化する"""
+        try:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                # dedupe_key は "種別:記事ID"。同じ記事の同じ種別の項目は1件だけ保持する
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS delivery_queue (
+                        delivery_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        dedupe_key TEXT NOT NULL UNIQUE,
+                        item_type TEXT NOT NULL,
+                        article_id TEXT,
+                        channel_id TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        enqueued_at REAL NOT NULL,
+                        visible_at REAL NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        feed_url TEXT,
+                        deferrals INTEGER NOT NULL DEFAULT 0
+                    )
+                ''')
+                # 項目を追加したフィードを記録する（手動確認で自分のフィードの項目だけを取り出すため）
+                columns = [row[1] for row in conn.execute('PRAGMA table_info(delivery_queue)')]
+                if 'feed_url' not in columns:
+                    conn.execute('ALTER TABLE delivery_queue ADD COLUMN feed_url TEXT')
+                # 送信せずに戻した回数（リースの試行回数とは別に数える）
+                if 'deferrals' not in columns:
+                    conn.execute('ALTER TABLE delivery_queue ADD COLUMN deferrals INTEGER NOT NULL DEFAULT 0')
+                # 取り出し可能な項目のあるチャンネルの列挙と、チャンネルごとの先頭をインデックスだけで引けるようにする
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_delivery_head ON delivery_queue (visible_at, delivery_id)'
+                )
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS idx_delivery_channel_head '
+                    'ON delivery_queue (channel_id, visible_at, delivery_id)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_delivery_feed ON delivery_queue (feed_url, delivery_id)')
+                conn.commit()
+            finally:
+                conn.close()
+            logger.info(f"配信キューを初期化しました: {self.db_path}")
+        except Exception as e:
+            logger.error(f"配信キューの初期化中にエラーが発生しました: {e}", exc_info=True)
+            raise
+
+    async def enqueue(
+        self,
+        item: Dict[str, Any],
+        on_insert: Optional[Callable[[sqlite3.Connection, int], None]] = None,
+    ) -> Optional[int]:
+        """
+        項目をキューに追加する
+
+        同じ記事の同じ種別の項目がすでにある場合、更新イベント（type: update）は
+        新しい配信IDの項目に置き換え、それ以外は追加しない。リース中の古い内容への
+        確認応答で新しい内容が削除されないよう、置き換え時は配信IDを変える。
+
+        Args:
+            item: {"type", "article_id", "processed_article", "channel_id", "feed_url"}
+            on_insert: 行を追加した場合に (接続, 配信ID) を受け取り、同じトランザクションで実行する処理
+                （取り出し側に通知する前に、項目に付随するデータを保存するため）
+
+        Returns:
+            配信ID、失敗した場合はNone
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                delivery_id = await loop.run_in_executor(None, lambda: self._enqueue(item, time.time(), on_insert))
+                self._added.set()
+                return delivery_id
+            except Exception as e:
+                logger.error(f"配信キューへの追加中にエラーが発生しました: {item.get('article_id')}: {e}", exc_info=True)
+                return None
+
+    def _enqueue(
+        self,
+        item: Dict[str, Any],
+        now: float,
+        on_insert: Optional[Callable[[sqlite3.Connection, int], None]] = None,
+    ) -> Optional[int]:
+        item_type = item.get("type", "post")
+        article_id = item.get("article_id")
+        dedupe_key = f"{item_type}:{article_id}"
+        payload = json.dumps(item, ensure_ascii=False)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            enqueued_at, deferrals = now, 0
+            if item_type == "update":
+                # 同じ記事の更新イベントは古い行を削除し、新しい配信IDで追加し直す（滞留時間と戻した回数は引き継ぐ）
+                existing = conn.execute(
+                    'SELECT enqueued_at, deferrals FROM delivery_queue WHERE dedupe_key = ?', (dedupe_key,)
+                ).fetchone()
+                if existing:
+                    enqueued_at, deferrals = existing
+                    conn.execute('DELETE FROM delivery_queue WHERE dedupe_key = ?', (dedupe_key,))
+            cursor = conn.execute(
+                'INSERT INTO delivery_queue '
+                '(dedupe_key, item_type, article_id, channel_id, feed_url, payload, enqueued_at, visible_at, deferrals) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(dedupe_key) DO NOTHING',
+                (dedupe_key, item_type, article_id, item["channel_id"], item.get("feed_url"), payload,
+                 enqueued_at, now, deferrals),
+            )
+            if cursor.rowcount and on_insert is not None:
+                on_insert(conn, cursor.lastrowid)
+            conn.commit()
+            row = conn.execute(
+                'SELECT delivery_id FROM delivery_queue WHERE dedupe_key = ?', (dedupe_key,)
+            ).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    async def lease(self) -> Optional[Dict[str, Any]]:
+        """
+        取り出し可能な項目を1件リースする（前回取り出したチャンネルの次のチャンネルから）
+
+        リースした項目は可視性タイムアウトの間ほかの取り出しから見えなくなる。
+        max_attempts回リースしても確認応答がなかった項目はキューから外す。
+
+        Returns:
+            "delivery_id", "attempts", "deferrals" を付けた項目、キューが空の場合はNone
+        """
+        items = await self.lease_many(1)
+        return items[0] if items else None
+
+    async def lease_many(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        取り出し可能な項目を最大limit件リースする
+
+        チャンネルを順番に巡回し、各チャンネルの最も古い項目を1件ずつ取り出す。
+
+        Args:
+            limit: リースする最大件数
+
+        Returns:
+            "delivery_id", "attempts", "deferrals" を付けた項目のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                items = await loop.run_in_executor(None, lambda: self._lease(time.time(), limit))
+                if not items:
+                    # ロック内で空だと確認してから通知を待つので、この後の追加を取りこぼさない
+                    self._added.clear()
+                return items
+            except Exception as e:
+                logger.error(f"配信キューからの取り出し中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    async def wait_for_items(self, timeout: float, poll_interval: float = 1.0) -> None:
+        """
+        項目が追加されるか、タイムアウトするまで待つ
+
+        取り出しが空だった後に呼び出す。可視性タイムアウトや再配信の遅延が切れて
+        取り出せるようになった項目は通知されないため、poll_interval秒ごとに待機を打ち切って
+        呼び出し側に再確認させる。
+
+        Args:
+            timeout: 最大待機秒数
+            poll_interval: 待機を打ち切る間隔（秒）
+        """
+        try:
+            await asyncio.wait_for(self._added.wait(), timeout=max(0.0, min(timeout, poll_interval)))
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    def _channels(conn: sqlite3.Connection) -> List[str]:
+        """
+        項目のあるチャンネルを列挙する
+
+        チャンネルごとの先頭インデックスを次のチャンネルへ飛びながら引くため、
+        項目数ではなくチャンネル数に比例した回数のインデックス検索で済む。
+        """
+        channels: List[str] = []
+        row = conn.execute('SELECT channel_id FROM delivery_queue ORDER BY channel_id LIMIT 1').fetchone()
+        while row is not None:
+            channels.append(row[0])
+            row = conn.execute(
+                'SELECT channel_id FROM delivery_queue WHERE channel_id > ? ORDER BY channel_id LIMIT 1', (row[0],)
+            ).fetchone()
+        return channels
+
+    def _lease(self, now: float, limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # 取り出せる項目のないチャンネルは先頭の検索で外れる
+            channels = self._channels(conn)
+            # 前回最後に取り出したチャンネルの次から巡回する
+            if self._last_channel is not None:
+                start = next((i for i, c in enumerate(channels) if c > self._last_channel), 0)
+                channels = channels[start:] + channels[:start]
+
+            items: List[Dict[str, Any]] = []
+            while channels and len(items) < limit:
+                for channel_id in list(channels):
+                    if len(items) >= limit:
+                        break
+                    row = conn.execute(
+                        'SELECT delivery_id, payload, attempts, deferrals FROM delivery_queue '
+                        'WHERE channel_id = ? AND visible_at <= ? ORDER BY visible_at, delivery_id LIMIT 1',
+                        (channel_id, now),
+                    ).fetchone()
+                    # 送信枠のないチャンネルは今回の取り出しから外す
+                    if row is None or not self._admit(channel_id):
+                        channels.remove(channel_id)
+                        continue
+                    item = self._take(conn, row, now)
+                    if item is None:
+                        self._refund(channel_id)
+                        continue
+                    items.append(item)
+                    self._last_channel = channel_id
+            conn.commit()
+            return items
+        finally:
+            conn.close()
+
+    def _take(self, conn: sqlite3.Connection, row: tuple, now: float) -> Optional[Dict[str, Any]]:
+        """選んだ行をリースする（再配信の上限を超えた行はキューから外してNoneを返す）"""
+        delivery_id, payload, attempts, deferrals = row
+        if self.max_attempts > 0 and attempts >= self.max_attempts:
+            logger.warning(f"確認応答がないまま再配信の上限に達したためキューから外します: delivery_id={delivery_id}")
+            if self.on_dead_letter is not None:
+                item = json.loads(payload)
+                item["delivery_id"] = delivery_id
+                item["attempts"] = attempts
+                try:
+                    self.on_dead_letter(conn, delivery_id, item)
+                except Exception as e:
+                    logger.error(f"配信できなかった項目の記録中にエラーが発生しました: delivery_id={delivery_id}: {e}", exc_info=True)
+            conn.execute('DELETE FROM delivery_queue WHERE delivery_id = ?', (delivery_id,))
+            return None
+
+        conn.execute(
+            'UPDATE delivery_queue SET visible_at = ?, attempts = attempts + 1 WHERE delivery_id = ?',
+            (now + self.visibility_timeout, delivery_id),
+        )
+        item = json.loads(payload)
+        item["delivery_id"] = delivery_id
+        item["attempts"] = attempts + 1
+        item["deferrals"] = deferrals
+        return item
+
+    async def lease_for_feed(
+        self, feed_url: str, after_id: int = 0, item_types: Tuple[str, ...] = ("post", "digest")
+    ) -> List[Dict[str, Any]]:
+        """
+        指定したフィードが追加した項目のうち、配信IDがafter_idより大きいものをすべてリースする
+
+        手動でのフィード確認で、その確認で追加された項目だけを取り出すために使う。
+        ほかの取り出しがすでにリースしている項目は含まない。更新イベントは元の投稿の
+        メッセージIDを解決する必要があるため、既定では含めず通常の配信に任せる。
+
+        Args:
+            feed_url: フィードURL
+            after_id: この配信IDより後に追加された項目だけを対象にする
+            item_types: 対象にする項目の種別
+
+        Returns:
+            "delivery_id", "attempts", "deferrals" を付けた項目のリスト（追加順）
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(
+                    None, lambda: self._lease_for_feed(feed_url, after_id, item_types, time.time())
+                )
+            except Exception as e:
+                logger.error(f"フィードの項目の取り出し中にエラーが発生しました: {feed_url}: {e}", exc_info=True)
+                return []
+
+    def _lease_for_feed(
+        self, feed_url: str, after_id: int, item_types: Tuple[str, ...], now: float
+    ) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            placeholders = ",".join("?" for _ in item_types)
+            rows = conn.execute(
+                'SELECT delivery_id, payload, attempts, deferrals, channel_id FROM delivery_queue '
+                f'WHERE feed_url = ? AND delivery_id > ? AND visible_at <= ? AND item_type IN ({placeholders}) '
+                'ORDER BY delivery_id',
+                (feed_url, after_id, now, *item_types),
+            ).fetchall()
+            items = []
+            for *row, channel_id in rows:
+                # 送信枠を超える分は通常の配信に任せる
+                if not self._admit(channel_id):
+                    break
+                item = self._take(conn, tuple(row), now)
+                if item is None:
+                    self._refund(channel_id)
+                    continue
+                items.append(item)
+            conn.commit()
+            return items
+        finally:
+            conn.close()
+
+    def _admit(self, channel_id: str) -> bool:
+        """ペース制御があればチャンネルの送信枠を1つ消費する"""
+        return self.pacer is None or self.pacer.try_acquire(channel_id)
+
+    def _refund(self, channel_id: str) -> None:
+        """送信しなかった項目の送信枠を戻す"""
+        if self.pacer is not None:
+            self.pacer.release(channel_id)
+
+    async def last_id(self) -> int:
+        """これまでに追加された項目の最大の配信IDを取得する（項目がない場合は0）"""
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, self._last_id)
+            except Exception as e:
+                logger.error(f"配信IDの取得中にエラーが発生しました: {e}", exc_info=True)
+                return 0
+
+    def _last_id(self) -> int:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'delivery_queue'").fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+    async def ack(self, delivery_id: int) -> bool:
+        """
+        投稿が完了した項目をキューから削除する
+
+        Args:
+            delivery_id: 配信ID
+
+        Returns:
+            削除した場合はTrue（すでに削除済みの場合はFalse）
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(
+                    None, lambda: self._execute('DELETE FROM delivery_queue WHERE delivery_id = ?', (delivery_id,))
+                ) > 0
+            except Exception as e:
+                logger.error(f"配信キューの確認応答中にエラーが発生しました: {delivery_id}: {e}", exc_info=True)
+                return False
+
+    async def renew(self, delivery_id: int, attempts: int) -> bool:
+        """
+        リース中の項目の可視性タイムアウトを延長する
+
+        リースが切れて再び取り出せるようになった項目や、別の取り出しでリースし直された項目は延長しない。
+
+        Args:
+            delivery_id: 配信ID
+            attempts: リースした時の試行回数（リース時に項目に付けた "attempts"）
+
+        Returns:
+            延長した場合はTrue
+        """
+        async with self.lock:
+            try:
+                now = time.time()
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(
+                    None,
+                    lambda: self._execute(
+                        'UPDATE delivery_queue SET visible_at = ? WHERE delivery_id = ? AND attempts = ? AND visible_at > ?',
+                        (now + self.visibility_timeout, delivery_id, attempts, now),
+                    ),
+                ) > 0
+            except Exception as e:
+                logger.error(f"配信キューのリース延長中にエラーが発生しました: {delivery_id}: {e}", exc_info=True)
+                return False
+
+    async def release(self, delivery_id: int, delay: float = 0) -> bool:
+        """
+        リースした項目を送信せずに戻し、指定秒数後に再び取り出せるようにする
+
+        戻したリースは再配信の試行回数に数えず、戻した回数（"deferrals"）として数える。
+
+        Args:
+            delivery_id: 配信ID
+            delay: 再び取り出せるようになるまでの秒数
+
+        Returns:
+            更新した場合はTrue
+        """
+        async with self.lock:
+            try:
+                visible_at = time.time() + delay
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._release(delivery_id, visible_at))
+            except Exception as e:
+                logger.error(f"配信キューの再配信設定中にエラーが発生しました: {delivery_id}: {e}", exc_info=True)
+                return False
+
+    def _release(self, delivery_id: int, visible_at: float) -> bool:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute('SELECT channel_id FROM delivery_queue WHERE delivery_id = ?', (delivery_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute(
+                'UPDATE delivery_queue SET visible_at = ?, attempts = MAX(attempts - 1, 0), deferrals = deferrals + 1 '
+                'WHERE delivery_id = ?',
+                (visible_at, delivery_id),
+            )
+            conn.commit()
+            self._refund(row[0])
+            return True
+        finally:
+            conn.close()
+
+    async def pending(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        キューにある項目を追加順に取得する（リースしない）
+
+        Args:
+            limit: 取得する最大件数
+
+        Returns:
+            "delivery_id" と "attempts" を付けた項目のリスト
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._pending(limit))
+            except Exception as e:
+                logger.error(f"配信キューの取得中にエラーが発生しました: {e}", exc_info=True)
+                return []
+
+    def _pending(self, limit: int) -> List[Dict[str, Any]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                'SELECT delivery_id, payload, attempts FROM delivery_queue ORDER BY delivery_id LIMIT ?', (limit,)
+            ).fetchall()
+            items = []
+            for delivery_id, payload, attempts in rows:
+                item = json.loads(payload)
+                item["delivery_id"] = delivery_id
+                item["attempts"] = attempts
+                items.append(item)
+            return items
+        finally:
+            conn.close()
+
+    async def depth(self) -> int:
+        """キューにある項目数（リース中を含む）を取得する"""
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, self._depth)
+            except Exception as e:
+                logger.error(f"配信キューの件数取得中にエラーが発生しました: {e}", exc_info=True)
+                return 0
+
+    def _depth(self) -> int:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM delivery_queue').fetchone()[0]
+        finally:
+            conn.close()
+
+    async def channel_backlog(self) -> Dict[str, Dict[str, float]]:
+        """
+        チャンネルごとの滞留状況を取得する
+
+        Returns:
+            チャンネルID -> {"depth": 項目数（リース中を含む）, "age": 最も古い項目の滞留秒数}
+        """
+        async with self.lock:
+            try:
+                loop = asyncio.get_event_loop()
+                return await loop.run_in_executor(None, lambda: self._channel_backlog(time.time()))
+            except Exception as e:
+                logger.error(f"配信キューの滞留状況の取得中にエラーが発生しました: {e}", exc_info=True)
+                return {}
+
+    def _channel_backlog(self, now: float) -> Dict[str, Dict[str, float]]:
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                'SELECT channel_id, COUNT(*), MIN(enqueued_at) FROM delivery_queue GROUP BY channel_id'
+            ).fetchall()
+            return {
+                channel_id: {"depth": count, "age": max(0.0, now - oldest)}
+                for channel_id, count, oldest in rows
+            }
+        finally:
+            conn.close()
+
+    def _execute(self, query: str, params: tuple) -> int:
+        """更新クエリを1件実行し、変更された行数を返す（同期処理）"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(query, params)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+配信ストリーム
+
+配信キューの項目を購読者（投稿ボット）へ逐次プッシュする。購読者ごとに確認応答待ちの
+項目数を制限し（バックプレッシャー）、送信した項目に連番を振って、再接続時には
+最後に受け取った番号より後の項目を再送する。
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 購読者へ送る1件（連番, 項目）。Noneは送信がないまま待機が続いたことを表す（キープアライブ用）
+StreamEvent = Optional[Tuple[int, Dict[str, Any]]]
+
+
+class _Subscriber:
+    """1つの購読者の送信状態"""
+
+    def __init__(self, name: str, sequence: int = 0) -> None:
+        self.name = name
+        self.sequence = sequence
+        # 連番 -> (送信時刻, 項目)。確認応答で取り除く
+        self.inflight: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.acked = asyncio.Event()
+        self.connection = 0
+        self.connected = False
+
+
+class DeliveryStreamHub:
+    """配信キューの項目を購読者へプッシュするクラス"""
+
+    def __init__(self, max_inflight: int = 5, inflight_timeout: float = 120.0, heartbeat: float = 15.0):
+        """
+        初期化
+
+        Args:
+            max_inflight: 購読者ごとの確認応答待ちの最大件数
+            inflight_timeout: 確認応答待ちとして保持する秒数（配信キューの可視性タイムアウトに合わせる）
+            heartbeat: 送信がない場合にキープアライブを送る間隔（秒）
+        """
+        self.max_inflight = max(1, max_inflight)
+        self.inflight_timeout = inflight_timeout
+        self.heartbeat = heartbeat
+        self._subscribers: Dict[str, _Subscriber] = {}
+
+    async def events(
+        self,
+        name: str,
+        last_event_id: Optional[int],
+        lease: Callable[[int], Awaitable[List[Dict[str, Any]]]],
+        wait_for_items: Callable[[float], Awaitable[None]],
+        renew: Optional[Callable[[Dict[str, Any]], Awaitable[bool]]] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        購読者へ送る項目を順に返す
+
+        同じ購読者名で新しく接続すると、それまでの接続の送信は止まる。
+
+        Args:
+            name: 購読者名
+            last_event_id: 購読者が最後に受け取った連番（初回接続や不明な場合はNone）
+            lease: 最大件数を受け取り、配信キューから項目をリースする関数
+            wait_for_items: 最大待機秒数を受け取り、項目が追加されるまで待つ関数
+            renew: 再送する項目を受け取り、配信キューのリースを延長する関数（リースが切れていればFalse）
+
+        Yields:
+            (連番, 項目)、またはキープアライブを送るべき時はNone
+        """
+        subscriber = self._subscribers.get(name)
+        if subscriber is None:
+            # サーバー再起動後の再接続でも連番が戻らないよう、購読者の最後の番号から続ける
+            subscriber = _Subscriber(name, last_event_id or 0)
+            self._subscribers[name] = subscriber
+        subscriber.connection += 1
+        subscriber.connected = True
+        connection = subscriber.connection
+        logger.info(f"配信ストリームに接続しました: {name} (last_event_id={last_event_id})")
+
+        try:
+            # 前回の接続で送信したが受け取られていない項目を再送する。保持期間を過ぎた項目や
+            # リースを延長できなかった項目は配信キューから再配信されるため、二重に送らないよう再送しない
+            self._expire(subscriber)
+            resume_after = last_event_id or 0
+            for sequence, (_, item) in list(subscriber.inflight.items()):
+                if sequence <= resume_after or sequence not in subscriber.inflight:
+                    continue
+                if renew is not None and not await renew(item):
+                    subscriber.inflight.pop(sequence, None)
+                    continue
+                subscriber.inflight[sequence] = (time.monotonic(), item)
+                yield sequence, item
+
+            last_sent = time.monotonic()
+            while subscriber.connection == connection:
+                self._expire(subscriber)
+                room = self.max_inflight - len(subscriber.inflight)
+                if room > 0:
+                    items = await lease(room)
+                    if items:
+                        now = time.monotonic()
+                        for item in items:
+                            subscriber.sequence += 1
+                            subscriber.inflight[subscriber.sequence] = (now, item)
+                            yield subscriber.sequence, item
+                        last_sent = time.monotonic()
+                        continue
+                    await wait_for_items(self.heartbeat)
+                else:
+                    # 購読者の処理が追いつくまで新しい項目をリースしない
+                    subscriber.acked.clear()
+                    try:
+                        await asyncio.wait_for(subscriber.acked.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+
+                if time.monotonic() - last_sent >= self.heartbeat:
+                    last_sent = time.monotonic()
+                    yield None
+        finally:
+            if subscriber.connection == connection:
+                subscriber.connected = False
+                logger.info(f"配信ストリームから切断しました: {name}")
+
+    def ack(self, delivery_id: int) -> None:
+        """
+        確認応答された項目を購読者の確認応答待ちから取り除く
+
+        Args:
+            delivery_id: 配信ID
+        """
+        for subscriber in self._subscribers.values():
+            for sequence, (_, item) in list(subscriber.inflight.items()):
+                if item.get("delivery_id") == delivery_id:
+                    del subscriber.inflight[sequence]
+                    subscriber.acked.set()
+
+    def _expire(self, subscriber: _Subscriber) -> None:
+        """確認応答がないまま保持期間を過ぎた項目を取り除く（配信キューから再配信される）"""
+        cutoff = time.monotonic() - self.inflight_timeout
+        for sequence, (sent_at, _) in list(subscriber.inflight.items()):
+            if sent_at < cutoff:
+                del subscriber.inflight[sequence]
+
+    def status(self) -> Dict[str, Any]:
+        """購読者ごとの接続状態と確認応答待ちの件数を取得する"""
+        return {
+            name: {
+                "connected": subscriber.connected,
+                "sequence": subscriber.sequence,
+                "inflight": len(subscriber.inflight),
+            }
+            for name, subscriber in self._subscribers.items()
+        }
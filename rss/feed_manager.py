@@ -7,18 +7,25 @@
 RSSフィードの管理と監視を行う
 """
 
+import hashlib
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Set, Tuple
 from datetime import datetime, timezone
-from collections import deque
 
 from .feed_parser import FeedParser
 from .article_store import ArticleStore
+from .article_filter import FilterCache
+from .delivery_queue import DeliveryQueue
+from .delivery_pacer import DeliveryPacer
+from .backpressure import BackpressureController
 from utils.helpers import generate_article_id, parse_datetime
 
 logger = logging.getLogger(__name__)
 
+# 即時投稿モードで、バックグラウンドのAI処理が終わらないまま停止した記事を再処理するまでの秒数
+ENRICHMENT_RECOVERY_DELAY = 600
+
 class FeedManager:
     """フィード管理クラス"""
 
@@ -34,8 +41,41 @@ class FeedManager:
         self.ai_processor = ai_processor
         self.feed_parser = FeedParser()
         self.article_store = ArticleStore()
+        # キーワード抽出の文書頻度を記事ストアで管理する
+        if hasattr(ai_processor, "attach_article_store"):
+            ai_processor.attach_article_store(self.article_store)
         self.checking = False  # フィード確認中フラグ
-        self.articles_to_post: deque = deque()
+        # フィードごとのコンパイル済みフィルター（設定が変わるまで再利用する）
+        self.filters = FilterCache()
+        # 投稿待ちの項目（再起動しても失われないよう記事ストアと同じDBに永続化する）
+        self.delivery_queue = DeliveryQueue(
+            self.article_store.db_path,
+            visibility_timeout=config.get("delivery_visibility_timeout", 120),
+            max_attempts=config.get("delivery_max_attempts", 10),
+            # Discordのレート制限の範囲で送信できる項目だけを取り出す
+            pacer=DeliveryPacer(
+                channel_burst=config.get("discord_channel_burst", 1),
+                channel_rate=config.get("discord_channel_rate", 0.8),
+                global_burst=config.get("discord_global_burst", 10),
+                global_rate=config.get("discord_global_rate", 40.0),
+            ),
+            # 再配信の上限に達した項目を記録し、記事の処理状態を failed にする
+            on_dead_letter=self.article_store.save_dead_letter,
+        )
+        # 配信待ちが滞留したチャンネルの記事の取得とAI処理を止める
+        self.backpressure = BackpressureController(
+            high_depth=config.get("backlog_high_depth", 50),
+            low_depth=config.get("backlog_low_depth", 20),
+            high_age=config.get("backlog_high_age_minutes", 60) * 60,
+            low_age=config.get("backlog_low_age_minutes", 20) * 60,
+        )
+        # フィードごとのダイジェスト作成の排他（同じ記事を二重にまとめない）
+        self._digest_locks: Dict[str, asyncio.Lock] = {}
+        # 即時投稿モードでバックグラウンド実行中のAI処理（同時実行数を制限する）
+        self._enrichment_tasks: Set[asyncio.Task] = set()
+        # バックグラウンドのAI処理が終わっていない記事ID（再処理キューから二重に処理しない）
+        self._enriching: Set[str] = set()
+        self._enrichment_semaphore = asyncio.Semaphore(config.get("immediate_enrichment_concurrency", 2))
 
         logger.info("フィードマネージャーを初期化しました")
     
@@ -56,6 +96,11 @@ class FeedManager:
             
             for feed in feeds:
                 try:
+                    # 配信待ちが滞留しているチャンネルのフィードは取得しない（記事は次回以降に処理される）
+                    await self.refresh_backpressure()
+                    if self.backpressure.is_paused(feed.get("channel_id")):
+                        logger.info(f"配信待ちが滞留しているためフィードの確認を見送ります: {feed.get('url')}")
+                        continue
                     await self.check_feed(feed)
                     # フィード間の処理に少し間隔を空ける
                     await asyncio.sleep(1)
@@ -70,19 +115,26 @@ class FeedManager:
         finally:
             self.checking = False
     
-    async def check_feed(self, feed: Dict[str, Any]) -> None:
+    async def refresh_backpressure(self) -> None:
+        """配信キューの滞留状況からバックプレッシャーの状態を更新する"""
+        self.backpressure.update(await self.delivery_queue.channel_backlog())
+
+    async def check_feed(self, feed: Dict[str, Any]) -> int:
         """
         単一のフィードを確認する
         
         Args:
             feed: フィード情報辞書
+
+        Returns:
+            投稿キュー（ダイジェスト配信の場合はバッファ）に追加した記事数
         """
         url = feed.get("url")
         channel_id = feed.get("channel_id")
         
         if not url or not channel_id:
             logger.warning(f"フィード情報が不完全です: {feed}")
-            return
+            return 0
         
         logger.info(f"フィードを確認しています: {url}")
         
@@ -90,15 +142,40 @@ class FeedManager:
         feed_data = await self.feed_parser.parse_feed(url)
         if not feed_data:
             logger.warning(f"フィードの解析に失敗しました: {url}")
-            return
+            return 0
         
         # 新しい記事を取得
         new_articles = await self._get_new_articles(feed_data, feed)
         if not new_articles:
             logger.info(f"新しい記事はありません: {url}")
-            return
+            return 0
         
         logger.info(f"{len(new_articles)}件の新しい記事を見つけました: {url}")
+
+        # AI処理の前にフィルターで不要な記事を取り除く（再判定しないよう処理済みとして記録する）
+        try:
+            article_filter = self.filters.get(feed)
+        except Exception as e:
+            # フィルターの設定に誤りがあってもフィードの確認は止めない
+            logger.error(f"フィードのフィルターをコンパイルできないため適用しません: {url}: {e}", exc_info=True)
+            article_filter = None
+        if article_filter:
+            accepted = []
+            for article in new_articles:
+                if article_filter.accepts(article):
+                    accepted.append(article)
+                else:
+                    await self.article_store.add_processed_article(generate_article_id(article), url, channel_id)
+            if len(accepted) < len(new_articles):
+                logger.info(f"フィルターにより{len(new_articles) - len(accepted)}件の記事を除外しました: {url}")
+            new_articles = accepted
+            if not new_articles:
+                return 0
+
+        # ダイジェスト配信のフィードは記事を溜めておき、まとめて1件の投稿にする
+        if feed.get("delivery_mode") == "digest":
+            await self._buffer_digest(feed, new_articles)
+            return len(new_articles)
         
         # 最大処理数を制限
         max_articles = self.config.get("max_articles", 5)
@@ -107,26 +184,362 @@ class FeedManager:
             new_articles = new_articles[:max_articles]
         
         # 記事を処理して投稿キューに追加
+        immediate = self.config.get("publish_mode", "enriched") == "immediate"
+        queued = 0
         for article in new_articles:
+            article_id = generate_article_id(article)
             try:
-                processed = await self.ai_processor.process_article(article, feed)
+                # 処理済みの記録と処理状態を先に書き込み、再起動後は処理状態から続きを再開する
+                if not await self.article_store.discover_article(article_id, url, channel_id, article):
+                    continue
+
+                if immediate:
+                    # 元の記事をすぐに投稿し、AI処理は後から更新イベントとして反映する
+                    delivery_id = await self._enqueue({
+                        "type": "post",
+                        "article_id": article_id,
+                        "processed_article": self._build_preview(article),
+                        "channel_id": channel_id,
+                        "feed_url": url
+                    })
+                    if delivery_id is not None:
+                        await self.article_store.advance_article_state(article_id, "queued", delivery_id=delivery_id)
+                    # 更新イベントを出す前に停止した場合に備え、再処理キューにも入れておく
+                    await self.article_store.enqueue_reenrich(
+                        article_id, channel_id, url, article, delay=ENRICHMENT_RECOVERY_DELAY,
+                    )
+                    task = asyncio.create_task(self._enrich_and_update(article, feed, article_id, channel_id))
+                    self._enrichment_tasks.add(task)
+                    self._enriching.add(article_id)
+                    task.add_done_callback(self._enrichment_tasks.discard)
+                    task.add_done_callback(lambda _, article_id=article_id: self._enriching.discard(article_id))
+                else:
+                    await self._process_and_enqueue(article_id, article, feed)
+                queued += 1
+
+            except Exception as e:
+                logger.error(f"記事処理中にエラーが発生しました: {article.get('title')}: {e}", exc_info=True)
+                # 次回のフィード確認で再び処理する
+                await self.article_store.forget_article(article_id)
+
+        return queued
+
+    async def _buffer_digest(self, feed: Dict[str, Any], articles: List[Dict[str, Any]]) -> None:
+        """
+        ダイジェスト配信のフィードの新しい記事をバッファに追加し、条件を満たせば投稿する
+
+        Args:
+            feed: フィード情報辞書
+            articles: 新しい記事のリスト
+        """
+        url = feed.get("url")
+        # 古い記事から順にまとめる
+        for article in reversed(articles):
+            article_id = generate_article_id(article)
+            if await self.article_store.add_digest_item(url, article_id, article):
+                await self.article_store.add_processed_article(article_id, url, feed.get("channel_id"))
+        logger.info(f"{len(articles)}件の記事をダイジェストのバッファに追加しました: {url}")
+        await self.flush_digest(feed)
+
+    async def flush_digest(self, feed: Dict[str, Any], force: bool = False) -> int:
+        """
+        溜まった記事が件数か待ち時間の条件を満たしていれば、ダイジェストを作成して投稿キューに追加する
+
+        フィード確認、定期実行、手動確認から同時に呼ばれても同じ記事を二重にまとめないよう、
+        フィードごとに直列に実行する。投稿キューに追加できなかった記事はバッファに残す。
+
+        Args:
+            feed: フィード情報辞書
+            force: 条件に関わらず投稿する場合はTrue
+
+        Returns:
+            ダイジェストにまとめた記事数
+        """
+        lock = self._digest_locks.setdefault(feed.get("url"), asyncio.Lock())
+        async with lock:
+            return await self._flush_digest(feed, force)
+
+    async def _flush_digest(self, feed: Dict[str, Any], force: bool) -> int:
+        max_items = feed.get("digest_max_items", self.config.get("digest_max_items", 10))
+        window = feed.get("digest_window_minutes", self.config.get("digest_window_minutes", 60))
+        flushed = 0
+
+        while True:
+            items = await self.article_store.get_digest_items(feed.get("url"), max_items)
+            if not items:
+                break
+            oldest = datetime.fromisoformat(items[0]["added_at"])
+            waited = (datetime.now(timezone.utc) - oldest).total_seconds() / 60
+            if not force and len(items) < max_items and waited < window:
+                break
+
+            articles = [item["article"] for item in items]
+            ids = [item["article_id"] for item in items]
+            digest_id = "digest-" + hashlib.sha256(",".join(ids).encode("utf-8")).hexdigest()
+            digest = await self.ai_processor.create_digest(articles, feed, digest_id=digest_id)
+            delivery_id = await self._enqueue({
+                "type": "digest",
+                "article_id": digest_id,
+                "processed_article": digest,
+                "channel_id": feed.get("channel_id"),
+                "feed_url": feed.get("url"),
+            })
+            if delivery_id is None:
+                logger.warning(f"ダイジェストを投稿キューに追加できなかったため、記事をバッファに残します: {feed.get('url')}")
+                break
+            await self.article_store.remove_digest_items(ids)
+            flushed += len(items)
+            logger.info(f"{len(items)}件の記事をダイジェストにまとめました: {feed.get('url')}")
+            # 件数の条件を満たさない残りは次回に回す
+            force = False
+
+        return flushed
+
+    async def flush_digests(self) -> None:
+        """ダイジェスト配信のすべてのフィードについて、待ち時間を過ぎたダイジェストを投稿する"""
+        await self.refresh_backpressure()
+        for feed in self.get_feeds():
+            if feed.get("delivery_mode") == "digest" and feed.get("channel_id"):
+                if self.backpressure.is_paused(feed["channel_id"]):
+                    continue
+                try:
+                    await self.flush_digest(feed)
+                except Exception as e:
+                    logger.error(f"ダイジェストの投稿中にエラーが発生しました: {feed.get('url')}: {e}", exc_info=True)
+
+    def _build_preview(self, article: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        AI処理前にすぐ投稿するための記事データを作成する
+
+        Args:
+            article: 元の記事データ
+
+        Returns:
+            元のタイトルと本文の先頭部分のみを含む記事データ
+        """
+        preview_length = self.config.get("publish_preview_length", 300)
+        preview = article.copy()
+        content = article.get("content") or ""
+        if len(content) > preview_length:
+            content = content[:preview_length - 3] + "..."
+        preview["content"] = content
+        preview["summary"] = content
+        preview["pending_enrichment"] = True
+        preview["_original_article"] = article
+        return preview
+
+    async def _process_and_enqueue(
+        self,
+        article_id: str,
+        article: Dict[str, Any],
+        feed: Dict[str, Any],
+        processed: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        記事をAI処理して投稿キューに追加し、処理状態を進める
 
-                # discord.js側で元の記事情報が必要になるため、ここで含める
-                processed['_original_article'] = article
+        Args:
+            article_id: 記事ID
+            article: AI処理前の記事データ
+            feed: フィード情報辞書
+            processed: 保存済みのAI処理結果（ある場合はAI処理を行わない）
+        """
+        url = feed.get("url")
+        channel_id = feed.get("channel_id")
+        store = self.article_store
+
+        if processed is None:
+            await store.advance_article_state(article_id, "enriching")
+            processed = await self.ai_processor.process_article(article, feed)
 
-                # 処理済み記事をキューに追加
-                self.articles_to_post.append({
-                    "processed_article": processed,
-                    "channel_id": channel_id
-                })
+            # discord.js側で元の記事情報が必要になるため、ここで含める
+            processed['_original_article'] = article
+            # 投稿前に停止してもAI処理をやり直さないよう結果を保存する
+            await store.advance_article_state(article_id, "enriched", processed=processed)
 
-                # 重複投稿を防ぐために、処理済み記事IDを保存
-                article_id = generate_article_id(article)
-                await self.article_store.add_processed_article(article_id, url, channel_id)
+        # 処理済み記事をキューに追加
+        delivery_id = await self._enqueue({
+            "type": "post",
+            "article_id": article_id,
+            "processed_article": processed,
+            "channel_id": channel_id,
+            "feed_url": url
+        })
+        if delivery_id is None:
+            # enriched のまま残し、次回の再開時に投稿キューへの追加をやり直す
+            logger.warning(f"投稿キューに追加できませんでした: {processed.get('title')}")
+            return
+        await store.advance_article_state(article_id, "queued", delivery_id=delivery_id)
 
+        # Gemini APIの障害で縮退処理した記事は、復旧後に再処理して投稿を更新する
+        if processed.get("degraded"):
+            await store.enqueue_reenrich(
+                article_id, channel_id, url, article,
+                delay=self.config.get("reenrich_base_delay", 60),
+            )
+
+    async def resume_unfinished_articles(self) -> int:
+        """
+        前回の停止時に投稿キューに入る前だった記事の処理を再開する
+
+        AI処理の結果を保存済みの記事（enriched）はそのまま投稿キューに追加し、
+        それ以前の状態の記事はAI処理からやり直す。
+
+        Returns:
+            投稿キューに追加した記事数
+        """
+        unfinished = await self.article_store.get_unfinished_articles()
+        if not unfinished:
+            return 0
+
+        logger.info(f"処理途中の記事を再開します: {len(unfinished)}件")
+        feeds = {feed.get("url"): feed for feed in self.get_feeds()}
+        resumed = 0
+        for item in unfinished:
+            article_id = item["article_id"]
+            feed = feeds.get(item["feed_url"]) or {"url": item["feed_url"], "channel_id": item["channel_id"]}
+            try:
+                await self._process_and_enqueue(article_id, item["article"], feed, processed=item["processed"])
+                resumed += 1
             except Exception as e:
-                logger.error(f"記事処理中にエラーが発生しました: {article.get('title')}: {e}", exc_info=True)
-    
+                logger.error(f"記事の処理の再開中にエラーが発生しました: {article_id}: {e}", exc_info=True)
+        return resumed
+
+    async def _enrich_and_update(
+        self, article: Dict[str, Any], feed: Dict[str, Any], article_id: str, channel_id: str
+    ) -> None:
+        """
+        すでに投稿した記事をAI処理し、投稿の更新イベントをキューに追加する
+
+        同時に実行するAI処理の数は設定で制限する。配信待ちが滞留しているチャンネルの記事や
+        AI処理できなかった記事は更新イベントを出さず、再処理キューの項目から後で処理する。
+
+        Args:
+            article: 元の記事データ
+            feed: フィード情報辞書
+            article_id: 記事ID
+            channel_id: 投稿先チャンネルID
+        """
+        try:
+            async with self._enrichment_semaphore:
+                await self.refresh_backpressure()
+                if self.backpressure.is_paused(channel_id):
+                    logger.info(f"配信待ちが滞留しているため記事のAI処理を見送ります: {article.get('title')}")
+                    return
+                processed = await self.ai_processor.process_article(dict(article), feed)
+            if not processed.get("ai_processed"):
+                logger.warning(f"記事をAI処理できなかったため再処理に回します: {article.get('title')}")
+                await self.article_store.enqueue_reenrich(
+                    article_id, channel_id, feed.get("url"), article,
+                    delay=self.config.get("reenrich_base_delay", 60),
+                )
+                return
+
+            processed["_original_article"] = article
+            await self._enqueue({
+                "type": "update",
+                "article_id": article_id,
+                "processed_article": processed,
+                "channel_id": channel_id,
+                "feed_url": feed.get("url")
+            })
+
+            if processed.get("degraded"):
+                await self.article_store.enqueue_reenrich(
+                    article_id, channel_id, feed.get("url"), article,
+                    delay=self.config.get("reenrich_base_delay", 60),
+                )
+            else:
+                await self.article_store.remove_reenrich(article_id)
+        except Exception as e:
+            logger.error(f"記事のバックグラウンド処理中にエラーが発生しました: {article.get('title')}: {e}", exc_info=True)
+
+    async def _enqueue(self, item: Dict[str, Any]) -> Optional[int]:
+        """
+        投稿キューに項目を追加する
+
+        Args:
+            item: {"type": "post", "update" または "digest", "article_id", "processed_article", "channel_id"}
+
+        Returns:
+            配信ID、追加に失敗した場合はNone
+        """
+        processed = item.get("processed_article") or {}
+
+        def save_delivery_article(conn, delivery_id: int) -> None:
+            # 投稿後の紐付けは配信IDだけで行えるよう、取り出せるようになる前に紐付ける記事データを保存しておく
+            self.article_store.save_delivery_article(
+                conn,
+                delivery_id,
+                item.get("article_id"),
+                processed.get("_original_article") or processed,
+                processed.get("keywords_en") or "",
+            )
+
+        return await self.delivery_queue.enqueue(item, on_insert=save_delivery_article)
+
+    async def drain_reenrich_queue(self) -> int:
+        """
+        縮退処理した記事をGemini APIで再処理し、投稿の更新イベントをキューに追加する
+
+        Gemini APIが利用できない間は何もしない。再処理でも縮退した場合は指数バックオフで再試行する。
+
+        Returns:
+            再処理に成功した記事数
+        """
+        if not getattr(self.ai_processor, "available", True):
+            return 0
+
+        base_delay = self.config.get("reenrich_base_delay", 60)
+        max_delay = self.config.get("reenrich_max_delay", 3600)
+        max_attempts = self.config.get("reenrich_max_attempts", 8)
+        feeds = {feed.get("url"): feed for feed in self.get_feeds()}
+
+        await self.refresh_backpressure()
+        succeeded = 0
+        for item in await self.article_store.get_due_reenrich():
+            article_id = item["article_id"]
+            article = item["article"]
+            feed = feeds.get(item["feed_url"], {})
+            # バックグラウンドのAI処理がまだ終わっていない記事は、その処理に任せる
+            if article_id in self._enriching:
+                continue
+            # 配信待ちが滞留しているチャンネルの再処理は滞留が解消するまで見送る
+            if self.backpressure.is_paused(feed.get("channel_id")):
+                continue
+            try:
+                processed = await self.ai_processor.process_article(dict(article), feed)
+            except Exception as e:
+                logger.error(f"記事の再処理中にエラーが発生しました: {article.get('title')}: {e}", exc_info=True)
+                processed = {"degraded": True}
+
+            if processed.get("degraded") or not processed.get("ai_processed"):
+                attempts = item["attempts"] + 1
+                if attempts >= max_attempts:
+                    logger.warning(f"再処理の上限回数に達したため諦めます: {article.get('title')}")
+                    await self.article_store.remove_reenrich(article_id)
+                else:
+                    delay = min(base_delay * (2 ** attempts), max_delay)
+                    await self.article_store.reschedule_reenrich(article_id, attempts, delay)
+                # ブレーカーが開いた場合は残りの記事を次回に回す
+                if not getattr(self.ai_processor, "available", True):
+                    break
+                continue
+
+            processed["_original_article"] = article
+            await self._enqueue({
+                "type": "update",
+                "article_id": article_id,
+                "processed_article": processed,
+                "channel_id": item["channel_id"],
+                "feed_url": item.get("feed_url"),
+            })
+            await self.article_store.remove_reenrich(article_id)
+            succeeded += 1
+            logger.info(f"縮退処理した記事を再処理しました: {processed.get('title')}")
+
+        return succeeded
+
     async def _get_new_articles(self, feed_data: Dict[str, Any], feed_info: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         新しい記事を取得する
@@ -155,6 +568,8 @@ class FeedManager:
             # フィード情報を記事に追加
             entry["feed_title"] = feed_data.get("feed", {}).get("title", "Unknown Feed")
             entry["feed_url"] = feed_info.get("url")
+            # 翻訳の要否を判定するため、フィードが宣言する言語を記事に含める
+            entry["feed_language"] = feed_data.get("feed", {}).get("language", "")
             
             new_articles.append(entry)
         
@@ -190,6 +605,7 @@ class FeedManager:
         title: str = None,
         channel_id: str = None,
         summary_type: str = "normal",
+        delivery_mode: str = "article",
     ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
         """
         フィードを追加する
@@ -199,6 +615,7 @@ class FeedManager:
             title: フィードタイトル（オプション）
             channel_id: チャンネルID（オプション）
             summary_type: 要約タイプ（short/normal/long）
+            delivery_mode: 配信方法（article: 記事ごとに投稿 / digest: まとめて投稿）
             
         Returns:
             (成功フラグ, メッセージ, フィード情報)のタプル
@@ -225,6 +642,7 @@ class FeedManager:
                 "channel_id": channel_id,  # Noneの場合は後でチャンネル作成時に設定
                 "added_at": datetime.now(timezone.utc).isoformat(),
                 "summary_type": summary_type,
+                "delivery_mode": delivery_mode,
             }
             
             # 設定に追加
@@ -275,3 +693,14 @@ class FeedManager:
         """
         return self.config.get("feeds", [])
 
+    def get_feed_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        URLで登録されているフィードを取得する
+
+        Args:
+            url: フィードURL
+
+        Returns:
+            フィード情報辞書、見つからない場合はNone
+        """
+        return next((feed for feed in self.get_feeds() if feed.get("url") == url), None)
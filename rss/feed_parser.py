@@ -133,6 +133,10 @@ class FeedParser:
                 "published": getattr(entry, "published", getattr(entry, "updated", "")),
                 "author": getattr(entry, "author", "Unknown Author"),
                 "summary": clean_html(getattr(entry, "summary", "")),
+                # フィルターのカテゴリ照合に使用する
+                "categories": [
+                    tag.get("term", "") for tag in getattr(entry, "tags", []) or [] if tag.get("term")
+                ],
             }
             
             # コンテンツがある場合は追加
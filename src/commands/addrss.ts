@@ -25,6 +25,13 @@ export default {
                     { name: '短め', value: 'short' },
                     { name: '通常', value: 'normal' },
                     { name: '長め', value: 'long' }
+                ))
+        .addStringOption(option =>
+            option.setName('delivery_mode')
+                .setDescription('配信方法')
+                .setChoices(
+                    { name: '記事ごと', value: 'article' },
+                    { name: 'ダイジェスト（まとめて投稿）', value: 'digest' }
                 )),
 
     async execute(interaction: ChatInputCommandInteraction) {
@@ -37,6 +44,7 @@ export default {
 
         const url = interaction.options.getString('url', true);
         const summaryLength = interaction.options.getString('summary_length') || 'normal';
+        const deliveryMode = interaction.options.getString('delivery_mode') || 'article';
         const channelName = interaction.options.getString('channel_name');
         const existingChannel = interaction.options.getChannel('existing_channel');
 
@@ -45,6 +53,7 @@ export default {
             const addFeedResponse = await axios.post(`${config.apiBaseUrl}/feeds`, {
                 url: url,
                 summary_type: summaryLength,
+                delivery_mode: deliveryMode,
             });
 
             const feedInfo = addFeedResponse.data.feed_info;
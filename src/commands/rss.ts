@@ -94,10 +94,21 @@ export default {
                     channel_id: interaction.channelId,
                 });
 
-                if (data.article_data) {
-                    const { postArticle } = await import('../core/postArticle');
-                    await postArticle(interaction.client, data.article_data.processed_article, data.article_data.channel_id);
-                    await interaction.editReply('最新の記事を取得し、投稿しました。');
+                const articles: any[] = data.articles || [];
+                if (articles.length > 0) {
+                    const { postArticle, postDigest, ackDelivery } = await import('../core/postArticle');
+                    let posted = 0;
+                    for (const item of articles) {
+                        const { processed_article, channel_id, article_id, delivery_id } = item;
+                        const delivered = item.type === 'digest'
+                            ? await postDigest(interaction.client, processed_article, channel_id, article_id, delivery_id)
+                            : await postArticle(interaction.client, processed_article, channel_id, article_id, delivery_id);
+                        if (delivered) {
+                            await ackDelivery(delivery_id);
+                            posted++;
+                        }
+                    }
+                    await interaction.editReply(`最新の記事を${posted}件投稿しました。`);
                 } else {
                     await interaction.editReply(data.message || '新しい記事は見つかりませんでした。');
                 }
@@ -1,4 +1,4 @@
-import { Client, EmbedBuilder, TextChannel } from 'discord.js';
+import { Client, EmbedBuilder, Message, TextChannel } from 'discord.js';
 import axios from 'axios';
 import config from './config';
 
@@ -19,7 +19,9 @@ interface ProcessedArticle {
         emoji: string;
     };
     keywords_en?: string;
-    _original_article: any; // Keep the original article data
+    degraded?: boolean; // Summarized without Gemini; an update event may follow
+    pending_enrichment?: boolean; // Posted before AI processing; an update event follows
+    _original_article?: any; // Only present when the item has no delivery ID
 }
 
 const categoryColors: { [key: string]: number } = {
@@ -41,56 +43,156 @@ function truncate(text: string, maxLength: number): string {
     return plainText.substring(0, maxLength - 3) + '...';
 }
 
-export async function postArticle(client: Client, article: ProcessedArticle, channelId: string): Promise<void> {
-    try {
-        const channel = await client.channels.fetch(channelId);
-        if (!channel || !(channel instanceof TextChannel)) {
-            console.error(`[POST] Channel ${channelId} not found or not a text channel.`);
-            return;
-        }
+function buildEmbed(article: ProcessedArticle): EmbedBuilder {
+    const category = article.category || 'other';
+    const categoryInfo = article.category_info || { name: 'other', jp_name: 'その他', emoji: '📌' };
+    const color = categoryColors[category] || categoryColors['other'];
 
-        const category = article.category || 'other';
-        const categoryInfo = article.category_info || { name: 'other', jp_name: 'その他', emoji: '📌' };
-        const color = categoryColors[category] || categoryColors['other'];
+    const embed = new EmbedBuilder()
+        .setColor(color)
+        .setTitle(`${categoryInfo.emoji} ${article.title}`)
+        .setURL(article.link)
+        .setDescription(article.summary || truncate(article.content || '', 4000))
+        .setFooter({
+            text: (article.feed_title || 'RSS Feed') + (article.pending_enrichment ? ' ・ 要約を準備中…' : ''),
+        });
 
-        const embed = new EmbedBuilder()
-            .setColor(color)
-            .setTitle(`${categoryInfo.emoji} ${article.title}`)
-            .setURL(article.link)
-            .setDescription(article.summary || truncate(article.content || '', 4000))
-            .setFooter({ text: article.feed_title || 'RSS Feed' });
-
-        if (article.classified) {
-            embed.addFields({ name: 'カテゴリ', value: `${categoryInfo.emoji} ${categoryInfo.jp_name}`, inline: true });
-        }
+    if (article.classified) {
+        embed.addFields({ name: 'カテゴリ', value: `${categoryInfo.emoji} ${categoryInfo.jp_name}`, inline: true });
+    }
 
-        if (article.published) {
-            try {
-                const date = new Date(article.published);
-                embed.addFields({ name: '公開日時', value: date.toLocaleString('ja-JP'), inline: true });
-            } catch {
-                // If date is not valid, just show the string
-                embed.addFields({ name: '公開日時', value: article.published, inline: true });
-            }
+    if (article.published) {
+        try {
+            const date = new Date(article.published);
+            embed.addFields({ name: '公開日時', value: date.toLocaleString('ja-JP'), inline: true });
+        } catch {
+            // If date is not valid, just show the string
+            embed.addFields({ name: '公開日時', value: article.published, inline: true });
         }
+    }
 
-        if (article.image) {
-            embed.setThumbnail(article.image);
-        }
+    if (article.image) {
+        embed.setThumbnail(article.image);
+    }
 
-        const message = await channel.send({ embeds: [embed] });
-        console.log(`[POST] Successfully posted article "${article.title}" to #${channel.name}`);
+    return embed;
+}
 
-        // Associate the article with the message ID in the backend
+async function fetchTextChannel(client: Client, channelId: string): Promise<TextChannel | null> {
+    const channel = await client.channels.fetch(channelId);
+    if (!channel || !(channel instanceof TextChannel)) {
+        console.error(`[POST] Channel ${channelId} not found or not a text channel.`);
+        return null;
+    }
+    return channel;
+}
+
+// Associate the article with the message ID in the backend.
+// The backend keeps the article under its delivery ID, so only the IDs are sent back.
+// Failures are logged only: the message is already sent, so the delivery must not be retried.
+async function associate(message: Message, article: ProcessedArticle, articleId?: string, deliveryId?: number): Promise<void> {
+    try {
         await axios.post(`${config.apiBaseUrl}/articles/associate`, {
             message_id: message.id,
-            channel_id: channel.id,
-            original_article: article._original_article,
-            keywords_en: article.keywords_en || '',
+            channel_id: message.channelId,
+            delivery_id: deliveryId,
+            article_id: articleId,
+            // Items without a delivery ID carry the article themselves
+            ...(deliveryId === undefined
+                ? { original_article: article._original_article, keywords_en: article.keywords_en || '' }
+                : {}),
         });
         console.log(`[POST] Associated message ${message.id} with article.`);
+    } catch (error) {
+        console.error(`[POST] Failed to associate message ${message.id}:`, error);
+    }
+}
+
+// Acknowledge a leased queue item so the backend stops redelivering it
+export async function ackDelivery(deliveryId?: number): Promise<void> {
+    if (deliveryId === undefined) return;
+    try {
+        await axios.post(`${config.apiBaseUrl}/articles/ack`, { delivery_id: deliveryId });
+    } catch (error) {
+        console.error(`[POST] Failed to acknowledge delivery ${deliveryId}:`, error);
+    }
+}
+
+export async function postArticle(client: Client, article: ProcessedArticle, channelId: string, articleId?: string, deliveryId?: number): Promise<boolean> {
+    try {
+        const channel = await fetchTextChannel(client, channelId);
+        if (!channel) return false;
+
+        const message = await channel.send({ embeds: [buildEmbed(article)] });
+        console.log(`[POST] Successfully posted article "${article.title}" to #${channel.name}`);
+
+        await associate(message, article, articleId, deliveryId);
+        return true;
 
     } catch (error) {
         console.error(`[POST] Failed to post article "${article.title}" to channel ${channelId}:`, error);
+        return false;
+    }
+}
+
+// A digest bundling several articles of one feed into a single post
+interface DigestArticle {
+    title: string;
+    overview?: string;
+    items: { title: string; link: string; summary: string }[];
+    feed_title?: string;
+    keywords_en?: string;
+    _original_article?: any;
+}
+
+export async function postDigest(client: Client, digest: DigestArticle, channelId: string, articleId?: string, deliveryId?: number): Promise<boolean> {
+    try {
+        const channel = await fetchTextChannel(client, channelId);
+        if (!channel) return false;
+
+        const lines = digest.items.map(item => `• [${truncate(item.title, 100)}](${item.link})\n${item.summary}`);
+        const description = [digest.overview, ...lines].filter(Boolean).join('\n\n');
+
+        const embed = new EmbedBuilder()
+            .setColor(categoryColors['other'])
+            .setTitle(`🗞️ ${digest.title}`)
+            .setDescription(truncate(description, 4000))
+            .setFooter({ text: digest.feed_title || 'RSS Feed' });
+
+        const message = await channel.send({ embeds: [embed] });
+        console.log(`[POST] Posted digest "${digest.title}" to #${channel.name}`);
+
+        await associate(message, digest as unknown as ProcessedArticle, articleId, deliveryId);
+        return true;
+
+    } catch (error) {
+        console.error(`[POST] Failed to post digest "${digest.title}" to channel ${channelId}:`, error);
+        return false;
+    }
+}
+
+// Replace a previously posted (degraded) article with its re-enriched version
+export async function editArticle(
+    client: Client,
+    article: ProcessedArticle,
+    channelId: string,
+    messageId: string,
+    articleId?: string,
+    deliveryId?: number,
+): Promise<boolean> {
+    try {
+        const channel = await fetchTextChannel(client, channelId);
+        if (!channel) return false;
+
+        const message = await channel.messages.fetch(messageId);
+        await message.edit({ embeds: [buildEmbed(article)] });
+        console.log(`[POST] Updated article "${article.title}" in #${channel.name}`);
+
+        await associate(message, article, articleId, deliveryId);
+        return true;
+
+    } catch (error) {
+        console.error(`[POST] Failed to update article "${article.title}" (message ${messageId}):`, error);
+        return false;
     }
 }
@@ -2,6 +2,40 @@ import { Events, Message } from 'discord.js';
 import axios from 'axios';
 import client from '../core/client';
 import config from '../core/config';
+import { readServerSentEvents } from '../utils/helpers';
+
+// Discordのメッセージ文字数上限
+const MAX_MESSAGE_LENGTH = 2000;
+// 回答を途中経過として編集する最小間隔（Discordのレート制限対策）
+const EDIT_INTERVAL_MS = 1000;
+
+function clip(text: string): string {
+    return text.length <= MAX_MESSAGE_LENGTH ? text : text.substring(0, MAX_MESSAGE_LENGTH - 3) + '...';
+}
+
+// /qa/stream の Server-Sent Events を読み、回答の断片ごとに onToken を呼ぶ
+async function streamAnswer(
+    originalMessageId: string,
+    question: string,
+    onToken: (answerSoFar: string) => Promise<void>,
+): Promise<string> {
+    const response = await axios.post(`${config.apiBaseUrl}/qa/stream`, {
+        original_message_id: originalMessageId,
+        question,
+    }, { responseType: 'stream' });
+
+    let answer = '';
+    await readServerSentEvents(response.data, async ({ event, data }) => {
+        const payload = JSON.parse(data);
+        if (event === 'token') {
+            answer += payload.text;
+            await onToken(answer);
+        } else if (event === 'done') {
+            answer = payload.answer ?? answer;
+        }
+    });
+    return answer;
+}
 
 async function handleMessageCreate(message: Message) {
     // Ignore bots
@@ -16,16 +50,25 @@ async function handleMessageCreate(message: Message) {
                 // It's a reply to our bot, process as a Q&A
                 await message.channel.sendTyping();
 
-                const response = await axios.post(`${config.apiBaseUrl}/qa`, {
-                    original_message_id: repliedTo.id,
-                    question: message.content,
+                // 回答をストリーミングで受け取り、返信を逐次編集する
+                let reply: Message | null = null;
+                let lastEdit = 0;
+                const answer = await streamAnswer(repliedTo.id, message.content, async (answerSoFar) => {
+                    const now = Date.now();
+                    if (!reply) {
+                        reply = await message.reply(clip(answerSoFar));
+                        lastEdit = now;
+                    } else if (now - lastEdit >= EDIT_INTERVAL_MS) {
+                        await reply.edit(clip(answerSoFar));
+                        lastEdit = now;
+                    }
                 });
 
-                const answer = response.data.answer;
-                if (answer) {
-                    await message.reply(answer);
+                const finalText = answer ? clip(answer) : "申し訳ありませんが、回答を生成できませんでした。";
+                if (reply) {
+                    await (reply as Message).edit(finalText);
                 } else {
-                    await message.reply("申し訳ありませんが、回答を生成できませんでした。");
+                    await message.reply(finalText);
                 }
             }
         } catch (error) {
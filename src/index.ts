@@ -5,26 +5,110 @@ import axios from 'axios';
 import client from './core/client';
 import config from './core/config';
 import handleInteraction from './events/interactionCreate';
-import { postArticle } from './core/postArticle'; // We will create this file
+import { postArticle, editArticle, postDigest, ackDelivery } from './core/postArticle';
+import { readServerSentEvents } from './utils/helpers';
 
-// --- Polling function for new articles ---
-async function pollAndPostArticles() {
-    try {
-        const response = await axios.get(`${config.apiBaseUrl}/articles-to-post`);
-        const articleData = response.data;
+// --- Long-polling loop for new articles ---
+// Each request waits on the backend until items are queued, then returns up to POLL_BATCH_SIZE at once
+const POLL_BATCH_SIZE = 10;
+const POLL_WAIT_SECONDS = 25;
+const POLL_RETRY_DELAY_MS = 5 * 1000;
 
-        if (articleData && articleData.processed_article && articleData.channel_id) {
-            console.log(`[POLL] Found new article to post: ${articleData.processed_article.title}`);
-            await postArticle(client, articleData.processed_article, articleData.channel_id);
+// Post one leased queue item and acknowledge it once Discord accepted it
+async function deliverQueueItem(articleData: any): Promise<void> {
+    if (!articleData || !articleData.processed_article || !articleData.channel_id) return;
+
+    let delivered: boolean;
+    if (articleData.type === 'digest') {
+        console.log(`[POLL] Found digest to post: ${articleData.processed_article.title}`);
+        delivered = await postDigest(client, articleData.processed_article, articleData.channel_id, articleData.article_id, articleData.delivery_id);
+    } else if (articleData.type === 'update' && articleData.message_id) {
+        console.log(`[POLL] Found article update: ${articleData.processed_article.title}`);
+        delivered = await editArticle(client, articleData.processed_article, articleData.channel_id, articleData.message_id, articleData.article_id, articleData.delivery_id);
+    } else {
+        console.log(`[POLL] Found new article to post: ${articleData.processed_article.title}`);
+        delivered = await postArticle(client, articleData.processed_article, articleData.channel_id, articleData.article_id, articleData.delivery_id);
+    }
+    // Unacknowledged items are redelivered by the backend after the visibility timeout
+    if (delivered) {
+        await ackDelivery(articleData.delivery_id);
+    }
+}
+
+async function pollAndPostArticles(): Promise<void> {
+    for (;;) {
+        try {
+            const response = await axios.get(`${config.apiBaseUrl}/articles-to-post`, {
+                params: { max: POLL_BATCH_SIZE, wait: POLL_WAIT_SECONDS },
+                timeout: (POLL_WAIT_SECONDS + 10) * 1000,
+            });
+            const items: any[] = Array.isArray(response.data) ? response.data : [];
+            // Post sequentially; discord.js queues requests per its own rate limits
+            for (const item of items) {
+                await deliverQueueItem(item);
+            }
+        } catch (error) {
+            if (axios.isAxiosError(error) && error.response?.status !== 404) {
+                console.error('[POLL] Error fetching articles to post:', error.message);
+            }
+            await new Promise(resolve => setTimeout(resolve, POLL_RETRY_DELAY_MS));
         }
-    } catch (error) {
-        // Don't log error if it's just an empty response (which is normal)
-        if (axios.isAxiosError(error) && error.response?.status !== 404) {
-            console.error('[POLL] Error fetching articles to post:', error.message);
+    }
+}
+
+// --- Push stream of new articles ---
+// The backend pushes queue items over Server-Sent Events as soon as they are enqueued.
+// Reconnects resume after the last received event id, so items lost in transit are resent.
+const STREAM_SUBSCRIBER = 'discord-bot';
+
+async function streamAndPostArticles(): Promise<void> {
+    let lastEventId: string | undefined;
+    for (;;) {
+        try {
+            const response = await axios.get(`${config.apiBaseUrl}/articles/stream`, {
+                params: { subscriber: STREAM_SUBSCRIBER },
+                headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+                responseType: 'stream',
+            });
+            console.log('[STREAM] Connected to article stream.');
+            // Items are handled one at a time; the backend stops pushing while too many are unacknowledged
+            await readServerSentEvents(response.data, async ({ id, event, data }) => {
+                if (id) lastEventId = id;
+                if (event === 'item') {
+                    await deliverQueueItem(JSON.parse(data));
+                }
+            });
+            console.warn('[STREAM] Article stream closed, reconnecting.');
+        } catch (error) {
+            if (axios.isAxiosError(error) && error.response?.status === 404) {
+                console.warn('[STREAM] Backend has no article stream, falling back to polling.');
+                return pollAndPostArticles();
+            }
+            console.error('[STREAM] Article stream error:', (error as Error).message);
         }
+        await new Promise(resolve => setTimeout(resolve, POLL_RETRY_DELAY_MS));
     }
 }
 
+// --- Rate limit feedback ---
+// Report Discord rate limits so the backend slows down delivery for that channel (or globally).
+// Only real 429 responses are reported: discord.js also emits 'rateLimited' for its own
+// pre-emptive queue waits, which are normal and must not slow delivery down.
+function reportRateLimits(): void {
+    client.rest.on('response', (request, response) => {
+        if (response.status !== 429) return;
+        const channelId = request.path.match(/^\/channels\/(\d+)/)?.[1];
+        const retryAfter = Number(response.headers.get('retry-after') ?? 1);
+        axios.post(`${config.apiBaseUrl}/delivery/rate-limit`, {
+            channel_id: channelId,
+            retry_after: Number.isFinite(retryAfter) ? retryAfter : 1,
+            global: response.headers.get('x-ratelimit-global') === 'true',
+        }).catch(error => {
+            console.error('[RATE LIMIT] Failed to report rate limit:', error.message);
+        });
+    });
+}
+
 // --- Main Function ---
 async function main() {
     // --- Command Loader ---
@@ -46,6 +130,8 @@ async function main() {
         }
     }
 
+    reportRateLimits();
+
     // --- Event Handlers ---
     client.once(Events.ClientReady, c => {
         console.log(`Ready! Logged in as ${c.user.tag}`);
@@ -54,9 +140,9 @@ async function main() {
         // Set presence
         client.user?.setActivity('RSS Feeds', { type: ActivityType.Watching });
 
-        // Start polling for articles
-        setInterval(pollAndPostArticles, 20 * 1000); // Poll every 20 seconds
-        console.log('Started polling for new articles.');
+        // Start receiving articles pushed by the backend
+        streamAndPostArticles();
+        console.log('Started streaming new articles.');
     });
 
     // --- Event Loader ---
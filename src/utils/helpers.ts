@@ -66,3 +66,41 @@ export function getChannelNameForFeed(feedUrl: string, feedTitle?: string): stri
 
     return name.substring(0, 100); // Enforce max length
 }
+
+export interface ServerSentEvent {
+    id?: string;
+    event: string;
+    data: string;
+}
+
+/**
+ * Reads Server-Sent Events from a Node.js stream (e.g. an axios response with responseType 'stream').
+ * Comment lines such as keepalives are skipped.
+ * @param stream The response body stream.
+ * @param onEvent Called for every event that carries data, awaited before the next one is read.
+ */
+export async function readServerSentEvents(
+    stream: AsyncIterable<Buffer | string>,
+    onEvent: (event: ServerSentEvent) => Promise<void>,
+): Promise<void> {
+    // Decode incrementally so a multi-byte character split across chunks is not replaced with U+FFFD.
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    for await (const chunk of stream) {
+        buffer += typeof chunk === 'string' ? chunk : decoder.decode(chunk, { stream: true });
+        let boundary: number;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.substring(0, boundary);
+            buffer = buffer.substring(boundary + 2);
+
+            const event: ServerSentEvent = { event: 'message', data: '' };
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('id:')) event.id = line.substring(3).trim();
+                else if (line.startsWith('event:')) event.event = line.substring(6).trim();
+                else if (line.startsWith('data:')) event.data += line.substring(5).trim();
+            }
+            if (!event.data) continue;
+            await onEvent(event);
+        }
+    }
+}
@@ -40,3 +40,159 @@ def test_ai_functions() -> None:
         await api.close()
 
     asyncio.run(run())
+
+
+class CountingAPI:
+    def __init__(self) -> None:
+        self.prompts = []
+
+    async def generate_text(
+        self, prompt: str, max_tokens: int = 1000, temperature: float = 0.7, **kwargs
+    ):
+        self.prompts.append(prompt)
+        return f"要点{len(self.prompts)}"
+
+
+def test_chunked_summarize() -> None:
+    """長文がチャンク分割され、map-reduceで要約されるかを確認する"""
+
+    async def run() -> None:
+        api = CountingAPI()
+        summarizer = Summarizer(api, chunk_threshold=100, chunk_size=60)
+        text = "\n\n".join(f"段落{i}の本文です。" * 3 for i in range(6))
+        summary = await summarizer.summarize(text, 200, "short")
+        assert summary
+        # チャンクごとの要約 + 最終要約
+        assert len(api.prompts) >= 3
+        assert "2〜3文" in api.prompts[-1]
+        assert all("段落" not in p for p in api.prompts[-1:])
+
+        chunks = Summarizer._split_into_chunks(text, 60)
+        assert all(len(c) <= 60 for c in chunks)
+        assert "".join(chunks).replace("\n", "") == text.replace("\n", "")
+
+    asyncio.run(run())
+
+
+class StreamingAPI:
+    async def generate_text_stream(self, prompt: str, **kwargs):
+        for part in ("回答", "です。"):
+            yield part
+
+
+def test_answer_question_stream() -> None:
+    """回答が断片ごとにストリーミングされるかを確認する"""
+    from ai.ai_processor import AIProcessor
+
+    async def run() -> None:
+        processor = AIProcessor({"local_classifier": False})
+        processor._qa_api = StreamingAPI()
+        parts = [
+            part async for part in processor.answer_question_stream(
+                {"title": "t", "content": "c"}, [], "質問"
+            )
+        ]
+        assert parts == ["回答", "です。"]
+
+    asyncio.run(run())
+
+
+def test_japanese_article_skips_title_translation() -> None:
+    """日本語の記事ではタイトルを翻訳せず、要約のみを依頼するかを確認する"""
+    from ai.ai_processor import AIProcessor
+
+    async def run() -> None:
+        processor = AIProcessor({"local_classifier": False})
+        api = CountingAPI()
+        processor.summarizer.api = api
+
+        article = {"title": "新型チップを発表", "content": "半導体メーカーは新しいチップを発表した。性能は従来の2倍になる。"}
+        processed = await processor._summarize_article(dict(article), {})
+        assert len(api.prompts) == 1
+        assert "日本語で" not in api.prompts[0]
+        assert processed["title"] == article["title"]
+        assert processed["language"] == "ja"
+
+        english = {"title": "New chip announced", "content": "The chipmaker announced a new chip today."}
+        await processor._summarize_article(dict(english), {})
+        assert len(api.prompts) == 3
+
+    asyncio.run(run())
+
+
+def test_create_digest_in_one_call() -> None:
+    """複数の記事が1回のAPI呼び出しでダイジェストにまとめられるかを確認する"""
+    from ai.ai_processor import AIProcessor
+
+    class DigestAPI:
+        def __init__(self) -> None:
+            self.calls = 0
+
+        async def generate_text(self, prompt: str, **kwargs):
+            self.calls += 1
+            return '```json\n{"overview": "AI関連の発表が続いた。", "items": ["[1] 新モデルを発表", "チップを増産"]}\n```'
+
+    async def run() -> None:
+        processor = AIProcessor({"local_classifier": False})
+        processor.api = DigestAPI()
+        articles = [
+            {"title": "New model", "link": "https://example.com/1", "content": "A new model was released."},
+            {"title": "Chip output", "link": "https://example.com/2", "content": "Chip output will rise."},
+            {"title": "Other", "link": "https://example.com/3", "content": "An unrelated story was published today."},
+        ]
+        digest = await processor.create_digest(articles, {"title": "Tech", "url": "https://example.com/feed"})
+        assert processor.api.calls == 1
+        assert digest["overview"] == "AI関連の発表が続いた。"
+        assert [item["summary"] for item in digest["items"][:2]] == ["新モデルを発表", "チップを増産"]
+        # 紹介文が足りない記事は抽出型の要約で補う
+        assert digest["items"][2]["summary"]
+        assert "Tech" in digest["title"]
+
+    asyncio.run(run())
+
+
+def test_storage_keywords_are_english_and_counted_once(tmp_path) -> None:
+    """検索用キーワードが英単語だけになり、再処理で文書頻度を二重に数えないかを確認する"""
+    from ai.ai_processor import AIProcessor
+    from rss.article_store import ArticleStore
+
+    async def run() -> None:
+        store = ArticleStore(str(tmp_path / "articles.db"))
+        processor = AIProcessor({"local_classifier": False})
+        processor.attach_article_store(store)
+        article = {"title": "半導体の新製品", "content": "Nvidia announced a new GPU. 新しいGPUは高速です。"}
+
+        keywords = await processor.extract_keywords_for_storage(article, document_id="a1")
+        terms = [k.strip() for k in keywords.split(",")]
+        assert "nvidia" in terms and "gpu" in terms
+        assert "半導体" not in terms and "新製品" not in terms
+
+        await processor.extract_keywords_for_storage(article, document_id="a1")
+        total, frequencies = await store.get_document_frequencies(["nvidia"])
+        assert total == 1 and frequencies == {"nvidia": 1}
+
+    asyncio.run(run())
+
+
+def test_digest_counts_document_frequency_once(tmp_path) -> None:
+    """同じダイジェストを作り直しても文書頻度を二重に数えないかを確認する"""
+    from ai.ai_processor import AIProcessor
+    from rss.article_store import ArticleStore
+
+    class DigestAPI:
+        async def generate_text(self, prompt: str, **kwargs):
+            return '{"overview": "Nvidia announced a GPU.", "items": ["GPUを発表"]}'
+
+    async def run() -> None:
+        store = ArticleStore(str(tmp_path / "articles.db"))
+        processor = AIProcessor({"local_classifier": False})
+        processor.attach_article_store(store)
+        processor.api = DigestAPI()
+        articles = [{"title": "Nvidia GPU", "link": "https://example.com/1", "content": "Nvidia announced a GPU."}]
+
+        for _ in range(2):
+            await processor.create_digest(articles, {"title": "Tech"}, digest_id="digest-1")
+        total, frequencies = await store.get_document_frequencies(["nvidia"])
+        assert total == 1 and frequencies == {"nvidia": 1}
+
+    asyncio.run(run())
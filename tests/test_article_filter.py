@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""記事フィルターのテスト"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.article_filter import ArticleFilter, FilterCache
+
+
+def _article(title: str, content: str = "", author: str = "", categories=None) -> dict:
+    return {"title": title, "content": content, "author": author, "categories": categories or []}
+
+
+def test_include_and_exclude_rules() -> None:
+    article_filter = ArticleFilter({
+        "include": {"keywords": ["AI", "半導体"], "regex": [r"GPT-\d"], "categories": ["Tech"]},
+        "exclude": {"keywords": ["PR"], "authors": ["Spam Bot"]},
+    })
+    assert article_filter.accepts(_article("New ai chip"))
+    assert article_filter.accepts(_article("国内の半導体工場"))
+    assert article_filter.accepts(_article("Release notes", "GPT-5 is available"))
+    assert article_filter.accepts(_article("Weekly roundup", categories=["tech"]))
+    assert not article_filter.accepts(_article("Sports results"))
+    assert not article_filter.accepts(_article("AI news [PR]"))
+    assert not article_filter.accepts(_article("AI news", author="spam bot"))
+
+
+def test_keywords_match_whole_words() -> None:
+    article_filter = ArticleFilter({"include": {"keywords": ["AI"]}, "exclude": {"keywords": ["PR"]}})
+    assert not article_filter.accepts(_article("Heavy rain expected in Spain"))
+    assert article_filter.accepts(_article("AI improves productivity in April"))
+    assert article_filter.accepts(_article("AIが株価を予測"))
+    assert not article_filter.accepts(_article("AI news (PR)"))
+
+    # 日本語のキーワードは部分一致で照合する
+    assert ArticleFilter({"include": {"keywords": ["半導体"]}}).accepts(_article("次世代半導体の量産"))
+
+
+def test_exclude_only_and_invalid_regex() -> None:
+    article_filter = ArticleFilter({"exclude": {"regex": ["(unclosed", "^Sponsored"]}})
+    assert article_filter.accepts(_article("Regular article"))
+    assert not article_filter.accepts(_article("Sponsored: buy now"))
+
+
+def test_inline_global_flags() -> None:
+    article_filter = ArticleFilter({"include": {"keywords": ["ai"], "regex": ["(?i)gpt", "(?s)robot.*arm"]}})
+    assert article_filter.accepts(_article("New GPT model"))
+    assert article_filter.accepts(_article("AI news"))
+    assert not article_filter.accepts(_article("Weather"))
+
+
+def test_strict_rejects_invalid_regex() -> None:
+    with pytest.raises(re.error):
+        ArticleFilter({"exclude": {"regex": ["(unclosed"]}}, strict=True)
+
+
+def test_cache_recompiles_only_on_change() -> None:
+    cache = FilterCache()
+    feed = {"url": "https://example.com/feed", "filters": {"include": {"keywords": ["AI"]}}}
+    first = cache.get(feed)
+    assert cache.get(feed) is first
+
+    feed["filters"] = {"include": {"keywords": ["robot"]}}
+    second = cache.get(feed)
+    assert second is not first
+    assert second.accepts(_article("robot arm"))
+
+    feed["filters"] = {}
+    assert cache.get(feed) is None
@@ -126,3 +126,125 @@ class TestArticleStore(unittest.TestCase):
             self.assertEqual(len(all_articles), 3)
 
         asyncio.run(run())
+
+    def test_document_frequencies(self) -> None:
+        async def run() -> None:
+            await self.article_store.add_document_terms(["ai", "chip", "ai"])
+            await self.article_store.add_document_terms(["ai", "robot"])
+            total, frequencies = await self.article_store.get_document_frequencies(
+                ["ai", "chip", "robot", "unknown"]
+            )
+            self.assertEqual(total, 2)
+            self.assertEqual(frequencies, {"ai": 2, "chip": 1, "robot": 1})
+
+        asyncio.run(run())
+
+    def test_document_frequencies_counted_once_per_document(self) -> None:
+        async def run() -> None:
+            self.assertTrue(await self.article_store.add_document_terms(["ai", "chip"], document_id="a1"))
+            # 再処理で同じ記事を加算しても文書頻度は変わらない
+            self.assertFalse(await self.article_store.add_document_terms(["ai", "chip"], document_id="a1"))
+            total, frequencies = await self.article_store.get_document_frequencies(["ai", "chip"])
+            self.assertEqual(total, 1)
+            self.assertEqual(frequencies, {"ai": 1, "chip": 1})
+
+        asyncio.run(run())
+
+    def test_cleanup_prunes_counted_documents(self) -> None:
+        async def run() -> None:
+            await self.article_store.add_document_terms(["ai"], document_id="old")
+            await self.article_store.add_document_terms(["ai"], document_id="new")
+            old_date = (datetime.now(timezone.utc) - timedelta(days=31)).isoformat()
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("UPDATE term_stats_documents SET added_at = ? WHERE document_id = 'old'", (old_date,))
+            conn.commit()
+            conn.close()
+
+            await self.article_store.cleanup_old_articles(30)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                rows = conn.execute("SELECT document_id FROM term_stats_documents").fetchall()
+            finally:
+                conn.close()
+            self.assertEqual(rows, [("new",)])
+
+        asyncio.run(run())
+
+    def test_reenrich_queue(self) -> None:
+        async def run() -> None:
+            article = {"title": "Title", "content": "本文"}
+            await self.article_store.enqueue_reenrich("a1", "channel1", "https://example.com/feed1", article)
+            await self.article_store.enqueue_reenrich("a2", "channel1", "https://example.com/feed1", article, delay=3600)
+
+            due = await self.article_store.get_due_reenrich()
+            self.assertEqual([item["article_id"] for item in due], ["a1"])
+            self.assertEqual(due[0]["article"], article)
+            self.assertEqual(due[0]["attempts"], 0)
+
+            await self.article_store.reschedule_reenrich("a1", 1, 3600)
+            self.assertEqual(await self.article_store.get_due_reenrich(), [])
+
+            await self.article_store.remove_reenrich("a1")
+            conn = sqlite3.connect(self.db_path)
+            count = conn.execute("SELECT COUNT(*) FROM reenrich_queue").fetchone()[0]
+            conn.close()
+            self.assertEqual(count, 1)
+
+            # 投稿済みメッセージを記事IDから引けること
+            await self.article_store.add_full_article("m1", "channel1", article, "", article_id="a1")
+            self.assertEqual(await self.article_store.get_message_id_for_article("a1"), "m1")
+            self.assertIsNone(await self.article_store.get_message_id_for_article("a2"))
+
+        asyncio.run(run())
+
+    def test_article_state_machine(self) -> None:
+        async def run() -> None:
+            store = self.article_store
+            article = {"title": "Title", "content": "本文"}
+            self.assertTrue(await store.discover_article("a1", "https://example.com/feed1", "channel1", article))
+            self.assertFalse(await store.discover_article("a1", "https://example.com/feed1", "channel1", article))
+            self.assertTrue(await store.is_article_processed("a1"))
+
+            await store.advance_article_state("a1", "enriching")
+            await store.advance_article_state("a1", "enriched", processed={"title": "タイトル"})
+            unfinished = await store.get_unfinished_articles()
+            self.assertEqual(unfinished[0]["state"], "enriched")
+            self.assertEqual(unfinished[0]["processed"], {"title": "タイトル"})
+            self.assertEqual(unfinished[0]["article"], article)
+
+            await store.advance_article_state("a1", "queued", delivery_id=7)
+            self.assertEqual(await store.get_unfinished_articles(), [])
+
+            # 紐付けが確認応答より先に届いても、状態は前に戻らない
+            self.assertTrue(await store.advance_article_state("a1", "associated", message_id="m1"))
+            self.assertFalse(await store.advance_state_by_delivery(7, "posted"))
+            counts = await store.count_article_states()
+            self.assertEqual(counts["associated"], 1)
+            self.assertEqual(counts["posted"], 0)
+
+            await store.forget_article("a1")
+            self.assertFalse(await store.is_article_processed("a1"))
+            self.assertEqual((await store.count_article_states())["associated"], 0)
+
+        asyncio.run(run())
+
+    def test_associate_delivery(self) -> None:
+        async def run() -> None:
+            store = self.article_store
+            article = {"title": "Title", "content": "本文", "feed_url": "https://example.com/feed1"}
+            conn = sqlite3.connect(self.db_path)
+            store.save_delivery_article(conn, 5, "a1", article, "keyword")
+            # 同じ配信IDで保存し直すと内容が置き換わる
+            store.save_delivery_article(conn, 5, "a1", dict(article, title="New title"), "keyword")
+            conn.commit()
+            conn.close()
+
+            self.assertEqual(await store.associate_delivery(5, "m1", "channel1"), {"article_id": "a1"})
+            self.assertIsNone(await store.associate_delivery(6, "m2", "channel1"))
+
+            saved = await store.get_full_article("m1")
+            self.assertEqual(saved["title"], "New title")
+            self.assertEqual(saved["content"], "本文")
+            self.assertEqual(await store.get_message_id_for_article("a1"), "m1")
+
+        asyncio.run(run())
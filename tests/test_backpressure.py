@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""バックプレッシャーのテスト"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.backpressure import BackpressureController
+
+
+class TestBackpressureController(unittest.TestCase):
+    """バックプレッシャー制御のテストケース"""
+
+    def test_pauses_above_high_and_resumes_below_low(self) -> None:
+        controller = BackpressureController(high_depth=10, low_depth=4, high_age=0)
+        controller.update({"c1": {"depth": 10, "age": 5.0}, "c2": {"depth": 3, "age": 5.0}})
+        self.assertTrue(controller.is_paused("c1"))
+        self.assertFalse(controller.is_paused("c2"))
+
+        # 上限と下限の間では停止を続ける
+        controller.update({"c1": {"depth": 6, "age": 5.0}})
+        self.assertTrue(controller.is_paused("c1"))
+
+        controller.update({"c1": {"depth": 4, "age": 5.0}})
+        self.assertFalse(controller.is_paused("c1"))
+
+    def test_age_watermarks(self) -> None:
+        controller = BackpressureController(high_depth=0, high_age=600, low_age=60)
+        controller.update({"c1": {"depth": 1, "age": 900.0}})
+        self.assertTrue(controller.is_paused("c1"))
+        controller.update({"c1": {"depth": 1, "age": 120.0}})
+        self.assertTrue(controller.is_paused("c1"))
+
+        # 配信待ちがなくなったチャンネルは再開する
+        controller.update({})
+        self.assertFalse(controller.is_paused("c1"))
+        self.assertEqual(controller.status(), {"paused": [], "channels": {}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""サーキットブレーカーのテスト"""
+
+import os
+import sys
+import asyncio
+import unittest
+import unittest.mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.circuit_breaker import CircuitBreaker, CircuitOpenError, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from ai.gemini_api import GeminiAPI
+from ai.summarizer import Summarizer
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """サーキットブレーカーのテストケース"""
+
+    def test_opens_after_consecutive_failures(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertFalse(breaker.allow_request())
+
+    def test_half_open_allows_single_trial(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    def test_half_open_is_not_open(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        self.assertFalse(breaker.is_open)
+
+    def test_abandoned_trial_is_released(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0, trial_timeout=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow_request())
+        self.assertFalse(breaker.allow_request())
+        breaker.release_trial()
+        self.assertTrue(breaker.allow_request())
+
+        # 結果が記録されないまま trial_timeout を過ぎた試行も次の試行に譲る
+        breaker.trial_timeout = 0
+        self.assertTrue(breaker.allow_request())
+
+    def test_cancelled_trial_call_releases_trial(self) -> None:
+        async def run() -> None:
+            breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+            api = GeminiAPI(api_keys=["key-a"], model="gemini-test", circuit_breaker=breaker)
+            breaker.record_failure()
+
+            async def call_model(model, prompt, generation_config, priority):
+                await asyncio.sleep(10)
+
+            api._call_model = call_model
+            task = asyncio.create_task(api.generate_text("trial"))
+            await asyncio.sleep(0.01)
+            self.assertFalse(breaker.allow_request())
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertTrue(breaker.allow_request())
+
+        asyncio.run(run())
+
+    def test_rotated_rate_limits_do_not_open_circuit(self) -> None:
+        async def run() -> None:
+            breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+            api = GeminiAPI(api_keys=["key-a", "key-b"], model="gemini-test", circuit_breaker=breaker)
+            calls = []
+
+            async def call_model(model, prompt, generation_config, priority):
+                calls.append(api.current_key_index)
+                if len(calls) == 1:
+                    raise RuntimeError("429 quota exceeded")
+                return "ok"
+
+            api._call_model = call_model
+            api._extract_text = lambda response: response
+            with unittest.mock.patch("ai.gemini_api.asyncio.sleep", new=unittest.mock.AsyncMock()):
+                self.assertEqual(await api.generate_text("prompt"), "ok")
+            self.assertEqual(len(calls), 2)
+            self.assertEqual(breaker.state, STATE_CLOSED)
+
+        asyncio.run(run())
+
+    def test_gemini_api_fails_fast_when_open(self) -> None:
+        async def run() -> None:
+            breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+            api = GeminiAPI(api_keys=["key-a"], model="gemini-test", circuit_breaker=breaker)
+            calls = []
+
+            async def call_model(model, prompt, generation_config, priority):
+                calls.append(prompt)
+                raise RuntimeError("service unavailable")
+
+            api._call_model = call_model
+            with self.assertRaises(RuntimeError):
+                await api.generate_text("first")
+            with self.assertRaises(CircuitOpenError):
+                await api.generate_text("second")
+            with self.assertRaises(CircuitOpenError):
+                await api.generate_text("third")
+            self.assertEqual(calls, ["first", "second"])
+
+            # 要約はAPIを呼ばずに抽出型要約で代替し、フォールバックしたことを返す
+            summarizer = Summarizer(api)
+            summary, used_fallback = await summarizer.summarize_with_status(
+                "最初の文です。次の文です。最後の文です。", 200
+            )
+            self.assertTrue(summary)
+            self.assertTrue(used_fallback)
+            self.assertEqual(len(calls), 2)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""コンテキスト詰め込みのテスト"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.context_packer import ContextPacker, estimate_tokens, split_passages
+
+
+class TestContextPacker(unittest.TestCase):
+    """コンテキスト詰め込みのテストケース"""
+
+    def test_split_passages(self) -> None:
+        text = "一文目です。二文目です。三文目です。" + "長" * 30 + "。"
+        passages = split_passages(text, 15)
+        self.assertTrue(all(len(p) <= 15 for p in passages))
+        self.assertEqual("".join(passages).replace(" ", ""), text)
+
+    def test_estimate_tokens(self) -> None:
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+        self.assertEqual(estimate_tokens("日本語"), 3)
+
+    def test_pack_relevant_passages_within_budget(self) -> None:
+        main = {
+            "title": "新型チップ発表",
+            "content": "A社が新型チップを発表した。" + "天気の話題が続く。" * 20 + "新型チップの価格は5万円だ。",
+        }
+        related = [
+            {"title": "無関係", "content": "スポーツの試合結果。" * 10},
+            {"title": "競合の動向", "content": "B社も価格を下げた。チップの価格競争が激しい。"},
+        ]
+        packer = ContextPacker(token_budget=80, passage_chars=30)
+        packed = packer.pack("チップの価格はいくら？", main, related)
+
+        self.assertTrue(packed[0]["is_main"])
+        main_text = "".join(packed[0]["passages"])
+        self.assertIn("A社が新型チップを発表した。", main_text)
+        self.assertIn("5万円", main_text)
+        self.assertNotIn("無関係", [a["title"] for a in packed])
+
+        total = sum(estimate_tokens(a["title"]) + sum(estimate_tokens(p) for p in a["passages"]) for a in packed)
+        self.assertLessEqual(total, 80)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""配信ペース制御のテスト"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.delivery_pacer import DeliveryPacer, TokenBucket
+from rss.delivery_queue import DeliveryQueue
+
+
+class TestTokenBucket(unittest.TestCase):
+    """トークンバケットのテストケース"""
+
+    def test_burst_then_refill(self) -> None:
+        bucket = TokenBucket(capacity=2, rate=10)
+        now = time.monotonic()
+        self.assertTrue(bucket.available(now))
+        bucket.take(now)
+        bucket.take(now)
+        self.assertFalse(bucket.available(now))
+        self.assertTrue(bucket.available(now + 0.2))
+
+    def test_pause_backs_off_and_recovers(self) -> None:
+        bucket = TokenBucket(capacity=5, rate=1.0)
+        bucket.pause(0.05)
+        self.assertFalse(bucket.available())
+        self.assertEqual(bucket.rate, 0.5)
+
+        time.sleep(0.06)
+        bucket.tokens = 1
+        bucket.take()
+        self.assertGreater(bucket.rate, 0.5)
+
+
+class TestDeliveryPacer(unittest.TestCase):
+    """配信ペース制御のテストケース"""
+
+    def test_channel_and_global_limits(self) -> None:
+        pacer = DeliveryPacer(channel_burst=2, channel_rate=0.001, global_burst=3, global_rate=0.001)
+        self.assertTrue(pacer.try_acquire("c1"))
+        self.assertTrue(pacer.try_acquire("c1"))
+        # チャンネルの枠を使い切ってもほかのチャンネルは送信できる
+        self.assertFalse(pacer.try_acquire("c1"))
+        self.assertTrue(pacer.try_acquire("c2"))
+        # 全体の枠を使い切るとすべてのチャンネルが止まる
+        self.assertFalse(pacer.try_acquire("c3"))
+
+        pacer.release("c1")
+        self.assertTrue(pacer.try_acquire("c1"))
+
+    def test_defaults_stay_within_discord_window(self) -> None:
+        # チャンネルごとに5秒間で5件を超えない
+        pacer = DeliveryPacer()
+        bucket = TokenBucket(pacer.channel_burst, pacer.channel_rate)
+        start = time.monotonic()
+        sent = []
+        for step in range(1500):
+            now = start + step * 0.01
+            if bucket.available(now):
+                bucket.take(now)
+                sent.append(now)
+        for i, first in enumerate(sent):
+            self.assertLessEqual(len([t for t in sent[i:] if t < first + 5]), 5)
+
+    def test_rate_limit_feedback(self) -> None:
+        pacer = DeliveryPacer()
+        pacer.report_rate_limit("c1", retry_after=60)
+        self.assertFalse(pacer.try_acquire("c1"))
+        self.assertTrue(pacer.try_acquire("c2"))
+
+        pacer.report_rate_limit(None, retry_after=60, is_global=True)
+        self.assertFalse(pacer.try_acquire("c2"))
+        self.assertEqual(pacer.status()["rate_limited"], 2)
+
+    def test_queue_leases_only_within_limits(self) -> None:
+        async def run() -> None:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                pacer = DeliveryPacer(channel_burst=1, channel_rate=0.001)
+                queue = DeliveryQueue(os.path.join(temp_dir, "queue.db"), pacer=pacer)
+                for i in range(3):
+                    await queue.enqueue({"type": "post", "article_id": f"a{i}", "processed_article": {}, "channel_id": "c1"})
+                await queue.enqueue({"type": "post", "article_id": "b0", "processed_article": {}, "channel_id": "c2"})
+
+                leased = await queue.lease_many(10)
+                self.assertEqual([i["article_id"] for i in leased], ["a0", "b0"])
+                self.assertEqual(await queue.lease_many(10), [])
+
+                # 送信せずに戻した項目の枠は返却され、c1 からもう1件だけ取り出せる
+                await queue.release(leased[0]["delivery_id"])
+                self.assertEqual([i["channel_id"] for i in await queue.lease_many(10)], ["c1"])
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""配信ペイロードのテスト"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.delivery_payload import EMBED_CONTENT_LIMIT, slim_delivery_item
+
+
+class TestDeliveryPayload(unittest.TestCase):
+    """配信ペイロードのテストケース"""
+
+    def test_slim_post_drops_unused_fields(self) -> None:
+        original = {"title": "Hello", "content": "x" * 10000}
+        item = {
+            "type": "post",
+            "delivery_id": 1,
+            "article_id": "a1",
+            "channel_id": "c1",
+            "feed_url": "https://example.com/feed",
+            "attempts": 1,
+            "processed_article": {
+                "title": "翻訳: Hello",
+                "link": "https://example.com/1",
+                "summary": "要約",
+                "content": original["content"],
+                "keywords_en": "hello",
+                "_original_article": original,
+            },
+        }
+        slim = slim_delivery_item(item)
+        self.assertEqual(
+            slim,
+            {
+                "type": "post",
+                "delivery_id": 1,
+                "article_id": "a1",
+                "channel_id": "c1",
+                "processed_article": {"title": "翻訳: Hello", "link": "https://example.com/1", "summary": "要約"},
+            },
+        )
+        # 元の項目は変更しない
+        self.assertIn("_original_article", item["processed_article"])
+
+    def test_content_is_truncated_when_no_summary(self) -> None:
+        item = {"type": "post", "processed_article": {"title": "t", "content": "<p>" + "x" * 10000 + "</p>"}}
+        content = slim_delivery_item(item)["processed_article"]["content"]
+        self.assertEqual(len(content), EMBED_CONTENT_LIMIT)
+        self.assertTrue(content.startswith("xxx"))
+        self.assertTrue(content.endswith("..."))
+
+    def test_slim_digest(self) -> None:
+        item = {
+            "type": "digest",
+            "processed_article": {
+                "title": "ダイジェスト",
+                "overview": "概要",
+                "items": [{"title": "a", "link": "l", "summary": "s", "content": "long"}],
+                "digest": True,
+                "_original_article": {"content": "long"},
+            },
+        }
+        self.assertEqual(
+            slim_delivery_item(item)["processed_article"],
+            {"title": "ダイジェスト", "overview": "概要", "items": [{"title": "a", "link": "l", "summary": "s"}]},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""配信キューのテスト"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.delivery_queue import DeliveryQueue
+
+
+def _item(article_id: str, item_type: str = "post", title: str = "title", channel_id: str = "c1",
+          feed_url: str = "https://example.com/feed") -> dict:
+    return {
+        "type": item_type,
+        "article_id": article_id,
+        "processed_article": {"title": title},
+        "channel_id": channel_id,
+        "feed_url": feed_url,
+    }
+
+
+class TestDeliveryQueue(unittest.TestCase):
+    """配信キューのテストケース"""
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "queue.db")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_lease_in_order_and_ack(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            await queue.enqueue(_item("a"))
+            await queue.enqueue(_item("b"))
+
+            first = await queue.lease()
+            second = await queue.lease()
+            self.assertEqual([first["article_id"], second["article_id"]], ["a", "b"])
+            # リース中の項目は取り出せない
+            self.assertIsNone(await queue.lease())
+
+            self.assertTrue(await queue.ack(first["delivery_id"]))
+            self.assertFalse(await queue.ack(first["delivery_id"]))
+            self.assertEqual(await queue.depth(), 1)
+
+        asyncio.run(run())
+
+    def test_redelivery_after_visibility_timeout(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path, visibility_timeout=0.05, max_attempts=2)
+            await queue.enqueue(_item("a"))
+
+            leased = await queue.lease()
+            self.assertEqual(leased["attempts"], 1)
+            await asyncio.sleep(0.1)
+            redelivered = await queue.lease()
+            self.assertEqual(redelivered["delivery_id"], leased["delivery_id"])
+            self.assertEqual(redelivered["attempts"], 2)
+
+            # 上限を超えた項目はキューから外される
+            await asyncio.sleep(0.1)
+            self.assertIsNone(await queue.lease())
+            self.assertEqual(await queue.depth(), 0)
+
+        asyncio.run(run())
+
+    def test_release_with_delay(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            await queue.enqueue(_item("a"))
+            await queue.enqueue(_item("b"))
+
+            first = await queue.lease()
+            await queue.release(first["delivery_id"], delay=60)
+            self.assertEqual((await queue.lease())["article_id"], "b")
+            self.assertIsNone(await queue.lease())
+
+            await queue.release(first["delivery_id"])
+            self.assertEqual((await queue.lease())["article_id"], "a")
+
+        asyncio.run(run())
+
+    def test_dedupe_by_type_and_article(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            post_id = await queue.enqueue(_item("a"))
+            self.assertEqual(await queue.enqueue(_item("a", title="duplicate")), post_id)
+
+            update_id = await queue.enqueue(_item("a", "update", "v1"))
+            self.assertNotEqual(update_id, post_id)
+            # 未配信の更新イベントは新しい配信IDの新しい内容に置き換わる
+            replaced_id = await queue.enqueue(_item("a", "update", "v2"))
+            self.assertNotEqual(replaced_id, update_id)
+
+            items = await queue.pending()
+            self.assertEqual([i["processed_article"]["title"] for i in items], ["title", "v2"])
+
+        asyncio.run(run())
+
+    def test_on_insert_runs_in_same_transaction(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            inserted = []
+
+            def fail(conn, delivery_id):
+                raise RuntimeError("保存に失敗しました")
+
+            # 付随データの保存に失敗した場合は項目も追加されない
+            self.assertIsNone(await queue.enqueue(_item("a"), on_insert=fail))
+            self.assertEqual(await queue.depth(), 0)
+
+            delivery_id = await queue.enqueue(_item("a"), on_insert=lambda conn, i: inserted.append(i))
+            self.assertEqual(inserted, [delivery_id])
+            # 重複して追加しなかった場合は呼ばれない
+            await queue.enqueue(_item("a"), on_insert=lambda conn, i: inserted.append(i))
+            self.assertEqual(inserted, [delivery_id])
+
+        asyncio.run(run())
+
+    def test_ack_of_leased_update_keeps_newer_version(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            await queue.enqueue(_item("a", "update", "v1"))
+            leased = await queue.lease()
+
+            # リース中に新しい内容が追加されても、古い内容への確認応答では消えない
+            await queue.enqueue(_item("a", "update", "v2"))
+            self.assertFalse(await queue.ack(leased["delivery_id"]))
+            self.assertEqual((await queue.lease())["processed_article"]["title"], "v2")
+
+        asyncio.run(run())
+
+    def test_renew_only_current_lease(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path, visibility_timeout=0.05)
+            await queue.enqueue(_item("a"))
+            leased = await queue.lease()
+            self.assertTrue(await queue.renew(leased["delivery_id"], leased["attempts"]))
+
+            # リースが切れて再びリースされた項目は、古いリースでは延長できない
+            await asyncio.sleep(0.1)
+            self.assertFalse(await queue.renew(leased["delivery_id"], leased["attempts"]))
+            again = await queue.lease()
+            self.assertFalse(await queue.renew(leased["delivery_id"], leased["attempts"]))
+            self.assertTrue(await queue.renew(again["delivery_id"], again["attempts"]))
+
+        asyncio.run(run())
+
+    def test_release_is_not_counted_as_attempt(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path, max_attempts=2)
+            await queue.enqueue(_item("a"))
+            for deferrals in range(5):
+                leased = await queue.lease()
+                self.assertEqual((leased["attempts"], leased["deferrals"]), (1, deferrals))
+                await queue.release(leased["delivery_id"])
+
+        asyncio.run(run())
+
+    def test_lease_many_and_wait_for_items(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            for article_id in ("a", "b", "c"):
+                await queue.enqueue(_item(article_id))
+            self.assertEqual([i["article_id"] for i in await queue.lease_many(2)], ["a", "b"])
+            self.assertEqual([i["article_id"] for i in await queue.lease_many(5)], ["c"])
+            self.assertEqual(await queue.lease_many(5), [])
+
+            # 待機中に追加されるとタイムアウトを待たずに戻る
+            async def add_later() -> None:
+                await asyncio.sleep(0.05)
+                await queue.enqueue(_item("d"))
+
+            loop = asyncio.get_event_loop()
+            started = loop.time()
+            await asyncio.gather(queue.wait_for_items(5, poll_interval=5), add_later())
+            self.assertLess(loop.time() - started, 1)
+            self.assertEqual((await queue.lease())["article_id"], "d")
+
+        asyncio.run(run())
+
+    def test_round_robin_across_channels(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            # c1 に大量の記事があっても c2, c3 の記事が待たされない
+            for i in range(5):
+                await queue.enqueue(_item(f"noisy{i}", channel_id="c1"))
+            await queue.enqueue(_item("quiet2", channel_id="c2"))
+            await queue.enqueue(_item("quiet3", channel_id="c3"))
+
+            first = await queue.lease_many(4)
+            self.assertEqual([i["article_id"] for i in first], ["noisy0", "quiet2", "quiet3", "noisy1"])
+            # 巡回は前回の続きのチャンネルから再開する
+            self.assertEqual((await queue.lease())["article_id"], "noisy2")
+
+        asyncio.run(run())
+
+    def test_lease_for_feed_after_id(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            self.assertEqual(await queue.last_id(), 0)
+            await queue.enqueue(_item("old", feed_url="https://a.example/feed"))
+            since = await queue.last_id()
+
+            await queue.enqueue(_item("other", channel_id="c2", feed_url="https://b.example/feed"))
+            await queue.enqueue(_item("new1", feed_url="https://a.example/feed"))
+            await queue.enqueue(_item("new2", feed_url="https://a.example/feed"))
+
+            items = await queue.lease_for_feed("https://a.example/feed", since)
+            self.assertEqual([i["article_id"] for i in items], ["new1", "new2"])
+            # リース済みの項目は再び取り出されない
+            self.assertEqual(await queue.lease_for_feed("https://a.example/feed", since), [])
+            self.assertEqual([i["article_id"] for i in await queue.lease_many(5)], ["old", "other"])
+
+        asyncio.run(run())
+
+    def test_lease_for_feed_skips_updates(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            await queue.enqueue(_item("post1", feed_url="https://a.example/feed"))
+            await queue.enqueue(_item("upd1", item_type="update", feed_url="https://a.example/feed"))
+
+            # 更新イベントはメッセージIDの解決が必要なため手動確認では取り出さない
+            items = await queue.lease_for_feed("https://a.example/feed")
+            self.assertEqual([i["article_id"] for i in items], ["post1"])
+            self.assertEqual([i["article_id"] for i in await queue.lease_many(5)], ["upd1"])
+
+        asyncio.run(run())
+
+    def test_persists_across_instances(self) -> None:
+        async def run() -> None:
+            await DeliveryQueue(self.db_path).enqueue(_item("a"))
+            item = await DeliveryQueue(self.db_path).lease()
+            self.assertEqual(item["article_id"], "a")
+
+        asyncio.run(run())
+
+    def test_channel_backlog(self) -> None:
+        async def run() -> None:
+            queue = DeliveryQueue(self.db_path)
+            await queue.enqueue(_item("a", channel_id="c1"))
+            await queue.enqueue(_item("b", channel_id="c1"))
+            await queue.enqueue(_item("c", channel_id="c2"))
+            # リース中の項目も滞留として数える
+            await queue.lease()
+
+            backlog = await queue.channel_backlog()
+            self.assertEqual({channel: stats["depth"] for channel, stats in backlog.items()}, {"c1": 2, "c2": 1})
+            self.assertGreaterEqual(backlog["c1"]["age"], 0)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""配信ストリームのテスト"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.delivery_stream import DeliveryStreamHub
+
+
+class FakeQueue:
+    def __init__(self, count: int) -> None:
+        self.items = [{"delivery_id": i, "article_id": f"a{i}"} for i in range(1, count + 1)]
+        self.leased_sizes = []
+
+    async def lease(self, limit: int):
+        self.leased_sizes.append(limit)
+        leased, self.items = self.items[:limit], self.items[limit:]
+        return leased
+
+    async def wait_for_items(self, timeout: float) -> None:
+        await asyncio.sleep(min(timeout, 0.01))
+
+
+class TestDeliveryStreamHub(unittest.TestCase):
+    """配信ストリームのテストケース"""
+
+    def test_backpressure_limits_unacked_items(self) -> None:
+        async def run() -> None:
+            hub = DeliveryStreamHub(max_inflight=2, heartbeat=60)
+            queue = FakeQueue(3)
+            events = hub.events("bot", None, queue.lease, queue.wait_for_items)
+
+            first = await events.__anext__()
+            second = await events.__anext__()
+            self.assertEqual([first[0], second[0]], [1, 2])
+
+            # 確認応答待ちが上限の間は次の項目を送らない
+            pending = asyncio.ensure_future(events.__anext__())
+            await asyncio.sleep(0.05)
+            self.assertFalse(pending.done())
+
+            hub.ack(first[1]["delivery_id"])
+            third = await asyncio.wait_for(pending, timeout=2)
+            self.assertEqual(third[1]["article_id"], "a3")
+            self.assertEqual(hub.status()["bot"]["inflight"], 2)
+            await events.aclose()
+
+        asyncio.run(run())
+
+    def test_resume_resends_items_after_last_event_id(self) -> None:
+        async def run() -> None:
+            hub = DeliveryStreamHub(max_inflight=5, heartbeat=60)
+            queue = FakeQueue(3)
+            events = hub.events("bot", None, queue.lease, queue.wait_for_items)
+            sent = [await events.__anext__() for _ in range(3)]
+            await events.aclose()
+            self.assertFalse(hub.status()["bot"]["connected"])
+
+            # 2件目までしか受け取れていなかった場合、3件目だけが同じ連番で再送される
+            resumed = hub.events("bot", sent[1][0], queue.lease, queue.wait_for_items)
+            self.assertEqual(await resumed.__anext__(), sent[2])
+            await resumed.aclose()
+
+        asyncio.run(run())
+
+    def test_resume_skips_expired_or_unrenewable_items(self) -> None:
+        async def run() -> None:
+            hub = DeliveryStreamHub(max_inflight=5, inflight_timeout=60, heartbeat=60)
+            queue = FakeQueue(3)
+            events = hub.events("bot", None, queue.lease, queue.wait_for_items)
+            sent = [await events.__anext__() for _ in range(3)]
+            await events.aclose()
+
+            # 保持期間を過ぎた1件目は再送せず、リースを延長できない2件目も再送しない
+            first_seq = sent[0][0]
+            hub._subscribers["bot"].inflight[first_seq] = (0.0, sent[0][1])
+
+            async def renew(item):
+                return item["article_id"] != "a2"
+
+            resumed = hub.events("bot", 0, queue.lease, queue.wait_for_items, renew)
+            self.assertEqual(await resumed.__anext__(), sent[2])
+            self.assertEqual(list(hub._subscribers["bot"].inflight), [sent[2][0]])
+            await resumed.aclose()
+
+        asyncio.run(run())
+
+    def test_keepalive_when_idle(self) -> None:
+        async def run() -> None:
+            hub = DeliveryStreamHub(heartbeat=0.02)
+            queue = FakeQueue(0)
+            events = hub.events("bot", None, queue.lease, queue.wait_for_items)
+            self.assertIsNone(await asyncio.wait_for(events.__anext__(), timeout=2))
+            await events.aclose()
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""優先度付きディスパッチャーのテスト"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.dispatcher import PriorityDispatcher, PRIORITY_INTERACTIVE, PRIORITY_FANOUT, PRIORITY_BACKGROUND
+
+
+class TestPriorityDispatcher(unittest.TestCase):
+    """優先度付きディスパッチャーのテストケース"""
+
+    def test_interactive_runs_before_queued_background(self) -> None:
+        async def run() -> None:
+            dispatcher = PriorityDispatcher(max_concurrency=1, reserved_interactive=0)
+            order = []
+            gate = asyncio.Event()
+
+            async def job(name: str, priority: int) -> None:
+                async with dispatcher.slot(priority):
+                    order.append(name)
+                    await gate.wait()
+
+            first = asyncio.create_task(job("bg0", PRIORITY_BACKGROUND))
+            await asyncio.sleep(0)
+            tasks = [asyncio.create_task(job(f"bg{i}", PRIORITY_BACKGROUND)) for i in (1, 2)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(job("qa", PRIORITY_INTERACTIVE)))
+            await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(first, *tasks)
+            self.assertEqual(order, ["bg0", "qa", "bg1", "bg2"])
+
+        asyncio.run(run())
+
+    def test_reserved_capacity(self) -> None:
+        async def run() -> None:
+            dispatcher = PriorityDispatcher(max_concurrency=2, reserved_interactive=1)
+            await dispatcher.acquire(PRIORITY_BACKGROUND)
+            blocked = asyncio.create_task(dispatcher.acquire(PRIORITY_BACKGROUND))
+            await asyncio.sleep(0)
+            self.assertFalse(blocked.done())
+
+            # 予約枠により対話的リクエストは即座に実行できる
+            await asyncio.wait_for(dispatcher.acquire(PRIORITY_INTERACTIVE), 1)
+            self.assertEqual(dispatcher.active, 2)
+
+            dispatcher.release()
+            dispatcher.release()
+            await asyncio.wait_for(blocked, 1)
+            self.assertEqual(dispatcher.active, 1)
+
+            # キャンセルされた待機者は枠を消費しない
+            await dispatcher.acquire(PRIORITY_INTERACTIVE)
+            cancelled = asyncio.create_task(dispatcher.acquire(PRIORITY_BACKGROUND))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            dispatcher.release()
+            self.assertEqual(dispatcher.active, 1)
+            self.assertEqual(dispatcher.waiting, 0)
+
+        asyncio.run(run())
+
+    def test_fanout_extra_capacity(self) -> None:
+        async def run() -> None:
+            dispatcher = PriorityDispatcher(max_concurrency=4, reserved_interactive=1, fanout_extra=2)
+            # チャンク要約はバックグラウンド枠（3）と追加枠（2）を合わせた5件まで並列に実行できる
+            for _ in range(5):
+                await asyncio.wait_for(dispatcher.acquire(PRIORITY_FANOUT), 1)
+            blocked_fanout = asyncio.create_task(dispatcher.acquire(PRIORITY_FANOUT))
+            blocked_background = asyncio.create_task(dispatcher.acquire(PRIORITY_BACKGROUND))
+            await asyncio.sleep(0)
+            self.assertFalse(blocked_fanout.done())
+            self.assertFalse(blocked_background.done())
+
+            # 追加枠を使い切っても対話的リクエストの予約枠は残る
+            await asyncio.wait_for(dispatcher.acquire(PRIORITY_INTERACTIVE), 1)
+            self.assertEqual(dispatcher.active, 6)
+
+            blocked_fanout.cancel()
+            blocked_background.cancel()
+            await asyncio.gather(blocked_fanout, blocked_background, return_exceptions=True)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
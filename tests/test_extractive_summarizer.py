@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""抽出型要約のテスト"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.extractive_summarizer import split_sentences, textrank_summarize
+from ai.summarizer import Summarizer
+
+
+class FailingAPI:
+    async def generate_text(self, prompt: str, **kwargs) -> str:
+        raise RuntimeError("quota exceeded")
+
+
+class TestExtractiveSummarizer(unittest.TestCase):
+    """抽出型要約のテストケース"""
+
+    def test_split_sentences(self) -> None:
+        self.assertEqual(
+            split_sentences("今日は晴れ。明日は雨！ It rained. Really? Yes"),
+            ["今日は晴れ。", "明日は雨！", "It rained.", "Really?", "Yes"],
+        )
+
+    def test_selects_central_sentences_within_length(self) -> None:
+        text = (
+            "新型の半導体チップが発表された。"
+            "この半導体チップは消費電力が半分になる。"
+            "発表会場の近くでは祭りが開かれていた。"
+            "半導体チップの量産は来年から始まる予定だ。"
+        )
+        summary = textrank_summarize(text, 45)
+        self.assertLessEqual(len(summary), 45)
+        self.assertIn("半導体チップ", summary)
+        self.assertNotIn("祭り", summary)
+
+        english = "Cats sleep a lot. Cats also like to sleep in the sun. Stocks fell today."
+        self.assertIn("Cats", textrank_summarize(english, 40))
+        self.assertEqual(textrank_summarize("", 100), "")
+        self.assertEqual(textrank_summarize("短い文。", 100), "短い文。")
+        self.assertTrue(textrank_summarize("a" * 50, 10).endswith("..."))
+
+    def test_summarizer_falls_back_and_keeps_title(self) -> None:
+        async def run() -> None:
+            summarizer = Summarizer(FailingAPI())
+            text = "一つ目の文です。二つ目の文です。三つ目の文です。"
+            summary = await summarizer.summarize(text, 20, "normal")
+            self.assertTrue(summary)
+            self.assertLessEqual(len(summary), 20)
+            self.assertEqual(await summarizer.summarize("Original Title", 100, "title"), "Original Title")
+
+            summarizer = Summarizer(FailingAPI(), degraded=True)
+            self.assertEqual(await summarizer.summarize(text, 200, "normal"), text)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
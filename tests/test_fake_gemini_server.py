@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Gemini API代替サーバーのテスト"""
+
+import os
+import sys
+import json
+import asyncio
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini_server import FakeGemini, FakeSettings
+
+
+def _request(text: str) -> dict:
+    return {"contents": [{"parts": [{"text": text}]}], "generationConfig": {"maxOutputTokens": 3}}
+
+
+class TestFakeGemini(unittest.TestCase):
+    """代替サーバーのテストケース"""
+
+    def test_quota_and_token_accounting(self) -> None:
+        async def run() -> None:
+            fake = FakeGemini(FakeSettings(latency="fixed:0", rpm=2, seed=1))
+            responses = [await fake.generate("key-a", _request("指示\n\n本文の段落です")) for _ in range(3)]
+            self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+
+            body = json.loads(responses[0].body)
+            self.assertEqual(body["candidates"][0]["content"]["parts"][0]["text"], "本文の段落で")
+            usage = body["usageMetadata"]
+            self.assertEqual(usage["totalTokenCount"], usage["promptTokenCount"] + usage["candidatesTokenCount"])
+
+            # クォータはAPIキーごとに数える
+            self.assertEqual((await fake.generate("key-b", _request("x"))).status_code, 200)
+            stats = fake.stats.to_dict()
+            self.assertEqual(stats["rate_limited"], 1)
+            self.assertEqual(stats["per_key"], {"key-a": 3, "key-b": 1})
+
+        asyncio.run(run())
+
+    def test_blocked_response(self) -> None:
+        async def run() -> None:
+            fake = FakeGemini(FakeSettings(latency="fixed:0", block_rate=1.0))
+            body = json.loads((await fake.generate("key", _request("text"))).body)
+            self.assertEqual(body["promptFeedback"]["blockReason"], "SAFETY")
+            self.assertNotIn("candidates", body)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""フィードマネージャーのテスト"""
+
+import os
+import sys
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rss.article_store import ArticleStore
+from rss.feed_manager import FeedManager
+
+FEED_URL = "https://example.com/feed"
+
+
+class FakeFeedParser:
+    def __init__(self, entries) -> None:
+        self.entries = entries
+
+    async def parse_feed(self, url):
+        return {"feed": {"title": "Example"}, "entries": [dict(e) for e in self.entries]}
+
+
+class FakeAIProcessor:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+        self.available = True
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def process_article(self, article, feed_info):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if self.fail:
+            raise RuntimeError("AI処理に失敗しました")
+        processed = dict(article)
+        processed["title"] = "翻訳: " + article["title"]
+        processed["summary"] = "要約"
+        processed["ai_processed"] = True
+        return processed
+
+    async def create_digest(self, articles, feed_info, digest_id=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        self.digested = [a["title"] for a in articles]
+        return {"title": f"ダイジェスト（{len(articles)}件）", "items": articles, "digest": True}
+
+
+class TestFeedManager(unittest.TestCase):
+    """フィードマネージャーのテストケース"""
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "articles.db")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _make_manager(self, config, ai_processor, entries) -> FeedManager:
+        with mock.patch("rss.feed_manager.ArticleStore", lambda: ArticleStore(self.db_path)):
+            manager = FeedManager(config, ai_processor)
+        manager.feed_parser = FakeFeedParser(entries)
+        return manager
+
+    def test_enriched_mode_posts_processed_article(self) -> None:
+        async def run() -> None:
+            config = {"feeds": [{"url": FEED_URL, "channel_id": "c1"}]}
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            manager = self._make_manager(config, FakeAIProcessor(), entries)
+            self.assertEqual(await manager.check_feed(config["feeds"][0]), 1)
+
+            items = await manager.delivery_queue.pending()
+            self.assertEqual(len(items), 1)
+            self.assertEqual(items[0]["type"], "post")
+            self.assertEqual(items[0]["feed_url"], FEED_URL)
+            self.assertEqual(items[0]["processed_article"]["title"], "翻訳: Hello")
+
+            # 投稿後は配信IDだけで元の記事を紐付けられる
+            associated = await manager.article_store.associate_delivery(items[0]["delivery_id"], "m1", "c1")
+            self.assertEqual(associated, {"article_id": items[0]["article_id"]})
+            self.assertEqual((await manager.article_store.get_full_article("m1"))["content"], "body")
+
+        asyncio.run(run())
+
+    def test_immediate_mode_posts_preview_then_update(self) -> None:
+        async def run() -> None:
+            config = {
+                "feeds": [{"url": FEED_URL, "channel_id": "c1"}],
+                "publish_mode": "immediate",
+                "publish_preview_length": 10,
+            }
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "x" * 50}]
+            manager = self._make_manager(config, FakeAIProcessor(delay=0.05), entries)
+            await manager.check_feed(config["feeds"][0])
+
+            # AI処理を待たずに元の記事が投稿キューに入る
+            items = await manager.delivery_queue.pending()
+            self.assertEqual(len(items), 1)
+            post = items[0]
+            self.assertEqual(post["type"], "post")
+            self.assertEqual(post["processed_article"]["title"], "Hello")
+            self.assertEqual(len(post["processed_article"]["content"]), 10)
+
+            await asyncio.gather(*manager._enrichment_tasks)
+            update = (await manager.delivery_queue.pending())[1]
+            self.assertEqual(update["type"], "update")
+            self.assertEqual(update["article_id"], post["article_id"])
+            self.assertEqual(update["processed_article"]["title"], "翻訳: Hello")
+
+        asyncio.run(run())
+
+    def test_immediate_mode_limits_concurrent_enrichment(self) -> None:
+        async def run() -> None:
+            config = {
+                "feeds": [{"url": FEED_URL, "channel_id": "c1"}],
+                "publish_mode": "immediate",
+                "immediate_enrichment_concurrency": 2,
+                "max_articles": 5,
+            }
+            entries = [
+                {"title": f"Hello {i}", "link": f"https://example.com/{i}", "content": "body"} for i in range(5)
+            ]
+            ai_processor = FakeAIProcessor(delay=0.02)
+            manager = self._make_manager(config, ai_processor, entries)
+            await manager.check_feed(config["feeds"][0])
+            await asyncio.gather(*manager._enrichment_tasks)
+
+            self.assertEqual(ai_processor.calls, 5)
+            self.assertEqual(ai_processor.peak, 2)
+
+        asyncio.run(run())
+
+    def test_immediate_mode_retries_unprocessed_article_later(self) -> None:
+        async def run() -> None:
+            config = {"feeds": [{"url": FEED_URL, "channel_id": "c1"}], "publish_mode": "immediate"}
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            ai_processor = FakeAIProcessor()
+            ai_processor.process_article = mock.AsyncMock(return_value={"title": "Hello", "ai_processed": False})
+            manager = self._make_manager(config, ai_processor, entries)
+            await manager.check_feed(config["feeds"][0])
+            await asyncio.gather(*manager._enrichment_tasks)
+
+            # AI処理されていない記事で投稿を更新せず、再処理キューに残す
+            types = [item["type"] for item in await manager.delivery_queue.pending()]
+            self.assertEqual(types, ["post"])
+            conn = sqlite3.connect(self.db_path)
+            try:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM reenrich_queue").fetchone()[0], 1)
+            finally:
+                conn.close()
+
+        asyncio.run(run())
+
+    def test_reenrich_skips_articles_with_enrichment_in_flight(self) -> None:
+        async def run() -> None:
+            config = {
+                "feeds": [{"url": FEED_URL, "channel_id": "c1"}],
+                "publish_mode": "immediate",
+                "immediate_enrichment_concurrency": 1,
+            }
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            ai_processor = FakeAIProcessor(delay=0.05)
+            manager = self._make_manager(config, ai_processor, entries)
+            await manager.check_feed(config["feeds"][0])
+
+            # 回復用の再処理の期限が来ても、実行中のバックグラウンド処理とは重複させない
+            due = [{"article_id": a, "article": entries[0], "feed_url": FEED_URL, "channel_id": "c1", "attempts": 0}
+                   for a in manager._enriching]
+            self.assertEqual(len(due), 1)
+            with mock.patch.object(manager.article_store, "get_due_reenrich", mock.AsyncMock(return_value=due)):
+                self.assertEqual(await manager.drain_reenrich_queue(), 0)
+            await asyncio.gather(*manager._enrichment_tasks)
+            self.assertEqual(ai_processor.calls, 1)
+            self.assertEqual(manager._enriching, set())
+
+        asyncio.run(run())
+
+    def test_immediate_mode_skips_enrichment_for_paused_channel(self) -> None:
+        async def run() -> None:
+            config = {
+                "feeds": [{"url": FEED_URL, "channel_id": "c1"}],
+                "publish_mode": "immediate",
+                "backlog_high_depth": 2,
+                "backlog_low_depth": 1,
+            }
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            ai_processor = FakeAIProcessor()
+            manager = self._make_manager(config, ai_processor, entries)
+            await manager.delivery_queue.enqueue({"type": "post", "article_id": "old0", "channel_id": "c1"})
+            await manager.check_feed(config["feeds"][0])
+            await asyncio.gather(*manager._enrichment_tasks)
+
+            # 滞留中のチャンネルはAI処理を見送り、再処理キューに残した項目に任せる
+            self.assertEqual(ai_processor.calls, 0)
+            types = [item["type"] for item in await manager.delivery_queue.pending()]
+            self.assertEqual(types, ["post", "post"])
+            conn = sqlite3.connect(self.db_path)
+            try:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM reenrich_queue").fetchone()[0], 1)
+            finally:
+                conn.close()
+
+        asyncio.run(run())
+
+    def test_filters_drop_articles_before_ai(self) -> None:
+        async def run() -> None:
+            feed = {"url": FEED_URL, "channel_id": "c1", "filters": {"exclude": {"keywords": ["sponsored"]}}}
+            entries = [
+                {"title": "Sponsored post", "link": "https://example.com/1", "content": "ad"},
+                {"title": "Real news", "link": "https://example.com/2", "content": "body"},
+            ]
+            manager = self._make_manager({"feeds": [feed]}, FakeAIProcessor(), entries)
+            await manager.check_feed(feed)
+
+            items = await manager.delivery_queue.pending()
+            self.assertEqual([item["processed_article"]["title"] for item in items], ["翻訳: Real news"])
+            # 除外した記事は次回以降も再判定しない
+            await manager.delivery_queue.ack(items[0]["delivery_id"])
+            await manager.check_feed(feed)
+            self.assertEqual(await manager.delivery_queue.depth(), 0)
+
+        asyncio.run(run())
+
+    def test_digest_mode_buffers_until_max_items(self) -> None:
+        async def run() -> None:
+            feed = {"url": FEED_URL, "channel_id": "c1", "delivery_mode": "digest", "digest_max_items": 3}
+            config = {"feeds": [feed], "digest_window_minutes": 60}
+            entries = [{"title": f"Item {i}", "link": f"https://example.com/{i}", "content": "body"} for i in range(2)]
+            ai_processor = FakeAIProcessor()
+            manager = self._make_manager(config, ai_processor, entries)
+
+            await manager.check_feed(feed)
+            self.assertEqual(await manager.delivery_queue.depth(), 0)
+
+            manager.feed_parser.entries = entries + [{"title": "Item 2", "link": "https://example.com/2", "content": "body"}]
+            await manager.check_feed(feed)
+            items = await manager.delivery_queue.pending()
+            self.assertEqual(len(items), 1)
+            item = items[0]
+            self.assertEqual(item["type"], "digest")
+            self.assertEqual(len(item["processed_article"]["items"]), 3)
+            self.assertEqual(await manager.article_store.get_digest_items(FEED_URL), [])
+
+        asyncio.run(run())
+
+    def test_concurrent_digest_flushes_summarize_once(self) -> None:
+        async def run() -> None:
+            feed = {"url": FEED_URL, "channel_id": "c1", "delivery_mode": "digest"}
+            ai_processor = FakeAIProcessor(delay=0.02)
+            manager = self._make_manager({"feeds": [feed]}, ai_processor, [])
+            for i in range(2):
+                await manager.article_store.add_digest_item(FEED_URL, f"a{i}", {"title": f"Item {i}"})
+
+            # フィード確認・定期実行・手動確認が重なっても、同じ記事は一度だけまとめる
+            flushed = await asyncio.gather(*(manager.flush_digest(feed, force=True) for _ in range(3)))
+            self.assertEqual(sorted(flushed), [0, 0, 2])
+            self.assertEqual(ai_processor.calls, 1)
+            self.assertEqual(await manager.delivery_queue.depth(), 1)
+
+        asyncio.run(run())
+
+    def test_digest_items_kept_when_enqueue_fails(self) -> None:
+        async def run() -> None:
+            feed = {"url": FEED_URL, "channel_id": "c1", "delivery_mode": "digest"}
+            manager = self._make_manager({"feeds": [feed]}, FakeAIProcessor(), [])
+            await manager.article_store.add_digest_item(FEED_URL, "a0", {"title": "Item 0"})
+
+            with mock.patch.object(manager.delivery_queue, "enqueue", mock.AsyncMock(return_value=None)):
+                self.assertEqual(await manager.flush_digest(feed, force=True), 0)
+            self.assertEqual(len(await manager.article_store.get_digest_items(FEED_URL)), 1)
+
+        asyncio.run(run())
+
+    def test_undelivered_item_is_dead_lettered(self) -> None:
+        async def run() -> None:
+            config = {
+                "feeds": [{"url": FEED_URL, "channel_id": "c1"}],
+                "delivery_visibility_timeout": 0.05,
+                "delivery_max_attempts": 1,
+            }
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            manager = self._make_manager(config, FakeAIProcessor(), entries)
+            manager.delivery_queue.pacer = None
+            await manager.check_feed(config["feeds"][0])
+            leased = await manager.delivery_queue.lease()
+            self.assertEqual((await manager.article_store.count_article_states())["queued"], 1)
+
+            # 確認応答がないまま上限に達した項目は記録され、記事は failed になる
+            await asyncio.sleep(0.1)
+            self.assertIsNone(await manager.delivery_queue.lease())
+            states = await manager.article_store.count_article_states()
+            self.assertEqual((states["queued"], states["failed"]), (0, 1))
+            letters = await manager.article_store.get_dead_letters()
+            self.assertEqual([l["delivery_id"] for l in letters], [leased["delivery_id"]])
+            self.assertEqual(letters[0]["item"]["processed_article"]["title"], "翻訳: Hello")
+            self.assertEqual(letters[0]["attempts"], 1)
+
+        asyncio.run(run())
+
+    def test_queue_survives_restart(self) -> None:
+        async def run() -> None:
+            config = {"feeds": [{"url": FEED_URL, "channel_id": "c1"}]}
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            manager = self._make_manager(config, FakeAIProcessor(), entries)
+            await manager.check_feed(config["feeds"][0])
+
+            # 投稿前に再起動しても、処理済みの記事は配信キューに残る
+            restarted = self._make_manager(config, FakeAIProcessor(), entries)
+            item = await restarted.delivery_queue.lease()
+            self.assertIsNotNone(item)
+            self.assertEqual(item["processed_article"]["title"], "翻訳: Hello")
+
+        asyncio.run(run())
+
+    def test_resume_enqueues_enriched_article_without_ai(self) -> None:
+        async def run() -> None:
+            config = {"feeds": [{"url": FEED_URL, "channel_id": "c1"}]}
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            manager = self._make_manager(config, FakeAIProcessor(), entries)
+            # 投稿キューに入れる直前で停止した状態を再現する
+            store = manager.article_store
+            await store.discover_article("a1", FEED_URL, "c1", entries[0])
+            await store.advance_article_state("a1", "enriched", processed={"title": "保存済み"})
+            await store.discover_article("a2", FEED_URL, "c1", entries[0])
+
+            ai_processor = FakeAIProcessor()
+            restarted = self._make_manager(config, ai_processor, entries)
+            self.assertEqual(await restarted.resume_unfinished_articles(), 2)
+            # AI処理を保存済みの記事はAIを呼ばずに投稿キューに入る
+            self.assertEqual(ai_processor.calls, 1)
+            titles = sorted(i["processed_article"]["title"] for i in await restarted.delivery_queue.pending())
+            self.assertEqual(titles, ["保存済み", "翻訳: Hello"])
+            self.assertEqual((await store.count_article_states())["queued"], 2)
+            self.assertEqual(await restarted.resume_unfinished_articles(), 0)
+
+        asyncio.run(run())
+
+    def test_failed_article_is_retried_on_next_check(self) -> None:
+        async def run() -> None:
+            config = {"feeds": [{"url": FEED_URL, "channel_id": "c1"}]}
+            entries = [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            ai_processor = FakeAIProcessor(fail=True)
+            manager = self._make_manager(config, ai_processor, entries)
+            self.assertEqual(await manager.check_feed(config["feeds"][0]), 0)
+
+            ai_processor.fail = False
+            self.assertEqual(await manager.check_feed(config["feeds"][0]), 1)
+            self.assertEqual(ai_processor.calls, 2)
+
+        asyncio.run(run())
+
+
+    def test_backlogged_channel_pauses_until_drained(self) -> None:
+        async def run() -> None:
+            config = {
+                "feeds": [{"url": FEED_URL, "channel_id": "c1"}],
+                "backlog_high_depth": 2,
+                "backlog_low_depth": 1,
+            }
+            ai_processor = FakeAIProcessor()
+            manager = self._make_manager(config, ai_processor, [])
+            for i in range(2):
+                await manager.delivery_queue.enqueue({"type": "post", "article_id": f"old{i}", "channel_id": "c1"})
+            manager.feed_parser = FakeFeedParser(
+                [{"title": "Hello", "link": "https://example.com/1", "content": "body"}]
+            )
+
+            # 配信待ちが上限に達している間はフィードを取得せず、AI処理もしない
+            await manager.check_feeds()
+            self.assertEqual(ai_processor.calls, 0)
+            self.assertTrue(manager.backpressure.is_paused("c1"))
+
+            # 下限まで減ると再開し、見送った記事が処理される
+            for item in await manager.delivery_queue.pending():
+                if item["article_id"] == "old0":
+                    await manager.delivery_queue.ack(item["delivery_id"])
+            await manager.check_feeds()
+            self.assertEqual(ai_processor.calls, 1)
+            self.assertFalse(manager.backpressure.is_paused("c1"))
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
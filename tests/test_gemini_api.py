@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Gemini API連携（ヘッジリクエスト）のテスト"""
+
+import os
+import sys
+import asyncio
+import unittest
+from unittest import mock
+
+import google.generativeai as genai
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.gemini_api import GeminiAPI
+
+
+class FakeResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class TestGeminiHedging(unittest.TestCase):
+    """ヘッジリクエストのテストケース"""
+
+    def _make_api(self, delays, budget: float = 1.0) -> GeminiAPI:
+        api = GeminiAPI(api_keys=["key-a", "key-b"], model="gemini-test", hedging=True, hedge_budget=budget)
+        api.hedge_default_delay = 0.05
+        api.cancelled = []
+
+        def model_for_key(index, system_instruction, generation_config):
+            return f"model-{index}"
+
+        async def call_model(model, prompt, generation_config, priority):
+            name = model if isinstance(model, str) else "primary"
+            try:
+                await asyncio.sleep(delays[name])
+            except asyncio.CancelledError:
+                api.cancelled.append(name)
+                raise
+            return FakeResponse(name)
+
+        api._model_for_key = model_for_key
+        api._call_model = call_model
+        return api
+
+    def test_hedge_wins_when_primary_is_slow(self) -> None:
+        async def run() -> None:
+            api = self._make_api({"primary": 1.0, "model-1": 0.01})
+            api.current_key_index = 0
+            text = await api.generate_text("prompt", hedge=True)
+            await asyncio.sleep(0)
+            self.assertEqual(text, "model-1")
+            self.assertEqual(api.hedge_wins, 1)
+            self.assertEqual(api.cancelled, ["primary"])
+
+        asyncio.run(run())
+
+    def test_no_hedge_when_fast_or_over_budget(self) -> None:
+        async def run() -> None:
+            api = self._make_api({"primary": 0.0, "model-1": 0.0})
+            self.assertEqual(await api.generate_text("prompt", hedge=True), "primary")
+            self.assertEqual(api._hedged_requests, 0)
+
+            api = self._make_api({"primary": 0.1, "model-1": 0.0}, budget=0.0)
+            self.assertEqual(await api.generate_text("prompt", hedge=True), "primary")
+            self.assertEqual(api._hedged_requests, 0)
+
+        asyncio.run(run())
+
+
+class TestGeminiPerKeyClient(unittest.TestCase):
+    """APIキーごとのクライアント（SDKの内部属性に依存する部分）のテストケース"""
+
+    def test_model_for_key_uses_per_key_async_client(self) -> None:
+        async def run() -> None:
+            api = GeminiAPI(api_keys=["key-a", "key-b"], model="gemini-test")
+            model = api._model_for_key(1, None, None)
+            client = api._key_clients[1]
+            self.assertIs(model._async_client, client)
+            self.assertIsNot(api._async_client_for_key(0), client)
+
+            # SDKが差し替えたクライアントで呼び出すことを確認する（SDKの更新で内部属性が変わると失敗する）
+            response = genai.protos.GenerateContentResponse()
+            with mock.patch.object(client, "generate_content", mock.AsyncMock(return_value=response)) as call:
+                await model.generate_content_async("prompt")
+            self.assertEqual(call.await_count, 1)
+            self.assertEqual(call.await_args.args[0].model, "models/gemini-test")
+
+        asyncio.run(run())
+
+    def test_model_for_key_uses_per_key_sync_client_for_rest(self) -> None:
+        api = GeminiAPI(api_keys=["key-a", "key-b"], model="gemini-test", api_endpoint="http://127.0.0.1:1")
+        model = api._model_for_key(0, None, None)
+        client = api._key_clients[0]
+        self.assertIs(model._client, client)
+
+        response = genai.protos.GenerateContentResponse()
+        with mock.patch.object(client, "generate_content", mock.MagicMock(return_value=response)) as call:
+            model.generate_content("prompt")
+        self.assertEqual(call.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ローカルキーワード抽出のテスト"""
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.keyword_extractor import KeywordExtractor, is_english_term
+
+
+class TestKeywordExtractor(unittest.TestCase):
+    """ローカルキーワード抽出のテストケース"""
+
+    def test_tokenize_mixed_text(self) -> None:
+        terms = KeywordExtractor.tokenize("OpenAIがGPT-4の新モデルを発表。The model is faster than C++ code.")
+        self.assertIn("openai", terms)
+        self.assertIn("gpt-4", terms)
+        self.assertIn("モデル", terms)
+        self.assertIn("発表", terms)
+        self.assertIn("c++", terms)
+        self.assertNotIn("the", terms)
+        self.assertNotIn("is", terms)
+
+    def test_rank_prefers_rare_and_title_terms(self) -> None:
+        extractor = KeywordExtractor()
+        tf = extractor.term_frequencies(
+            "Rust compiler release", "The compiler team announced a release. Software software software."
+        )
+        # 文書頻度が高い語（software）はIDFで抑えられる
+        keywords = extractor.rank(tf, {"software": 90, "rust": 1}, total_documents=100, top_k=3)
+        self.assertIn("rust", keywords)
+        self.assertNotIn("software", keywords)
+        self.assertEqual(extractor.rank({}, top_k=3), [])
+
+    def test_is_english_term(self) -> None:
+        self.assertTrue(is_english_term("gpt-4"))
+        self.assertTrue(is_english_term("5g"))
+        self.assertFalse(is_english_term("モデル"))
+        self.assertFalse(is_english_term("発表"))
+
+
+if __name__ == "__main__":
+    unittest.main()
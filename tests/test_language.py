@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""言語判定のテスト"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.language import is_japanese, script_ratios
+
+
+def test_detects_japanese_by_script() -> None:
+    assert is_japanese("政府は新しい経済対策を発表した。来年度から実施される見通しだ。")
+    assert is_japanese("OpenAIが新モデルを発表、GPUの需要がさらに高まる")
+    assert not is_japanese("The government announced a new economic package on Monday.")
+    # 漢字のみの中国語は日本語とみなさない
+    assert not is_japanese("政府宣布了新的经济刺激计划，将于明年实施。")
+
+
+def test_falls_back_to_declared_language() -> None:
+    assert is_japanese("2024", "ja")
+    assert not is_japanese("2024", "en-US")
+    # 本文が英語ならフィードの宣言より文字種を優先する
+    assert not is_japanese("This feed declares Japanese but the entry is English.", "ja")
+
+
+def test_script_ratios() -> None:
+    ratios = script_ratios("あいう abc")
+    assert ratios["letters"] == 6
+    assert ratios["kana"] == 0.5
+    assert ratios["latin"] == 0.5
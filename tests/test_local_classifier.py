@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""ローカル分類器のテスト"""
+
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.classifier import Classifier
+from ai.local_classifier import LocalClassifier
+
+
+class FixedAPI:
+    def __init__(self, answer: str) -> None:
+        self.answer = answer
+        self.calls = 0
+
+    async def generate_text(self, prompt: str, **kwargs) -> str:
+        self.calls += 1
+        return self.answer
+
+
+class TestLocalClassifier(unittest.TestCase):
+    """ローカル分類器のテストケース"""
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.temp_dir.name, "model.json")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _train(self, model: LocalClassifier) -> None:
+        for _ in range(5):
+            model.learn("New smartphone chip and AI software release", "technology")
+            model.learn("新しいスマートフォンの半導体とソフトウェア", "technology")
+            model.learn("Football league final match score", "sports")
+            model.learn("サッカーの試合で優勝が決まった", "sports")
+
+    def test_predict_and_persist(self) -> None:
+        model = LocalClassifier(self.model_path, save_interval=1000)
+        self._train(model)
+        label, confidence = model.predict("AI chip software update", ["technology", "sports"])
+        self.assertEqual(label, "technology")
+        self.assertGreater(confidence, 0.9)
+        label, _ = model.predict("サッカーの決勝試合", ["technology", "sports"])
+        self.assertEqual(label, "sports")
+        self.assertEqual(model.predict("anything", ["politics"]), (None, 0.0))
+
+        self.assertTrue(model.save())
+        reloaded = LocalClassifier(self.model_path)
+        self.assertEqual(reloaded.sample_count, model.sample_count)
+        self.assertEqual(reloaded.predict("football match"), model.predict("football match"))
+
+    def test_classifier_uses_local_model_when_confident(self) -> None:
+        async def run() -> None:
+            model = LocalClassifier()
+            api = FixedAPI("technology")
+            classifier = Classifier(api, local_model=model, min_samples=4)
+
+            # 学習件数が足りないうちはLLMを使い、その結果を学習する
+            category = await classifier.classify("AI chip", "software release", ["technology", "sports"])
+            self.assertEqual(category, "technology")
+            self.assertEqual(api.calls, 1)
+            self.assertEqual(model.sample_count, 1)
+
+            self._train(model)
+            category = await classifier.classify("Football", "league final match", ["technology", "sports"])
+            self.assertEqual(category, "sports")
+            self.assertEqual(api.calls, 1)
+
+        asyncio.run(run())
+
+    def test_single_trained_label_keeps_using_llm(self) -> None:
+        async def run() -> None:
+            model = LocalClassifier()
+            for _ in range(20):
+                model.learn("New smartphone chip and AI software release", "technology")
+            api = FixedAPI("sports")
+            classifier = Classifier(api, local_model=model, min_samples=4, min_class_samples=5)
+
+            # 1つのラベルしか学習していない間はLLMで分類し、ほかのラベルも学習する
+            category = await classifier.classify("Football", "league final match", ["technology", "sports"])
+            self.assertEqual(category, "sports")
+            self.assertEqual(api.calls, 1)
+            self.assertEqual(model.doc_counts["sports"], 1)
+
+        asyncio.run(run())
+
+    def test_confidence_accounts_for_untrained_labels(self) -> None:
+        model = LocalClassifier()
+        for _ in range(20):
+            model.learn("New smartphone chip and AI software release", "technology")
+        # 学習済みの語を含まない記事は、未学習のラベルがあると確信度が低い
+        _, confidence = model.predict("選挙の投票率が過去最低になった", ["technology", "politics"])
+        self.assertLess(confidence, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
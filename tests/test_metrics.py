@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""AI呼び出しの計測のテスト"""
+
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.metrics import AIMetrics
+from ai.gemini_api import GeminiAPI
+
+
+class FakeUsage:
+    prompt_token_count = 120
+    candidates_token_count = 30
+
+
+class FakeResponse:
+    text = "要約です"
+    usage_metadata = FakeUsage()
+
+
+class TestAIMetrics(unittest.TestCase):
+    """計測のテストケース"""
+
+    def test_aggregates_by_stage(self) -> None:
+        metrics = AIMetrics()
+        metrics.record("summary", model="m", key_index=0, input_tokens=100, output_tokens=20, latency=0.3)
+        metrics.record("summary", model="m", key_index=1, input_tokens=50, output_tokens=10, latency=3.0, retries=2)
+        metrics.record("qa", cache_hit=True)
+        metrics.record("classify", latency=0.05, error="RuntimeError")
+
+        snapshot = metrics.snapshot(recent=2)
+        summary = snapshot["stages"]["summary"]
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["input_tokens"], 150)
+        self.assertEqual(summary["retries"], 2)
+        self.assertEqual(summary["keys"], {"0": 1, "1": 1})
+        self.assertEqual(summary["latency_histogram"]["le_0.5"], 1)
+        self.assertEqual(summary["latency_histogram"]["le_5.0"], 1)
+        self.assertEqual(snapshot["stages"]["qa"]["cache_hits"], 1)
+        self.assertEqual(snapshot["totals"]["errors"], 1)
+        self.assertEqual(len(snapshot["recent"]), 2)
+
+    def test_gemini_api_records_usage(self) -> None:
+        async def run() -> None:
+            metrics = AIMetrics()
+            api = GeminiAPI(api_keys=["key-a"], model="gemini-test", metrics=metrics)
+
+            async def call_model(model, prompt, generation_config, priority):
+                return FakeResponse()
+
+            api._call_model = call_model
+            self.assertEqual(await api.generate_text("prompt", stage="title"), "要約です")
+
+            title = metrics.snapshot()["stages"]["title"]
+            self.assertEqual(title["calls"], 1)
+            self.assertEqual(title["input_tokens"], 120)
+            self.assertEqual(title["output_tokens"], 30)
+            self.assertEqual(title["models"], {"gemini-test": 1})
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""質問応答キャッシュのテスト"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.qa_cache import QACache, TTLCache, normalize_question
+
+
+class TestQACache(unittest.TestCase):
+    """質問応答キャッシュのテストケース"""
+
+    def test_normalize_question(self) -> None:
+        self.assertEqual(normalize_question("これは何ですか？"), normalize_question("これは何 ですか"))
+        self.assertEqual(normalize_question("What is ＡＩ?"), normalize_question("what is ai"))
+
+    def test_ttl_and_lru(self) -> None:
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+        expiring = TTLCache(max_size=2, ttl=0.01)
+        expiring.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(expiring.get("a"))
+        self.assertEqual(len(expiring), 0)
+
+    def test_answer_and_context(self) -> None:
+        cache = QACache()
+        cache.set_answer("m1", "この会社の今年の売上はいくらですか？", "100億円です。")
+        self.assertEqual(cache.get_answer("m1", "この会社の今年の売上はいくら"), "100億円です。")
+        # 語順や助詞だけが異なる質問も同じ回答を返す
+        self.assertEqual(cache.get_answer("m1", "今年、この会社の売上はいくら？"), "100億円です。")
+        self.assertIsNone(cache.get_answer("m2", "この会社の今年の売上はいくらですか"))
+        self.assertIsNone(cache.get_answer("m1", "この会社の今年の利益はいくらですか"))
+        self.assertIsNone(cache.get_answer("m1", "この会社の今年の売上高はいくらですか"))
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+    def test_opposite_questions_do_not_share_answers(self) -> None:
+        cache = QACache()
+        cache.set_answer("m1", "株価は上がりますか？", "上がる見込みです。")
+        cache.set_answer("m1", "日銀は利上げしますか？", "利上げの可能性があります。")
+        self.assertIsNone(cache.get_answer("m1", "株価は下がりますか？"))
+        self.assertIsNone(cache.get_answer("m1", "日銀は利下げしますか？"))
+
+        cache.set_context("m1", ["ai"], ["m5", "m6"])
+        self.assertEqual(cache.get_context("m1"), {"keywords": ["ai"], "related_ids": ["m5", "m6"]})
+        self.assertIsNone(cache.get_context("m2"))
+
+
+if __name__ == "__main__":
+    unittest.main()